@@ -26,7 +26,7 @@ logger = logging.getLogger(__name__)
 class AlertSystem:
     """Sistema de alertas y notificaciones"""
 
-    def __init__(self):
+    def __init__(self, correlations=None):
         self.config = ALERT_CONFIG
         self.email_config = self.config.get('email', {})
         self.thresholds = self.config.get('thresholds', {})
@@ -35,6 +35,9 @@ class AlertSystem:
         # Cache para evitar spam de alertas
         self.recent_alerts = {}
 
+        # CorrelationRegistry opcional: marca señales en pares correlacionados
+        self.correlations = correlations
+
     def _should_send_alert(self, alert_type: str, content_hash: str) -> bool:
         """Verificar si debe enviar alerta (evitar spam)"""
         try:
@@ -259,6 +262,12 @@ class AlertSystem:
                     f"   Efectividad: {strategy['effectiveness']:.1f}% "
                     f"({strategy['occurrences']} ocurrencias, score: {strategy['score']:.1f})"
                 )
+                if self.correlations is not None:
+                    correlated = self.correlations.correlated_pairs(timeframe, strategy['pair'])
+                    if correlated:
+                        message_lines.append(
+                            "   Correlacionado con: " + ", ".join(f"{pair} ({corr:+.2f})" for pair, corr in correlated[:3])
+                        )
                 message_lines.append("")
 
             message_lines.extend([
@@ -426,9 +435,9 @@ class AlertSystem:
 
 
 # Función de utilidad
-def create_alert_system() -> AlertSystem:
+def create_alert_system(correlations=None) -> AlertSystem:
     """Crear instancia del sistema de alertas"""
-    return AlertSystem()
+    return AlertSystem(correlations)
 
 
 # Test del sistema de alertas
@@ -15,6 +15,7 @@ except ImportError:
     pass
 
 from supabase_client import create_supabase_client
+from strategy_catalog import StrategyCatalog, load_strategy_catalog
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -25,12 +26,13 @@ class MissingStrategyCompleter:
     
     def __init__(self):
         self.db_client = create_supabase_client()
+        self.catalog = StrategyCatalog()
     
     def get_existing_strategies(self) -> List[Dict[str, Any]]:
         """Obtener estrategias existentes de 1d"""
         try:
-            all_strategies = self.db_client.get_recent_strategies(limit=1000)
-            day_strategies = [s for s in all_strategies if s.get('timeframe') == '1d']
+            self.catalog = load_strategy_catalog(self.db_client, timeframe='1d')
+            day_strategies = list(self.catalog)
             logger.info(f"📊 Obtenidas {len(day_strategies)} estrategias de 1d")
             return day_strategies
         except Exception as e:
@@ -121,15 +123,9 @@ class MissingStrategyCompleter:
         
         return rrrr_strategies
     
-    def check_strategy_exists(self, strategy: Dict[str, Any], existing: List[Dict[str, Any]]) -> bool:
+    def check_strategy_exists(self, strategy: Dict[str, Any], existing: StrategyCatalog) -> bool:
         """Verificar si ya existe una estrategia similar"""
-        for existing_strategy in existing:
-            if (existing_strategy['pair'] == strategy['pair'] and
-                existing_strategy['timeframe'] == strategy['timeframe'] and
-                existing_strategy['pattern'] == strategy['pattern'] and
-                existing_strategy['direction'] == strategy['direction']):
-                return True
-        return False
+        return existing.contains(strategy)
     
     def complete_missing_strategies(self, dry_run: bool = True) -> Dict[str, Any]:
         """Completar todas las estrategias faltantes"""
@@ -147,7 +143,7 @@ class MissingStrategyCompleter:
             # VVVV CALL
             vvvv_strategies = self.create_vvvv_strategies(existing_strategies)
             for strategy in vvvv_strategies:
-                if not self.check_strategy_exists(strategy, existing_strategies):
+                if not self.check_strategy_exists(strategy, self.catalog):
                     new_strategies.append(strategy)
                 else:
                     logger.info(f"⚠️ VVVV CALL ya existe para {strategy['pair']}")
@@ -155,7 +151,7 @@ class MissingStrategyCompleter:
             # RRRR PUT
             rrrr_strategies = self.create_rrrr_strategies(existing_strategies)
             for strategy in rrrr_strategies:
-                if not self.check_strategy_exists(strategy, existing_strategies):
+                if not self.check_strategy_exists(strategy, self.catalog):
                     new_strategies.append(strategy)
                 else:
                     logger.info(f"⚠️ RRRR PUT ya existe para {strategy['pair']}")
@@ -174,12 +170,11 @@ class MissingStrategyCompleter:
             if not dry_run and new_strategies:
                 logger.info(f"💾 Insertando {len(new_strategies)} estrategias faltantes...")
                 
-                for strategy in new_strategies:
-                    if self.db_client.insert_strategy(strategy):
-                        inserted_count += 1
-                        logger.info(f"✅ {strategy['pattern']} {strategy['direction']} insertada para {strategy['pair']}")
-                    else:
-                        logger.error(f"❌ Error insertando {strategy['pattern']} {strategy['direction']} para {strategy['pair']}")
+                report = self.catalog.bulk_upsert(self.db_client, new_strategies)
+                inserted_count = report['inserted']
+                for failure in report['failed']:
+                    record = failure['record']
+                    logger.error(f"❌ Error insertando {record.get('pattern')} {record.get('direction')} para {record.get('pair')}: {failure['error']}")
             
             # Resultados
             results = {
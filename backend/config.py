@@ -165,15 +165,34 @@ PATTERN_CONFIG = {
         'enabled': False,  # Para futuro desarrollo
         'rsi_period': 14,
         'ma_periods': [20, 50, 200],
-        'bollinger_period': 20
+        'bollinger_period': 20,
+        'bollinger_std': 2.0,
+        'rsi_oversold': 30,
+        'rsi_overbought': 70
     },
     'price_action': {
         'enabled': False,  # Para futuro
         'min_body_size': 0.0001,  # Mínimo tamaño del cuerpo de vela
-        'doji_threshold': 0.1  # % para considerar doji
+        'doji_threshold': 0.1,  # % para considerar doji
+        'big_body_ratio': 0.6,  # Cuerpo / rango para considerar vela grande
+        'range_window': 20  # Velas del rango estimado cuando no hay high/low
     }
 }
 
+# Secuencias R/V por timeframe (multi_timeframe_analyzer y su validación walk-forward);
+# max_length limita la longitud en timeframes con pocas velas
+MULTI_TIMEFRAME_CONFIG = {
+    "1min": {"min_occurrences": 100, "effectiveness_threshold": 0.70, "min_records": 1000},
+    "5min": {"min_occurrences": 50, "effectiveness_threshold": 0.68, "min_records": 500},
+    "15min": {"min_occurrences": 50, "effectiveness_threshold": 0.65, "min_records": 1000},
+    "30min": {"min_occurrences": 40, "effectiveness_threshold": 0.65, "min_records": 1000},
+    "1h": {"min_occurrences": 30, "effectiveness_threshold": 0.65, "min_records": 1000},
+    "4h": {"min_occurrences": 20, "effectiveness_threshold": 0.67, "min_records": 500, "max_length": 4},
+    "1d": {"min_occurrences": 15, "effectiveness_threshold": 0.70, "min_records": 100, "max_length": 3},
+    "1w": {"min_occurrences": 8, "effectiveness_threshold": 0.75, "min_records": 50, "max_length": 3},
+    "1M": {"min_occurrences": 5, "effectiveness_threshold": 0.80, "min_records": 20, "max_length": 3}
+}
+
 # Configuración de logging
 LOGGING_CONFIG = {
     'level': 'INFO',  # DEBUG, INFO, WARNING, ERROR
@@ -188,12 +207,18 @@ PERFORMANCE_CONFIG = {
     'max_concurrent_requests': 3,  # Requests simultáneos a APIs
     'request_delay': 1.0,  # Segundos entre requests
     'chunk_size': 100,  # Registros por lote en DB
+    'write_behind': True,  # Encolar inserts de SupabaseClient y enviarlos por lotes
+    'flush_interval': 5.0,  # Segundos máximos que un registro espera en cola
     'memory_limit_mb': 500,  # Límite de memoria
     'execution_timeout': 900,  # 15 minutos máximo por análisis
     'cache_enabled': True,
     'cache_ttl': 3600  # 1 hora de cache
 }
 
+# Estado local entre ejecuciones (autómatas de señales, checkpoints de retención).
+# Fuera del workspace: actions/checkout limpia el directorio de trabajo en cada run
+STATE_DIR = os.getenv('FOREX_STATE_DIR', str(Path.home() / '.forex_trading_system'))
+
 # Mapeo de símbolos para diferentes APIs
 SYMBOL_MAPPING = {
     'alpha_vantage': {
@@ -264,6 +289,12 @@ def get_enabled_patterns() -> List[str]:
     return []
 
 
+def get_state_path(filename: str) -> str:
+    """Ruta de un archivo de estado persistente (crea STATE_DIR si no existe)"""
+    os.makedirs(STATE_DIR, exist_ok=True)
+    return os.path.join(STATE_DIR, filename)
+
+
 def is_production() -> bool:
     """Detecta si está ejecutándose en GitHub Actions (producción)"""
     return os.getenv('GITHUB_ACTIONS') == 'true'
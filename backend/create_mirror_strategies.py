@@ -15,6 +15,7 @@ except ImportError:
     pass
 
 from supabase_client import create_supabase_client
+from strategy_catalog import StrategyCatalog, load_strategy_catalog
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -25,11 +26,13 @@ class MirrorStrategyCreator:
     
     def __init__(self):
         self.db_client = create_supabase_client()
+        self.catalog = StrategyCatalog()
     
     def get_existing_strategies(self) -> List[Dict[str, Any]]:
-        """Obtener todas las estrategias existentes"""
+        """Obtener todas las estrategias existentes (cargadas una vez en el catálogo)"""
         try:
-            strategies = self.db_client.get_recent_strategies(limit=1000)
+            self.catalog = load_strategy_catalog(self.db_client)
+            strategies = list(self.catalog)
             logger.info(f"📊 Obtenidas {len(strategies)} estrategias existentes")
             return strategies
         except Exception as e:
@@ -95,14 +98,9 @@ class MirrorStrategyCreator:
         logger.info(f"🔍 {len(candidates)} estrategias verdes candidatas para espejo")
         return candidates
     
-    def check_mirror_exists(self, mirror: Dict[str, Any], existing: List[Dict[str, Any]]) -> bool:
-        """Verificar si ya existe una estrategia espejo similar"""
-        for strategy in existing:
-            if (strategy['pair'] == mirror['pair'] and
-                strategy['timeframe'] == mirror['timeframe'] and
-                strategy['pattern'] == mirror['pattern']):
-                return True
-        return False
+    def check_mirror_exists(self, mirror: Dict[str, Any], existing: StrategyCatalog) -> bool:
+        """Verificar si ya existe una estrategia espejo similar (cualquier dirección)"""
+        return existing.exists(mirror['pair'], mirror['timeframe'], mirror['pattern'])
     
     def create_all_mirrors(self, dry_run: bool = True) -> Dict[str, Any]:
         """Crear todas las estrategias espejo"""
@@ -127,7 +125,7 @@ class MirrorStrategyCreator:
                     continue
                 
                 # Verificar si ya existe
-                if self.check_mirror_exists(mirror, existing_strategies):
+                if self.check_mirror_exists(mirror, self.catalog):
                     skipped_mirrors.append(f"{mirror['pair']} {mirror['pattern']}")
                     continue
                 
@@ -143,11 +141,10 @@ class MirrorStrategyCreator:
             if not dry_run and created_mirrors:
                 logger.info(f"💾 Insertando {len(created_mirrors)} estrategias espejo...")
                 
-                for mirror in created_mirrors:
-                    if self.db_client.insert_strategy(mirror):
-                        inserted_count += 1
-                    else:
-                        logger.error(f"❌ Error insertando {mirror['pair']} {mirror['pattern']}")
+                report = self.catalog.bulk_upsert(self.db_client, created_mirrors)
+                inserted_count = report['inserted']
+                for failure in report['failed']:
+                    logger.error(f"❌ Error insertando {failure['record'].get('pair')} {failure['record'].get('pattern')}: {failure['error']}")
             
             # Resultados
             results = {
@@ -0,0 +1,174 @@
+# backend/db_connection.py - Cliente Supabase compartido con reintentos y conexiones reutilizadas
+import time
+import random
+import logging
+import threading
+from typing import Dict, Any, Callable, Tuple
+
+from supabase import create_client
+
+try:
+    from supabase import ClientOptions
+except ImportError:
+    ClientOptions = None
+
+try:
+    import httpx
+
+    TRANSIENT_EXCEPTIONS = (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError,
+                            ConnectionError, TimeoutError)
+    # Fallos antes de enviar el request: el servidor no llegó a procesarlo
+    CONNECT_EXCEPTIONS = (httpx.ConnectError, httpx.ConnectTimeout, ConnectionRefusedError)
+except ImportError:
+    TRANSIENT_EXCEPTIONS = (ConnectionError, TimeoutError)
+    CONNECT_EXCEPTIONS = (ConnectionRefusedError,)
+
+from config import SUPABASE_CONFIG
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+TRANSIENT_STATUS = {408, 429, 500, 502, 503, 504}
+
+# Funciones RPC de solo lectura (se reintentan como un select)
+IDEMPOTENT_RPCS = {'strategy_stats'}
+
+
+def _status_code(error: Exception):
+    response = getattr(error, 'response', None)
+    for value in (getattr(error, 'status_code', None), getattr(response, 'status_code', None),
+                  getattr(error, 'code', None)):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Errores que vale la pena reintentar: red, timeouts, 429 y 5xx"""
+    if isinstance(error, TRANSIENT_EXCEPTIONS):
+        return True
+    return _status_code(error) in TRANSIENT_STATUS
+
+
+def is_unsent_error(error: Exception) -> bool:
+    """Errores en los que el request seguro no se aplicó: conexión fallida o 429"""
+    return isinstance(error, CONNECT_EXCEPTIONS) or _status_code(error) == 429
+
+
+class RetryPolicy:
+    """Reintentos con backoff exponencial y jitter sobre errores transitorios
+
+    Las operaciones no idempotentes (insert, upsert sin on_conflict, RPC
+    fuera de IDEMPOTENT_RPCS) solo se reintentan si el request no llegó a
+    enviarse: tras un timeout de lectura el insert pudo aplicarse y
+    repetirlo crearía duplicados.
+    """
+
+    def __init__(self, max_retries: int = None, retry_delay: float = None, max_delay: float = 30.0):
+        self.max_retries = max_retries if max_retries is not None else SUPABASE_CONFIG.get('max_retries', 3)
+        self.retry_delay = retry_delay if retry_delay is not None else SUPABASE_CONFIG.get('retry_delay', 1)
+        self.max_delay = max_delay
+
+    def run(self, func: Callable[[], Any], idempotent: bool = True) -> Any:
+        attempt = 0
+        while True:
+            try:
+                return func()
+            except Exception as e:
+                retryable = is_transient_error(e) if idempotent else is_unsent_error(e)
+                if attempt >= self.max_retries or not retryable:
+                    raise
+
+                delay = min(self.retry_delay * 2 ** attempt, self.max_delay) * random.uniform(0.5, 1.0)
+                attempt += 1
+                logger.warning(f"⚠️ Error transitorio de Supabase ({e}); reintento {attempt}/{self.max_retries} "
+                               f"en {delay:.1f}s")
+                time.sleep(delay)
+
+
+class RetryingQuery:
+    """Envuelve un query builder de postgrest: execute() pasa por la política de reintentos
+
+    Recuerda si la operación es idempotente (select, update, delete,
+    upsert con on_conflict) para decidir qué errores reintentar.
+    """
+
+    def __init__(self, builder, policy: RetryPolicy, idempotent: bool = True):
+        self._builder = builder
+        self._policy = policy
+        self._idempotent = idempotent
+
+    def execute(self):
+        return self._policy.run(self._builder.execute, self._idempotent)
+
+    def _wrap(self, value, idempotent: bool):
+        return RetryingQuery(value, self._policy, idempotent) if hasattr(value, 'execute') else value
+
+    def __getattr__(self, name):
+        attr = getattr(self._builder, name)
+        if not callable(attr):
+            return self._wrap(attr, self._idempotent)  # p. ej. la propiedad .not_
+
+        def call(*args, **kwargs):
+            idempotent = self._idempotent
+            if name == 'insert':
+                idempotent = False
+            elif name == 'upsert':
+                idempotent = bool(kwargs.get('on_conflict'))
+            return self._wrap(attr(*args, **kwargs), idempotent)
+        return call
+
+
+class RetryingClient:
+    """Cliente Supabase con reintentos en table()/from_()/rpc(); el resto se delega"""
+
+    def __init__(self, client, policy: RetryPolicy = None):
+        self.client = client
+        self.policy = policy or RetryPolicy()
+
+    def table(self, name: str) -> RetryingQuery:
+        return RetryingQuery(self.client.table(name), self.policy)
+
+    def from_(self, name: str) -> RetryingQuery:
+        return self.table(name)
+
+    def rpc(self, name: str, params: Dict[str, Any] = None) -> RetryingQuery:
+        return RetryingQuery(self.client.rpc(name, params or {}), self.policy, name in IDEMPOTENT_RPCS)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+_shared_clients: Dict[Tuple[str, str], RetryingClient] = {}
+_shared_lock = threading.Lock()
+
+
+def _client_options(timeout: float):
+    if ClientOptions is None:
+        return None
+    try:
+        return ClientOptions(postgrest_client_timeout=timeout)
+    except TypeError:
+        return None
+
+
+def get_shared_client(url: str = None, key: str = None) -> RetryingClient:
+    """Cliente único por proceso y (url, key)
+
+    Un solo cliente reutiliza el pool HTTP keep-alive de httpx entre todos
+    los módulos en lugar de abrir una conexión TLS por script/instancia.
+    """
+    url = url or SUPABASE_CONFIG['url']
+    key = key or SUPABASE_CONFIG['key']
+    if not url or not key:
+        raise ValueError("SUPABASE_URL y SUPABASE_KEY son requeridos")
+
+    with _shared_lock:
+        if (url, key) not in _shared_clients:
+            options = _client_options(SUPABASE_CONFIG.get('timeout', 30))
+            client = create_client(url, key, options) if options is not None else create_client(url, key)
+            _shared_clients[(url, key)] = RetryingClient(client)
+            logger.info("✅ Cliente Supabase compartido creado")
+        return _shared_clients[(url, key)]
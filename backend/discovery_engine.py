@@ -0,0 +1,272 @@
+# backend/discovery_engine.py - Descubrimiento de patrones para todos los pares y timeframes
+import os
+import sys
+import json
+import logging
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional
+
+from config import CURRENCY_PAIRS
+from db_connection import get_shared_client
+from streaming_discovery import StreamingPatternDiscovery, stream_candle_chunks
+from supabase_client import create_supabase_client
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+DISCOVERY_TIMEFRAMES = ['1min', '5min', '15min', '30min', '1h', '4h', '1d']
+
+# strict: umbrales altos para un par/timeframe con mucha historia; relaxed: umbrales amplios
+DISCOVERY_PROFILES = {
+    'strict': {
+        'sequence_min_occurrences': 100, 'sequence_threshold': 0.75,
+        'fragment_min_occurrences': 200, 'fragment_threshold': 0.70,
+        'hourly_min_occurrences': 500, 'hourly_threshold': 0.65, 'hourly_min_day_occurrences': 20
+    },
+    'relaxed': {
+        'sequence_min_occurrences': 20, 'sequence_threshold': 0.65,
+        'fragment_min_occurrences': 50, 'fragment_threshold': 0.60,
+        'hourly_min_occurrences': 100, 'hourly_threshold': 0.55, 'hourly_min_day_occurrences': 10
+    }
+}
+
+FRAGMENT_SIZES = [5, 10, 15, 30, 60]
+
+
+def discover_series(pair: str, timeframe: str, profile: Dict[str, Any], min_length: int = 2,
+                    max_length: int = 6, start_date: Optional[str] = None, batch_size: int = 1000,
+                    client=None) -> Optional[Dict[str, Any]]:
+    """Secuencias, fragmentos y patrones horarios de una serie, leída por trozos
+
+    Función de módulo para poder ejecutarse en un proceso aparte: cada
+    proceso pagina forex_candles con su propio cliente y suma cada trozo a
+    los contadores, así en memoria solo hay un trozo y los conteos (exactos,
+    con solape de k-1 velas entre trozos). None si la serie no tiene velas.
+    """
+    client = client or get_shared_client()
+    discovery = StreamingPatternDiscovery(min_length, max_length)
+    for chunk in stream_candle_chunks(client, pair, timeframe, start_date, batch_size):
+        discovery.update(chunk)
+
+    if discovery.n_candles == 0:
+        return None
+
+    return {
+        'n_candles': discovery.n_candles,
+        'sequences': discovery.effective_sequences(profile['sequence_min_occurrences'], profile['sequence_threshold']),
+        'fragments': discovery.effective_fragments(FRAGMENT_SIZES, profile['fragment_min_occurrences'],
+                                                   profile['fragment_threshold']),
+        'hourly': discovery.hourly_patterns(profile['hourly_min_occurrences'], profile['hourly_threshold'],
+                                            profile['hourly_min_day_occurrences'])
+    }
+
+
+def build_strategy_records(pair: str, timeframe: str, patterns: Dict[str, Dict],
+                           discovered_at: str = None) -> List[Dict[str, Any]]:
+    """Registros para forex_strategies_master (mismo formato que save_strategy_to_master)"""
+    discovered_at = discovered_at or datetime.now().isoformat()
+    strategies = []
+
+    for seq_data in patterns['sequences'].values():
+        strategies.append({
+            'type': 'sequence',
+            'name': f"SEQ_{seq_data['length']}velas_{seq_data['effectiveness']:.0%}_{seq_data['occurrences']}occ",
+            'pattern': seq_data,
+            'effectiveness': seq_data['effectiveness'],
+            'occurrences': seq_data['occurrences'],
+            'bias': seq_data['bias'],
+            'description': f"Secuencia {seq_data['sequence']} -> {seq_data['bias']} ({seq_data['effectiveness']:.1%}, {seq_data['occurrences']} ocurrencias)"
+        })
+
+    for frag_data in patterns['fragments'].values():
+        strategies.append({
+            'type': 'time_fragment',
+            'name': f"FRAG_{frag_data['fragment_size']}min_{frag_data['start_minute']:02d}-{frag_data['end_minute']:02d}_{frag_data['effectiveness']:.0%}",
+            'pattern': frag_data,
+            'effectiveness': frag_data['effectiveness'],
+            'occurrences': frag_data['total_candles'],
+            'bias': frag_data['bias'],
+            'description': f"Minutos {frag_data['start_minute']:02d}-{frag_data['end_minute']:02d} -> {frag_data['bias']} ({frag_data['effectiveness']:.1%}, {frag_data['total_candles']:,} velas)"
+        })
+
+    for hour, hour_data in patterns['hourly'].items():
+        strategies.append({
+            'type': 'hourly',
+            'name': f"HOUR_{hour:02d}_{hour_data['effectiveness']:.0%}_{hour_data['total_candles']}velas",
+            'pattern': hour_data,
+            'effectiveness': hour_data['effectiveness'],
+            'occurrences': hour_data['total_candles'],
+            'bias': hour_data['bias'],
+            'description': f"Hora {hour:02d}:xx -> {hour_data['bias']} ({hour_data['effectiveness']:.1%}, {hour_data['total_candles']:,} velas)"
+        })
+
+    return [{
+        'pair': pair,
+        'timeframe': timeframe,
+        'strategy_type': strategy['type'],
+        'strategy_name': strategy['name'],
+        'pattern_data': json.dumps(strategy['pattern']),
+        'effectiveness': strategy['effectiveness'],
+        'occurrences': strategy['occurrences'],
+        'bias': strategy['bias'],
+        'discovered_at': discovered_at,
+        'status': 'discovered',
+        'description': strategy['description']
+    } for strategy in strategies]
+
+
+class PatternDiscoveryEngine:
+    """Descubrimiento de patrones para conjuntos de pares y timeframes
+
+    Cada par/timeframe es una tarea de un proceso: lee su serie por trozos
+    (keyset por datetime) y la suma a SequenceCounter y TimeBucketCube, sin
+    cargar el histórico completo. Los resultados se guardan con un único
+    upsert por lotes.
+    """
+
+    def __init__(self, db_client=None, profile: str = 'strict', max_workers: int = None,
+                 min_length: int = 2, max_length: int = 6, days_back: Optional[int] = None):
+        if profile not in DISCOVERY_PROFILES:
+            raise ValueError(f"Perfil de descubrimiento no válido: {profile}")
+
+        self.db_client = db_client or create_supabase_client()
+        self.profile = DISCOVERY_PROFILES[profile]
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.min_length = min_length
+        self.max_length = max_length
+        self.days_back = days_back
+
+    def _start_date(self) -> Optional[str]:
+        if self.days_back is None:
+            return None
+        return (datetime.now() - timedelta(days=self.days_back)).isoformat()
+
+    def run(self, pairs: List[str] = None, timeframes: List[str] = None, save: bool = True) -> List[Dict[str, Any]]:
+        """Descubrir patrones en todas las combinaciones par/timeframe"""
+        pairs = pairs or CURRENCY_PAIRS
+        timeframes = timeframes or DISCOVERY_TIMEFRAMES
+        combos = [(pair, timeframe) for pair in pairs for timeframe in timeframes]
+        args = (self.profile, self.min_length, self.max_length, self._start_date())
+        discovered_at = datetime.now().isoformat()
+
+        if self.max_workers > 1 and len(combos) > 1:
+            # Cada proceso usa su propio cliente compartido (get_shared_client)
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(combos))) as executor:
+                pending = [(combo, executor.submit(discover_series, *combo, *args)) for combo in combos]
+                results = []
+                for combo, future in pending:
+                    try:
+                        results.append((combo, future.result()))
+                    except Exception as e:
+                        logger.error(f"Error descubriendo {combo[0]} {combo[1]}: {e}")
+        else:
+            results = []
+            for combo in combos:
+                try:
+                    results.append((combo, discover_series(*combo, *args, client=self.db_client.client)))
+                except Exception as e:
+                    logger.error(f"Error descubriendo {combo[0]} {combo[1]}: {e}")
+
+        records = []
+        analyzed = 0
+        for (pair, timeframe), patterns in results:
+            if patterns is None:
+                continue
+            analyzed += 1
+            pair_records = build_strategy_records(pair, timeframe, patterns, discovered_at)
+            records.extend(pair_records)
+            logger.info(f"{pair} {timeframe}: {patterns['n_candles']} velas, {len(pair_records)} estrategias")
+
+        logger.info(f"Series analizadas: {analyzed}/{len(combos)}")
+
+        if save and records:
+            self.save_strategies(records)
+
+        return records
+
+    def save_strategies(self, records: List[Dict[str, Any]], chunk_size: int = 1000) -> int:
+        """Upsert por lotes en forex_strategies_master"""
+        # Un mismo lote no puede tocar dos veces la misma fila: gana el último (como el guardado uno a uno)
+        unique = {}
+        for record in records:
+            unique[(record['pair'], record['timeframe'], record['strategy_name'])] = record
+        records = list(unique.values())
+
+        saved = 0
+        for start in range(0, len(records), chunk_size):
+            batch = records[start:start + chunk_size]
+            try:
+                self.db_client.client.table("forex_strategies_master") \
+                    .upsert(batch, on_conflict="pair,timeframe,strategy_name") \
+                    .execute()
+                saved += len(batch)
+            except Exception as e:
+                logger.error(f"Error guardando lote de estrategias: {e}")
+
+        logger.info(f"Estrategias guardadas: {saved}/{len(records)}")
+        return saved
+
+
+def create_discovery_engine(db_client=None, profile: str = 'strict', max_workers: int = None,
+                            days_back: Optional[int] = None) -> PatternDiscoveryEngine:
+    """Crea una instancia del motor de descubrimiento"""
+    return PatternDiscoveryEngine(db_client, profile, max_workers, days_back=days_back)
+
+
+def parse_args(args: List[str]) -> Dict[str, Any]:
+    """Pares, timeframes, perfil y días a partir de sys.argv (ver main)"""
+    options = {'pairs': [], 'timeframes': [], 'profile': 'strict', 'days_back': None}
+    for arg in args:
+        if arg in DISCOVERY_PROFILES:
+            options['profile'] = arg
+        elif arg in DISCOVERY_TIMEFRAMES:
+            options['timeframes'].append(arg)
+        elif arg.startswith('--days='):
+            options['days_back'] = int(arg.split('=', 1)[1])
+        elif arg.upper() in CURRENCY_PAIRS:
+            options['pairs'].append(arg.upper())
+        else:
+            raise ValueError(f"Argumento no reconocido: {arg}")
+    return options
+
+
+def main():
+    """Uso: python discovery_engine.py [strict|relaxed] [--days=N] [PAR ...] [TIMEFRAME ...]
+
+    Sin pares/timeframes analiza todos. Ejemplos: `EURUSD 1min --days=90`
+    y `relaxed AUDJPY 1h`. Las secuencias R/V por timeframe (incluidos 1w
+    y 1M) del master siguen en multi_timeframe_analyzer.py.
+    """
+    logging.basicConfig(level=logging.INFO)
+
+    try:
+        options = parse_args(sys.argv[1:])
+    except ValueError as e:
+        print(f"❌ {e}")
+        print(main.__doc__)
+        return
+
+    pairs = options['pairs'] or CURRENCY_PAIRS
+    timeframes = options['timeframes'] or DISCOVERY_TIMEFRAMES
+
+    print("🔍 DESCUBRIMIENTO DE PATRONES")
+    print(f"Pares: {len(pairs)} | Timeframes: {', '.join(timeframes)} | Perfil: {options['profile']}")
+
+    engine = create_discovery_engine(profile=options['profile'], days_back=options['days_back'])
+    start_time = datetime.now()
+    records = engine.run(pairs, timeframes)
+    duration = (datetime.now() - start_time).total_seconds()
+
+    print(f"\n📊 Estrategias descubiertas: {len(records)}")
+    print(f"⏱️ Duración: {duration:.1f} segundos")
+
+    if records:
+        print("\n🏆 TOP 10 MEJORES ESTRATEGIAS:")
+        for i, record in enumerate(sorted(records, key=lambda r: r['effectiveness'], reverse=True)[:10], 1):
+            print(f"{i:2d}. {record['pair']} {record['timeframe']} {record['strategy_name']} - "
+                  f"{record['effectiveness']:.1%} ({record['occurrences']} ocurrencias)")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,7 @@ except ImportError:
     pass
 
 from supabase_client import create_supabase_client
+from strategy_catalog import StrategyCatalog, load_strategy_catalog
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -38,14 +39,14 @@ class TimeframeExpander:
     
     def __init__(self):
         self.db_client = create_supabase_client()
+        self.catalog = StrategyCatalog()
     
     def get_base_strategies(self) -> List[Dict[str, Any]]:
         """Obtener estrategias base (solo 1d por ahora)"""
         try:
-            all_strategies = self.db_client.get_recent_strategies(limit=1000)
-            
-            # Filtrar solo estrategias de 1d
-            base_strategies = [s for s in all_strategies if s.get('timeframe') == '1d']
+            # Una sola carga: sirve como base (1d) y para detectar duplicados
+            self.catalog = load_strategy_catalog(self.db_client)
+            base_strategies = self.catalog.select(timeframe='1d')
             
             logger.info(f"📊 Obtenidas {len(base_strategies)} estrategias base de 1d")
             return base_strategies
@@ -92,15 +93,9 @@ class TimeframeExpander:
         
         return variant
     
-    def check_variant_exists(self, variant: Dict[str, Any], existing: List[Dict[str, Any]]) -> bool:
+    def check_variant_exists(self, variant: Dict[str, Any], existing: StrategyCatalog) -> bool:
         """Verificar si ya existe una variante similar"""
-        for strategy in existing:
-            if (strategy['pair'] == variant['pair'] and
-                strategy['timeframe'] == variant['timeframe'] and
-                strategy['pattern'] == variant['pattern'] and
-                strategy['direction'] == variant['direction']):
-                return True
-        return False
+        return existing.contains(variant)
     
     def expand_all_timeframes(self, dry_run: bool = True) -> Dict[str, Any]:
         """Expandir todas las estrategias a múltiples temporalidades"""
@@ -113,9 +108,6 @@ class TimeframeExpander:
                 logger.error("❌ No se encontraron estrategias base")
                 return {'error': 'No se encontraron estrategias base'}
             
-            # Obtener estrategias existentes para verificar duplicados
-            all_existing = self.db_client.get_recent_strategies(limit=2000)
-            
             created_variants = []
             skipped_variants = []
             
@@ -130,7 +122,7 @@ class TimeframeExpander:
                         continue
                     
                     # Verificar si ya existe
-                    if self.check_variant_exists(variant, all_existing):
+                    if self.check_variant_exists(variant, self.catalog):
                         skipped_variants.append(f"{variant['pair']} {variant['timeframe']} {variant['pattern']}")
                         continue
                     
@@ -144,18 +136,14 @@ class TimeframeExpander:
             if not dry_run and created_variants:
                 logger.info(f"💾 Insertando {len(created_variants)} variantes de temporalidad...")
                 
-                # Insertar en lotes para mejor rendimiento
-                batch_size = 50
-                for i in range(0, len(created_variants), batch_size):
-                    batch = created_variants[i:i+batch_size]
-                    
-                    for variant in batch:
-                        if self.db_client.insert_strategy(variant):
-                            inserted_count += 1
-                        else:
-                            logger.error(f"❌ Error insertando {variant['pair']} {variant['timeframe']} {variant['pattern']}")
-                    
-                    logger.info(f"📦 Lote {i//batch_size + 1}: {len(batch)} variantes procesadas")
+                # Lotes concurrentes; las filas rechazadas se reportan sin perder el resto
+                report = self.catalog.bulk_upsert(self.db_client, created_variants)
+                inserted_count = report['inserted']
+                for failure in report['failed']:
+                    record = failure['record']
+                    logger.error(f"❌ Error insertando {record.get('pair')} {record.get('timeframe')} {record.get('pattern')}: {failure['error']}")
+                
+                logger.info(f"📦 {report['batches']} lotes, {report['requests']} requests")
             
             # Resultados
             results = {
@@ -15,6 +15,7 @@ except ImportError:
     pass
 
 from supabase_client import create_supabase_client
+from strategy_catalog import StrategyCatalog, load_strategy_catalog
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -45,31 +46,16 @@ class StrategyBalanceFixer:
     def get_existing_strategies(self) -> List[Dict[str, Any]]:
         """Obtener estrategias existentes de 1d"""
         try:
-            all_strategies = self.db_client.get_recent_strategies(limit=1000)
-            day_strategies = [s for s in all_strategies if s.get('timeframe') == '1d']
+            day_strategies = list(load_strategy_catalog(self.db_client, timeframe='1d'))
             logger.info(f"📊 Obtenidas {len(day_strategies)} estrategias de 1d")
             return day_strategies
         except Exception as e:
             logger.error(f"❌ Error obteniendo estrategias: {e}")
             return []
     
-    def organize_existing_strategies(self, strategies: List[Dict[str, Any]]) -> Dict[str, Dict[str, Dict[str, Any]]]:
-        """Organizar estrategias existentes por patrón, dirección y par"""
-        organized = {}
-        
-        for strategy in strategies:
-            pattern = strategy['pattern']
-            direction = strategy['direction']
-            pair = strategy['pair']
-            
-            if pattern not in organized:
-                organized[pattern] = {}
-            if direction not in organized[pattern]:
-                organized[pattern][direction] = {}
-            
-            organized[pattern][direction][pair] = strategy
-        
-        return organized
+    def organize_existing_strategies(self, strategies: List[Dict[str, Any]]) -> StrategyCatalog:
+        """Indexar estrategias existentes por (par, timeframe, patrón, dirección)"""
+        return StrategyCatalog(strategies)
     
     def create_missing_strategy(self, pattern: str, direction: str, pair: str, 
                               reference_strategy: Dict[str, Any] = None) -> Dict[str, Any]:
@@ -118,30 +104,26 @@ class StrategyBalanceFixer:
         
         return strategy
     
-    def find_best_reference(self, organized: Dict, pattern: str, direction: str) -> Dict[str, Any]:
+    def find_best_reference(self, organized: StrategyCatalog, pattern: str, direction: str) -> Dict[str, Any]:
         """Encontrar la mejor estrategia de referencia para crear una faltante"""
         
-        # Primero intentar mismo patrón, misma dirección
-        if pattern in organized and direction in organized[pattern]:
-            strategies = list(organized[pattern][direction].values())
-            if strategies:
-                # Retornar la de mayor efectividad
-                return max(strategies, key=lambda s: s['effectiveness'])
+        # Primero intentar mismo patrón, misma dirección (la de mayor efectividad)
+        reference = organized.best(pattern, direction)
+        if reference:
+            return reference
         
         # Si no, intentar mismo patrón, dirección opuesta
         opposite_direction = 'PUT' if direction == 'CALL' else 'CALL'
-        if pattern in organized and opposite_direction in organized[pattern]:
-            strategies = list(organized[pattern][opposite_direction].values())
-            if strategies:
-                return max(strategies, key=lambda s: s['effectiveness'])
+        reference = organized.best(pattern, opposite_direction)
+        if reference:
+            return reference
         
         # Si no, intentar patrón similar (misma longitud)
-        pattern_length = len(pattern)
-        for other_pattern, pattern_data in organized.items():
-            if len(other_pattern) == pattern_length and direction in pattern_data:
-                strategies = list(pattern_data[direction].values())
-                if strategies:
-                    return max(strategies, key=lambda s: s['effectiveness'])
+        for other_pattern in organized.by_pattern:
+            if len(other_pattern) == len(pattern):
+                reference = organized.best(other_pattern, direction)
+                if reference:
+                    return reference
         
         # Si no hay nada, retornar None
         return None
@@ -169,9 +151,7 @@ class StrategyBalanceFixer:
                     for pair in self.ALL_PAIRS:
                         
                         # Verificar si existe
-                        exists = (pattern in organized and 
-                                direction in organized[pattern] and 
-                                pair in organized[pattern][direction])
+                        exists = organized.exists(pair, '1d', pattern, direction)
                         
                         if not exists:
                             # Encontrar referencia
@@ -201,11 +181,11 @@ class StrategyBalanceFixer:
             if not dry_run and missing_strategies:
                 logger.info(f"💾 Insertando {len(missing_strategies)} estrategias faltantes...")
                 
-                for strategy in missing_strategies:
-                    if self.db_client.insert_strategy(strategy):
-                        inserted_count += 1
-                    else:
-                        logger.error(f"❌ Error insertando {strategy['pattern']} {strategy['direction']} {strategy['pair']}")
+                report = organized.bulk_upsert(self.db_client, missing_strategies)
+                inserted_count = report['inserted']
+                for failure in report['failed']:
+                    record = failure['record']
+                    logger.error(f"❌ Error insertando {record.get('pattern')} {record.get('direction')} {record.get('pair')}: {failure['error']}")
             
             # Resultados
             results = {
@@ -251,9 +231,7 @@ class StrategyBalanceFixer:
                     missing_pairs = []
                     
                     for pair in self.ALL_PAIRS:
-                        exists = (pattern in organized and 
-                                direction in organized[pattern] and 
-                                pair in organized[pattern][direction])
+                        exists = organized.exists(pair, '1d', pattern, direction)
                         
                         if exists:
                             existing_pairs.append(pair)
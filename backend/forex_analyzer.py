@@ -3,6 +3,7 @@ import os
 import sys
 import time
 import logging
+import pandas as pd
 from datetime import datetime, timezone, timedelta
 from typing import List, Dict, Any
 from pathlib import Path
@@ -16,11 +17,15 @@ except ImportError:
     print("python-dotenv no instalado, usando variables de sistema")
 
 # Imports locales
-from config import TIMEFRAMES_CONFIG, CURRENCY_PAIRS, validate_config, get_active_timeframes, is_production
+from config import TIMEFRAMES_CONFIG, CURRENCY_PAIRS, validate_config, get_active_timeframes, is_production, get_state_path
 from data_collector import create_data_collector
 from pattern_detector import create_pattern_detector
+from markov_tables import create_transition_store
 from supabase_client import create_supabase_client
 from alert_system import create_alert_system
+from pair_correlation import create_correlation_registry
+from strategy_stats import fetch_strategy_stats
+from table_backup import backup_tables
 
 # Configurar logging
 log_level = logging.DEBUG if not is_production() else logging.INFO
@@ -36,8 +41,14 @@ class ForexAnalyzer:
     def __init__(self):
         self.data_collector = create_data_collector()
         self.db_client = create_supabase_client()
-        self.pattern_detector = create_pattern_detector(self.db_client)
-        self.alert_system = create_alert_system()
+        # Tablas de transición persistentes: el master suma solo las velas nuevas de cada ejecución
+        self.pattern_detector = create_pattern_detector(self.db_client,
+                                                        create_transition_store(get_state_path('markov_state')))
+        # Correlaciones por timeframe: se alimentan con los cierres de cada ejecución
+        # y las alertas las usan para señalar pares correlacionados
+        self.correlations = create_correlation_registry(get_state_path('correlation_state'))
+        self.alert_system = create_alert_system(self.correlations)
+        self._correlation_frames: Dict[str, Dict[str, pd.DataFrame]] = {}
         self.force_all = os.getenv('FORCE_ALL_TIMEFRAMES', 'false').lower() == 'true'
         
         # Estadísticas de la sesión
@@ -106,6 +117,10 @@ class ForexAnalyzer:
             
             logger.info(f"Datos obtenidos: {len(historical_data)} velas para {pair} {timeframe}")
             
+            # Cierres para la matriz de correlación (se suman al terminar la ronda de pares)
+            if 'timestamp' in historical_data.columns:
+                self._correlation_frames.setdefault(timeframe, {})[pair] = historical_data[['timestamp', 'close']]
+            
             # Detectar patrones y actualizar base de datos
             patterns = self.pattern_detector.detect_and_update_patterns(pair, timeframe, historical_data)
             
@@ -195,6 +210,9 @@ class ForexAnalyzer:
                     # Pequeña pausa para no sobrecargar APIs
                     time.sleep(1)
         
+        # Actualizar correlaciones con los cierres de todos los pares analizados
+        self._update_correlations()
+        
         # Generar resumen de master
         results['master_summary'] = self._generate_master_summary()
         
@@ -212,6 +230,20 @@ class ForexAnalyzer:
         
         return results
     
+    def _update_correlations(self):
+        """Sumar las velas nuevas de cada timeframe a su matriz y guardar el estado"""
+        if not self._correlation_frames:
+            return
+        try:
+            for timeframe, frames in self._correlation_frames.items():
+                added = self.correlations.update_from_frames(timeframe, frames)
+                logger.info(f"Correlaciones {timeframe}: +{added} velas ({len(frames)} pares)")
+            self.correlations.save()
+        except Exception as e:
+            logger.error(f"Error actualizando correlaciones: {e}")
+        finally:
+            self._correlation_frames = {}
+    
     def run_analysis(self) -> Dict[str, Any]:
         """Método principal de análisis (compatible con versión original)"""
         return self.run_full_analysis_with_accumulation()
@@ -278,35 +310,21 @@ class ForexAnalyzer:
         """Genera resumen del estado actual del master"""
         
         try:
-            # Contar estrategias en master por tipo
-            master_query = self.db_client.client.table('forex_strategies_master').select('strategy_type, is_active').execute()
+            # Conteos por tipo/estado y top 5 en una sola consulta agregada
+            master_stats = fetch_strategy_stats(self.db_client.client, 'forex_strategies_master', top_n=5)
             
-            if not master_query.data:
+            if not master_stats['total_strategies']:
                 return {'error': 'No data in master'}
             
             summary = {
-                'total_strategies': len(master_query.data),
-                'by_type': {},
-                'active_count': 0,
-                'inactive_count': 0
+                'total_strategies': master_stats['total_strategies'],
+                'by_type': master_stats.get('by_strategy_type', {}),
+                'active_count': master_stats.get('active_count', 0),
+                'inactive_count': master_stats.get('inactive_count', 0)
             }
             
-            for record in master_query.data:
-                strategy_type = record['strategy_type']
-                is_active = record['is_active']
-                
-                summary['by_type'][strategy_type] = summary['by_type'].get(strategy_type, 0) + 1
-                
-                if is_active:
-                    summary['active_count'] += 1
-                else:
-                    summary['inactive_count'] += 1
-            
-            # Top estrategias por efectividad
-            top_query = self.db_client.client.table('forex_strategies_master').select('pair, pattern, direction, effectiveness, occurrences').order('effectiveness', desc=True).limit(5).execute()
-            
-            if top_query.data:
-                summary['top_strategies'] = top_query.data
+            if master_stats.get('top_strategies'):
+                summary['top_strategies'] = master_stats['top_strategies']
             
             return summary
             
@@ -375,40 +393,20 @@ class ForexAnalyzer:
     def get_system_statistics(self) -> Dict[str, Any]:
         """Obtiene estadísticas generales del sistema"""
         try:
-            # Contar estrategias activas
-            active_query = self.db_client.client.table('forex_strategies').select('id').execute()
-            active_count = len(active_query.data) if active_query.data else 0
-            
-            # Contar estrategias en master
-            master_query = self.db_client.client.table('forex_strategies_master').select('id').execute()
-            master_count = len(master_query.data) if master_query.data else 0
-            
-            # Obtener estadísticas de efectividad
-            effectiveness_query = self.db_client.client.table('forex_strategies').select('effectiveness, score, occurrences').execute()
+            # Agregados calculados en la base de datos (sin traer filas)
+            active_stats = fetch_strategy_stats(self.db_client.client, 'forex_strategies')
+            master_stats = fetch_strategy_stats(self.db_client.client, 'forex_strategies_master')
             
             stats = {
-                'active_strategies': active_count,
-                'master_strategies': master_count,
-                'avg_effectiveness': 0,
-                'max_effectiveness': 0,
-                'avg_score': 0,
-                'max_score': 0,
-                'total_occurrences': 0
+                'active_strategies': active_stats['total_strategies'],
+                'master_strategies': master_stats['total_strategies'],
+                'avg_effectiveness': float(active_stats.get('avg_effectiveness') or 0),
+                'max_effectiveness': float(active_stats.get('max_effectiveness') or 0),
+                'avg_score': float(active_stats.get('avg_score') or 0),
+                'max_score': float(active_stats.get('max_score') or 0),
+                'total_occurrences': int(active_stats.get('total_occurrences') or 0)
             }
             
-            if effectiveness_query.data:
-                effectiveness_values = [r['effectiveness'] for r in effectiveness_query.data]
-                score_values = [r['score'] for r in effectiveness_query.data]
-                occurrences_values = [r['occurrences'] for r in effectiveness_query.data]
-                
-                stats.update({
-                    'avg_effectiveness': sum(effectiveness_values) / len(effectiveness_values),
-                    'max_effectiveness': max(effectiveness_values),
-                    'avg_score': sum(score_values) / len(score_values),
-                    'max_score': max(score_values),
-                    'total_occurrences': sum(occurrences_values)
-                })
-            
             # Agregar estadísticas de sesión y mercado
             stats.update({
                 'session_stats': self.session_stats,
@@ -469,32 +467,20 @@ class ForexAnalyzer:
             return {'error': str(e)}
     
     def backup_strategies(self, backup_path: str = None) -> Dict[str, Any]:
-        """Crea backup de las estrategias"""
+        """Crea backup de las estrategias (un archivo NDJSON gzip por tabla, en streaming)"""
         try:
             if backup_path is None:
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                backup_path = f"backup_strategies_{timestamp}.json"
-            
-            # Obtener todas las estrategias activas
-            active_strategies = self.db_client.client.table('forex_strategies').select('*').execute()
-            
-            # Obtener todas las estrategias master
-            master_strategies = self.db_client.client.table('forex_strategies_master').select('*').execute()
-            
-            backup_data = {
-                'timestamp': datetime.now(timezone.utc).isoformat(),
-                'active_strategies': active_strategies.data if active_strategies.data else [],
-                'master_strategies': master_strategies.data if master_strategies.data else []
-            }
+                backup_path = f"backup_strategies_{timestamp}"
             
-            import json
-            with open(backup_path, 'w') as f:
-                json.dump(backup_data, f, indent=2)
+            reports = backup_tables(self.db_client.client, backup_path,
+                                    ['forex_strategies', 'forex_strategies_master'])
             
             return {
                 'backup_file': backup_path,
-                'active_count': len(backup_data['active_strategies']),
-                'master_count': len(backup_data['master_strategies']),
+                'files': [report['path'] for report in reports.values()],
+                'active_count': reports['forex_strategies']['rows'],
+                'master_count': reports['forex_strategies_master']['rows'],
                 'success': True
             }
             
@@ -0,0 +1,255 @@
+# backend/live_signals.py - Evaluación en vivo de estrategias activas vela a vela
+import re
+import json
+import time
+import heapq
+import logging
+import pandas as pd
+import numpy as np
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, Tuple
+
+from obplus_signals import OBPLUS_PATTERNS, OBPLUS_ENTRY_OFFSETS, FRAGMENT_SIZE, obplus_rule
+from table_backup import iter_pages
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+TIMEFRAME_SECONDS = {
+    '1min': 60, '5min': 300, '15min': 900, '30min': 1800,
+    '1h': 3600, '4h': 14400, '1d': 86400, '1w': 604800
+}
+
+SEQUENCE_PATTERN = re.compile(r'^[RV]+$')
+
+
+def _obplus_table(pattern: str) -> Tuple[np.ndarray, np.ndarray]:
+    """(dispara, predicción verde) para cada combinación de las velas previas a la entrada
+
+    Índice = bits de las velas 0..entrada-1 del par de fragmentos (la más
+    antigua en el bit alto). Las velas posteriores no influyen en la regla.
+    """
+    entry = OBPLUS_ENTRY_OFFSETS[pattern]
+    codes = np.arange(2 ** entry)
+    candles = np.zeros((len(codes), 2 * FRAGMENT_SIZE), dtype=bool)
+    for i in range(entry):
+        candles[:, i] = (codes >> (entry - 1 - i)) & 1
+
+    mask, predicted, _ = obplus_rule(candles[:, :FRAGMENT_SIZE], candles[:, FRAGMENT_SIZE:], pattern)
+    return np.asarray(mask, dtype=bool), np.asarray(predicted, dtype=bool)
+
+
+class PatternAutomaton:
+    """Estrategias de un (par, timeframe) compiladas sobre un registro de bits
+
+    Las últimas velas viven en un entero (vela más reciente = bit bajo).
+    Una secuencia R/V de longitud L es una consulta a una tabla indexada
+    por los L bits bajos; una regla OBPlus es una consulta a su tabla
+    precalculada cuando la vela cierra justo antes de la entrada. El coste
+    por vela depende solo del número de longitudes/reglas distintas.
+
+    align='index' (por defecto) cuenta la posición en el fragmento desde
+    la primera vela vista, igual que extract_obplus_signals: replay() sobre
+    un DataFrame reproduce las señales del análisis offline de ese mismo
+    DataFrame. align='clock' usa epoch // timeframe % 5 (fragmentos fijos
+    en el reloj, estables aunque se pierda el estado); no coincide con el
+    análisis offline salvo que el DataFrame empiece en un límite de fragmento.
+    """
+
+    def __init__(self, pair: str, timeframe: str, strategies: List[Dict[str, Any]], align: str = 'index'):
+        self.pair = pair
+        self.timeframe = timeframe
+        self.align = align
+        self.seconds = TIMEFRAME_SECONDS.get(timeframe, 60)
+
+        self.bits = 0
+        self.n = 0
+        self.last_timestamp = None
+
+        # Secuencias: longitud -> {código: [estrategias]}
+        self.sequence_tables: Dict[int, Dict[int, List[Dict[str, Any]]]] = {}
+        # OBPlus: patrón -> (tabla dispara, tabla predicción, estrategias)
+        self.obplus_tables: Dict[str, Tuple[np.ndarray, np.ndarray, List[Dict[str, Any]]]] = {}
+        self.skipped = 0
+
+        for strategy in strategies:
+            self.add_strategy(strategy)
+
+        max_obplus = max((OBPLUS_ENTRY_OFFSETS[p] for p in self.obplus_tables), default=0)
+        self.width = max([max(self.sequence_tables, default=0), max_obplus, 1])
+        self.register_mask = (1 << self.width) - 1
+
+    def add_strategy(self, strategy: Dict[str, Any]):
+        pattern = strategy.get('pattern') or ''
+        if pattern in OBPLUS_PATTERNS:
+            if pattern not in self.obplus_tables:
+                fires, predicted = _obplus_table(pattern)
+                self.obplus_tables[pattern] = (fires, predicted, [])
+            self.obplus_tables[pattern][2].append(strategy)
+        elif SEQUENCE_PATTERN.match(pattern):
+            code = int(pattern.replace('R', '0').replace('V', '1'), 2)
+            self.sequence_tables.setdefault(len(pattern), {}).setdefault(code, []).append(strategy)
+        else:
+            # Fragmentos horarios, indicadores, etc. no son secuencias de velas
+            self.skipped += 1
+
+    def _position(self, timestamp: Optional[datetime]) -> int:
+        """Posición de la vela dentro del fragmento OBPlus (0..4)"""
+        if self.align == 'clock' and timestamp is not None:
+            return int(timestamp.timestamp() // self.seconds) % FRAGMENT_SIZE
+        return self.n % FRAGMENT_SIZE
+
+    def push(self, green: bool, timestamp: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Agregar una vela cerrada y devolver las señales que dispara"""
+        if timestamp is not None and self.last_timestamp is not None and timestamp <= self.last_timestamp:
+            return []  # vela repetida (reintento de la ingesta)
+
+        position = self._position(timestamp)
+        self.bits = ((self.bits << 1) | int(bool(green))) & self.register_mask
+        self.n += 1
+        self.last_timestamp = timestamp
+
+        fired = []
+        for length, table in self.sequence_tables.items():
+            if self.n >= length:
+                for strategy in table.get(self.bits & ((1 << length) - 1), ()):
+                    fired.append((strategy, strategy.get('direction', 'CALL')))
+
+        for pattern, (fires, predicted, strategies) in self.obplus_tables.items():
+            entry = OBPLUS_ENTRY_OFFSETS[pattern]
+            if position == (entry - 1) % FRAGMENT_SIZE and self.n >= entry:
+                code = self.bits & ((1 << entry) - 1)
+                if fires[code]:
+                    direction = 'CALL' if predicted[code] else 'PUT'
+                    fired.extend((strategy, direction) for strategy in strategies)
+
+        return [{
+            'pair': self.pair,
+            'timeframe': self.timeframe,
+            'pattern': strategy.get('pattern'),
+            'strategy_id': strategy.get('id'),
+            'source': strategy.get('source'),
+            'direction': direction,
+            'bar_time': timestamp,
+            'candle_index': self.n - 1
+        } for strategy, direction in fired]
+
+    def state(self) -> Dict[str, Any]:
+        return {'bits': self.bits, 'n': self.n,
+                'last_timestamp': self.last_timestamp.isoformat() if self.last_timestamp is not None else None}
+
+    def restore(self, state: Dict[str, Any]):
+        self.bits = state['bits'] & self.register_mask
+        self.n = state['n']
+        self.last_timestamp = datetime.fromisoformat(state['last_timestamp']) if state['last_timestamp'] else None
+
+
+class LiveSignalEngine:
+    """Autómatas por (par, timeframe) para todas las estrategias activas"""
+
+    def __init__(self, strategies: List[Dict[str, Any]], align: str = 'index'):
+        groups: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for strategy in strategies:
+            groups.setdefault((strategy['pair'], strategy['timeframe']), []).append(strategy)
+
+        self.automata = {key: PatternAutomaton(key[0], key[1], group, align) for key, group in groups.items()}
+        self.latencies_ms: List[float] = []
+
+        skipped = sum(automaton.skipped for automaton in self.automata.values())
+        logger.info(f"Autómatas compilados: {len(self.automata)} ({len(strategies) - skipped} estrategias, "
+                    f"{skipped} sin patrón de velas)")
+
+    @classmethod
+    def from_database(cls, client, align: str = 'index') -> 'LiveSignalEngine':
+        """Compilar las estrategias activas de forex_strategies_master (paginado por id)"""
+        strategies = []
+        for page in iter_pages(client, "forex_strategies_master", filters={'is_active': True}):
+            strategies.extend(page)
+        return cls(strategies, align)
+
+    def on_candle(self, pair: str, timeframe: str, open_price: float, close_price: float,
+                  timestamp: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Procesar una vela cerrada (timestamp = apertura de la vela, UTC)
+
+        Una vela que aún no cierra (p. ej. la posición 0 de
+        copy_rates_from_pos) se ignora sin tocar el autómata: su color es
+        provisional y, si se registrara, la vela definitiva se descartaría
+        después como repetida.
+        """
+        automaton = self.automata.get((pair, timeframe))
+        if automaton is None:
+            return []
+
+        if timestamp is not None and timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+
+        if timestamp is not None and timestamp.timestamp() + automaton.seconds > time.time():
+            logger.debug(f"Vela en formación {pair} {timeframe} {timestamp}; se evalúa al cerrar")
+            return []
+
+        signals = automaton.push(float(close_price) >= float(open_price), timestamp)
+
+        if signals and timestamp is not None:
+            # Latencia desde el cierre de la vela hasta la emisión de la señal
+            bar_close = timestamp.timestamp() + automaton.seconds
+            latency_ms = (time.time() - bar_close) * 1000
+            for signal in signals:
+                signal['latency_ms'] = latency_ms
+            self.latencies_ms.append(latency_ms)
+
+        return signals
+
+    def on_frame(self, pair: str, timeframe: str, df: pd.DataFrame, time_column: str = 'time') -> List[Dict[str, Any]]:
+        """Procesar un lote de velas en orden (p. ej. el DataFrame de la ingesta MT5)
+
+        Las velas ya registradas se descartan y la que sigue en formación se
+        omite (ver on_candle), así que el lote puede solaparse con el anterior.
+        """
+        signals = []
+        for timestamp, open_price, close_price in zip(pd.to_datetime(df[time_column], utc=True),
+                                                     df['open'].to_numpy(), df['close'].to_numpy()):
+            signals.extend(self.on_candle(pair, timeframe, open_price, close_price, timestamp.to_pydatetime()))
+        return signals
+
+    def replay(self, frames: Dict[Tuple[str, str], pd.DataFrame], time_column: str = 'datetime') -> List[Dict[str, Any]]:
+        """Reproducir velas históricas de varios pares en orden temporal global"""
+        streams = []
+        for (pair, timeframe), df in frames.items():
+            times = pd.to_datetime(df[time_column], utc=True)
+            streams.append(((t.to_pydatetime(), pair, timeframe, o, c) for t, o, c in
+                            zip(times, df['open'].to_numpy(), df['close'].to_numpy())))
+
+        signals = []
+        for timestamp, pair, timeframe, open_price, close_price in heapq.merge(*streams, key=lambda row: row[0]):
+            signals.extend(self.on_candle(pair, timeframe, open_price, close_price, timestamp))
+        return signals
+
+    def save_state(self, path: str):
+        """Guardar los registros para que la siguiente ejecución continúe sin recargar historia"""
+        with open(path, 'w') as f:
+            json.dump({f"{pair}|{timeframe}": automaton.state()
+                       for (pair, timeframe), automaton in self.automata.items()}, f)
+
+    def load_state(self, path: str):
+        try:
+            with open(path) as f:
+                states = json.load(f)
+        except FileNotFoundError:
+            return
+
+        for key, state in states.items():
+            pair, timeframe = key.split('|')
+            if (pair, timeframe) in self.automata:
+                self.automata[(pair, timeframe)].restore(state)
+
+    def latency_summary(self) -> Dict[str, float]:
+        if not self.latencies_ms:
+            return {}
+        latencies = np.asarray(self.latencies_ms)
+        return {'count': len(latencies), 'p50_ms': float(np.percentile(latencies, 50)),
+                'p95_ms': float(np.percentile(latencies, 95)), 'max_ms': float(latencies.max())}
+
+
+def create_live_signal_engine(client, align: str = 'index') -> LiveSignalEngine:
+    """Crea el motor de señales con las estrategias activas de la base de datos"""
+    return LiveSignalEngine.from_database(client, align)
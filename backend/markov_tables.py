@@ -0,0 +1,170 @@
+# backend/markov_tables.py - Tablas de transición de orden 1..k por par/timeframe
+import os
+import logging
+import pandas as pd
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+from config import get_state_path
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+
+class MarkovTables:
+    """Conteos (últimas k velas -> color siguiente) para órdenes 1..max_order
+
+    counts[k] es un array uint32 (2^k, 2): fila = código de las k velas
+    previas (más antigua = bit alto, verde = 1), columna = color siguiente
+    (0 rojo, 1 verde). push() suma una vela en O(k); extend() suma un bloque
+    con un bincount por orden. Cualquier patrón R/V de longitud <= k se
+    resuelve con una lectura de tabla.
+    """
+
+    def __init__(self, max_order: int = 5):
+        self.max_order = max_order
+        self.counts = {order: np.zeros((2 ** order, 2), dtype=np.uint32) for order in range(1, max_order + 1)}
+        self.bits = 0  # últimas max_order velas, la más reciente en el bit bajo
+        self.n = 0
+        self.last_timestamp: Optional[str] = None
+
+    def push(self, green: bool):
+        """Agregar una vela: una transición por orden"""
+        outcome = int(bool(green))
+        for order, table in self.counts.items():
+            if self.n >= order:
+                table[self.bits & ((1 << order) - 1), outcome] += 1
+
+        self.bits = ((self.bits << 1) | outcome) & ((1 << self.max_order) - 1)
+        self.n += 1
+
+    def extend(self, green: np.ndarray):
+        """Agregar un bloque de velas en orden cronológico (vectorizado)"""
+        green = np.asarray(green, dtype=np.int64)
+        if len(green) == 0:
+            return
+
+        history = min(self.n, self.max_order)
+        previous = np.array([(self.bits >> (history - 1 - i)) & 1 for i in range(history)], dtype=np.int64)
+        series = np.concatenate((previous, green))
+
+        for order, table in self.counts.items():
+            start = max(history - order, 0)
+            n_windows = len(series) - order - start
+            if n_windows <= 0:
+                continue
+
+            code = np.zeros(n_windows, dtype=np.int64)
+            for i in range(order):
+                code = (code << 1) | series[start + i:start + i + n_windows]
+            outcome = series[start + order:start + order + n_windows]
+
+            table += np.bincount(code * 2 + outcome, minlength=2 ** (order + 1)).reshape(-1, 2).astype(np.uint32)
+
+        for value in green[-self.max_order:]:
+            self.bits = ((self.bits << 1) | int(value)) & ((1 << self.max_order) - 1)
+        self.n += len(green)
+
+    def lookup(self, pattern: str) -> Tuple[int, int]:
+        """(rojas, verdes) tras el patrón R/V"""
+        order = len(pattern)
+        if order == 0 or order > self.max_order:
+            raise ValueError(f"Patrón fuera de rango 1..{self.max_order}: {pattern}")
+        code = int(pattern.replace('R', '0').replace('V', '1'), 2)
+        red, green = self.counts[order][code]
+        return int(red), int(green)
+
+    def effectiveness(self, pattern: str) -> Optional[float]:
+        """% de velas verdes tras el patrón (None si no hay ocurrencias)"""
+        red, green = self.lookup(pattern)
+        return green / (red + green) * 100 if red + green else None
+
+    def difference(self, previous: Dict[int, np.ndarray]) -> 'MarkovTables':
+        """Tablas con solo las transiciones sumadas desde `previous` (copia de counts)"""
+        delta = MarkovTables(self.max_order)
+        for order, table in self.counts.items():
+            delta.counts[order] = table - previous[order]
+        delta.n = self.n
+        return delta
+
+    def save(self, path: str):
+        np.savez(path, max_order=self.max_order, bits=self.bits, n=self.n,
+                 last_timestamp=np.array(self.last_timestamp or ''),
+                 **{f'order_{order}': table for order, table in self.counts.items()})
+
+    @classmethod
+    def load(cls, path: str) -> 'MarkovTables':
+        with np.load(path) as data:
+            tables = cls(int(data['max_order']))
+            for order in tables.counts:
+                tables.counts[order] = data[f'order_{order}'].astype(np.uint32)
+            tables.bits = int(data['bits'])
+            tables.n = int(data['n'])
+            tables.last_timestamp = str(data['last_timestamp']) or None
+        return tables
+
+
+class TransitionStore:
+    """MarkovTables persistentes por (par, timeframe) en state_dir (por defecto bajo config.STATE_DIR)"""
+
+    def __init__(self, state_dir: str = None, max_order: int = 5):
+        self.state_dir = state_dir or get_state_path('markov_state')
+        self.max_order = max_order
+        self.tables: Dict[Tuple[str, str], MarkovTables] = {}
+
+    def _path(self, pair: str, timeframe: str) -> str:
+        return os.path.join(self.state_dir, f"markov_{pair}_{timeframe}.npz")
+
+    def get(self, pair: str, timeframe: str) -> MarkovTables:
+        key = (pair, timeframe)
+        if key not in self.tables:
+            path = self._path(pair, timeframe)
+            tables = MarkovTables.load(path) if os.path.exists(path) else None
+            if tables is None or tables.max_order != self.max_order:
+                tables = MarkovTables(self.max_order)
+            self.tables[key] = tables
+        return self.tables[key]
+
+    def update_from_frame(self, pair: str, timeframe: str, df: pd.DataFrame) -> Tuple[MarkovTables, MarkovTables]:
+        """Sumar solo las velas posteriores a la última ya contada
+
+        Devuelve (tablas acumuladas, tablas solo con las transiciones cuyo
+        resultado es una vela nueva de este frame). Las velas se ordenan por
+        tiempo antes de sumarlas: extend() asume orden cronológico.
+        """
+        tables = self.get(pair, timeframe)
+        previous = {order: table.copy() for order, table in tables.counts.items()}
+        time_column = 'datetime' if 'datetime' in df.columns else 'timestamp'
+        times = pd.to_datetime(df[time_column], utc=True)
+
+        if not times.is_monotonic_increasing:
+            logger.warning(f"⚠️ Velas de {pair} {timeframe} fuera de orden; se ordenan por {time_column}")
+            order = np.argsort(times.to_numpy(), kind='stable')
+            df, times = df.iloc[order], times.iloc[order]
+
+        if tables.last_timestamp is not None:
+            new_rows = (times > pd.Timestamp(tables.last_timestamp)).to_numpy()
+            df, times = df[new_rows], times[new_rows]
+
+        # Una vela repetida dentro del frame se contaría dos veces
+        unique_rows = ~times.duplicated().to_numpy()
+        df, times = df[unique_rows], times[unique_rows]
+
+        if len(df):
+            tables.extend(df['close'].to_numpy(dtype=np.float64) >= df['open'].to_numpy(dtype=np.float64))
+            tables.last_timestamp = times.max().isoformat()
+            logger.debug(f"Transiciones {pair} {timeframe}: +{len(df)} velas ({tables.n} total)")
+
+        return tables, tables.difference(previous)
+
+    def save(self, pair: str = None, timeframe: str = None):
+        os.makedirs(self.state_dir, exist_ok=True)
+        keys = [(pair, timeframe)] if pair is not None else list(self.tables)
+        for key in keys:
+            if key in self.tables:
+                self.tables[key].save(self._path(*key))
+
+
+def create_transition_store(state_dir: str = None, max_order: int = 5) -> TransitionStore:
+    """Crea el almacén de tablas de transición"""
+    return TransitionStore(state_dir, max_order)
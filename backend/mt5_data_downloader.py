@@ -3,9 +3,13 @@ import MetaTrader5 as mt5
 import pandas as pd
 import os
 from datetime import datetime, timedelta, timezone
-from supabase import create_client, Client
+from db_connection import get_shared_client
+from retention import delete_in_slices
 import logging
 
+from live_signals import create_live_signal_engine
+from config import get_state_path
+
 # Configuración desde variables de entorno (GitHub Secrets)
 MT5_LOGIN = int(os.getenv('MT5_LOGIN', '7030106'))
 MT5_PASSWORD = os.getenv('MT5_PASSWORD', 'Taliana123*')
@@ -14,8 +18,16 @@ MT5_SERVER = os.getenv('MT5_SERVER', 'OANDA-Live-1')
 SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_KEY = os.getenv('SUPABASE_KEY')
 
+# Retención: tramos de 1 día borrados por ejecución y archivo de progreso (fuera del
+# workspace; si se pierde, la siguiente ejecución parte de la fila más antigua)
+RETENTION_SLICES_PER_RUN = int(os.getenv('RETENTION_SLICES_PER_RUN', '2'))
+RETENTION_CHECKPOINT = os.getenv('RETENTION_CHECKPOINT', get_state_path('retention_checkpoint.json'))
+
+# Estado de los autómatas de señales entre ejecuciones (vacío = señales desactivadas)
+LIVE_SIGNAL_STATE = os.getenv('LIVE_SIGNAL_STATE', get_state_path('live_signal_state.json'))
+
 # Inicializar Supabase
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+supabase = get_shared_client(SUPABASE_URL, SUPABASE_KEY)
 
 # Configurar logging para GitHub Actions
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -132,7 +144,14 @@ def get_latest_candle_time(pair, timeframe):
         return datetime.now(timezone.utc) - timedelta(hours=1)
 
 
-def download_incremental_data(pair, mt5_timeframe, timeframe_name):
+def evaluate_signals(signal_engine, pair, timeframe_name, df):
+    """Pasar velas al motor de señales (descarta repetidas y la vela en formación)"""
+    for signal in signal_engine.on_frame(pair, timeframe_name, df):
+        logger.info(f"📣 Señal {signal['pair']} {signal['timeframe']} {signal['pattern']} → "
+                    f"{signal['direction']} (latencia {signal.get('latency_ms', 0):.0f} ms)")
+
+
+def download_incremental_data(pair, mt5_timeframe, timeframe_name, signal_engine=None):
     """Descargar solo datos nuevos desde la última vela"""
     try:
         symbol = get_symbol_name(pair)
@@ -163,6 +182,10 @@ def download_incremental_data(pair, mt5_timeframe, timeframe_name):
         df = pd.DataFrame(rates)
         df['time'] = pd.to_datetime(df['time'], unit='s')
 
+        # Señales desde la última vela en BD inclusive: pudo guardarse aún en formación
+        if signal_engine is not None:
+            evaluate_signals(signal_engine, pair, timeframe_name, df[df['time'] >= last_time])
+
         # Filtrar solo velas posteriores a la última en BD
         df = df[df['time'] > last_time]
 
@@ -224,26 +247,17 @@ def process_and_save_candles(df, pair, timeframe):
 
 
 def cleanup_old_data():
-    """Eliminar datos más antiguos de 3 años"""
+    """Eliminar datos más antiguos de 3 años, pocos días por ejecución"""
     try:
         cutoff_date = datetime.now(timezone.utc) - timedelta(days=3 * 365)
 
-        # Contar registros antes
-        count_before = supabase.table("forex_candles") \
-            .select("*", count="exact") \
-            .lt("timestamp", cutoff_date.isoformat()) \
-            .execute()
+        # Sin conteo previo ni DELETE único: tramos de un día con pausa y checkpoint
+        report = delete_in_slices(supabase, "forex_candles", "timestamp", cutoff_date,
+                                  max_slices=RETENTION_SLICES_PER_RUN, checkpoint_path=RETENTION_CHECKPOINT)
 
-        if count_before.count and count_before.count > 0:
-            # Eliminar datos antiguos
-            result = supabase.table("forex_candles") \
-                .delete() \
-                .lt("timestamp", cutoff_date.isoformat()) \
-                .execute()
-
-            logger.info(f"Limpieza completada: eliminados {count_before.count} registros anteriores a {cutoff_date}")
-        else:
-            logger.info("No hay datos antiguos para limpiar")
+        if report['deleted']:
+            logger.info(f"Limpieza: eliminados {report['deleted']} registros en {report['slices']} tramos "
+                        f"({'al día' if report['complete'] else 'continúa en la próxima ejecución'})")
 
     except Exception as e:
         logger.error(f"Error en limpieza: {e}")
@@ -279,6 +293,14 @@ def main():
         logger.error("❌ No se pudo conectar a MT5")
         return
 
+    signal_engine = None
+    if LIVE_SIGNAL_STATE:
+        try:
+            signal_engine = create_live_signal_engine(supabase)
+            signal_engine.load_state(LIVE_SIGNAL_STATE)
+        except Exception as e:
+            logger.error(f"❌ No se pudo iniciar el motor de señales: {e}")
+
     try:
         now = datetime.now(timezone.utc)
         minute = now.minute
@@ -290,7 +312,7 @@ def main():
         for pair in FOREX_PAIRS:
             for mt5_tf, tf_name in REAL_TIME_TIMEFRAMES.items():
                 try:
-                    new_candles = download_incremental_data(pair, mt5_tf, tf_name)
+                    new_candles = download_incremental_data(pair, mt5_tf, tf_name, signal_engine)
                     total_new_candles += new_candles
 
                     if new_candles > 0:
@@ -306,7 +328,7 @@ def main():
             for pair in FOREX_PAIRS:
                 for mt5_tf, tf_name in ADDITIONAL_TIMEFRAMES.items():
                     try:
-                        new_candles = download_incremental_data(pair, mt5_tf, tf_name)
+                        new_candles = download_incremental_data(pair, mt5_tf, tf_name, signal_engine)
                         total_new_candles += new_candles
 
                         if new_candles > 0:
@@ -318,10 +340,15 @@ def main():
 
         logger.info(f"=== ✅ Completado: {total_new_candles} velas nuevas ===")
 
-        # Limpieza solo a medianoche
-        if now.hour == 0 and now.minute < 2:
-            logger.info("🧹 Ejecutando limpieza de datos antiguos...")
-            cleanup_old_data()
+        if signal_engine is not None:
+            signal_engine.save_state(LIVE_SIGNAL_STATE)
+            latency = signal_engine.latency_summary()
+            if latency:
+                logger.info(f"📣 Señales: {latency['count']} | latencia p50 {latency['p50_ms']:.0f} ms, "
+                            f"p95 {latency['p95_ms']:.0f} ms")
+
+        # Retención repartida: cada ejecución borra como mucho RETENTION_SLICES_PER_RUN días
+        cleanup_old_data()
 
     finally:
         mt5.shutdown()
@@ -0,0 +1,149 @@
+# backend/obplus_signals.py - Señales OBPlus y de secuencias R/V vectorizadas
+import logging
+import numpy as np
+from typing import Dict, List, Any, Optional, Tuple
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+FRAGMENT_SIZE = 5
+
+# Reglas OBPlus soportadas (mismas que OBPlusSimulator.check_obplus_pattern)
+OBPLUS_PATTERNS = [
+    'tres_mosqueteros', 'mejor_de_3', 'milhao_maioria', 'mhi_3', 'padrao_23',
+    'padrao_impar', 'torres_gemeas', 'extremos_opuestos', 'simetria_central',
+    'momentum_continuacion'
+]
+
+# Vela de entrada de cada regla, relativa al inicio del fragmento (5 = primera del siguiente)
+OBPLUS_ENTRY_OFFSETS = {
+    'tres_mosqueteros': 3, 'mejor_de_3': 7, 'milhao_maioria': 5, 'mhi_3': 7, 'padrao_23': 2,
+    'padrao_impar': 5, 'torres_gemeas': 4, 'extremos_opuestos': 4, 'simetria_central': 3,
+    'momentum_continuacion': 5
+}
+
+
+def candles_to_green_array(candles: List[Dict[str, Any]]) -> np.ndarray:
+    """Convertir lista de velas (con 'color' R/V) a array booleano (True = V)"""
+    return np.fromiter((candle['color'] == 'V' for candle in candles), dtype=bool, count=len(candles))
+
+
+def build_fragment_matrix(green: np.ndarray, fragment_size: int = FRAGMENT_SIZE) -> np.ndarray:
+    """Agrupar velas en fragmentos NO solapados (n_fragmentos x fragment_size)"""
+    n_fragments = len(green) // fragment_size
+    return green[:n_fragments * fragment_size].reshape(n_fragments, fragment_size)
+
+
+def obplus_rule(current: np.ndarray, following: np.ndarray, pattern: str) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """(máscara, predicción, resultado real) de una regla OBPlus
+
+    current/following son fragmentos (..., 5): la última dimensión es la
+    vela dentro del fragmento, así que vale igual para una serie
+    (n_fragmentos, 5) que para un panel (pares, n_fragmentos, 5).
+    """
+    mask = np.ones(current.shape[:-1], dtype=bool)
+
+    central_greens = current[..., 1:4].sum(axis=-1)
+    majority = central_greens >= 2
+
+    if pattern == 'tres_mosqueteros':
+        predicted, actual = current[..., 2], current[..., 3]
+    elif pattern == 'mejor_de_3':
+        predicted, actual = majority, following[..., 2]
+    elif pattern == 'milhao_maioria':
+        predicted, actual = majority, following[..., 0]
+    elif pattern == 'mhi_3':
+        # Solo si hay mezcla de colores: se apuesta al minoritario
+        mask = (central_greens > 0) & (central_greens < 3)
+        predicted, actual = ~majority, following[..., 2]
+    elif pattern == 'padrao_23':
+        predicted, actual = current[..., 1], current[..., 2]
+    elif pattern == 'padrao_impar':
+        predicted, actual = current[..., 2], following[..., 0]
+    elif pattern == 'torres_gemeas':
+        predicted, actual = current[..., 0], current[..., 4]
+    elif pattern == 'extremos_opuestos':
+        predicted, actual = ~current[..., 0], current[..., 4]
+    elif pattern == 'simetria_central':
+        predicted, actual = current[..., 1], current[..., 3]
+    elif pattern == 'momentum_continuacion':
+        first_three = current[..., :3].sum(axis=-1)
+        mask = (first_three == 0) | (first_three == 3)
+        predicted, actual = current[..., 0], following[..., 0]
+    else:
+        return None
+
+    return mask, predicted, actual
+
+
+def extract_obplus_signals(fragments: np.ndarray, pattern: str, exclude: np.ndarray = None) -> Dict[str, Any]:
+    """Calcular de una vez todas las señales de un patrón OBPlus
+
+    Reproduce check_obplus_pattern + get_actual_outcome del simulador: se
+    evalúan los fragmentos 0..n-2 y cada señal trae la predicción, el
+    resultado real y si la operación se gana. exclude (misma forma que
+    fragments) marca velas sin color definido, p. ej. dojis de
+    price_action; no se opera si el fragmento o el siguiente contienen una.
+    """
+    n_fragments = len(fragments)
+    n_iterations = max(n_fragments - 1, 0)
+    empty = {
+        'fragment_idx': np.empty(0, dtype=np.int32),
+        'predicted': np.empty(0, dtype=bool),
+        'actual': np.empty(0, dtype=bool),
+        'win': np.empty(0, dtype=bool),
+        'n_iterations': n_iterations,
+        'n_fragments': n_fragments
+    }
+
+    if n_iterations == 0:
+        return empty
+
+    rule = obplus_rule(fragments[:-1], fragments[1:], pattern)
+    if rule is None:
+        logger.warning(f"Patrón OBPlus no soportado: {pattern}")
+        return empty
+
+    mask, predicted, actual = rule
+    if exclude is not None:
+        blocked = np.asarray(exclude, dtype=bool).any(axis=1)
+        mask = mask & ~blocked[:-1] & ~blocked[1:]
+    fragment_idx = np.flatnonzero(mask).astype(np.int32)
+    predicted = predicted[mask]
+    actual = actual[mask]
+
+    return {
+        'fragment_idx': fragment_idx,
+        'predicted': predicted,
+        'actual': actual,
+        'win': predicted == actual,
+        'n_iterations': n_iterations,
+        'n_fragments': n_fragments
+    }
+
+
+def extract_sequence_signals(green: np.ndarray, pattern: str, direction: str) -> Dict[str, Any]:
+    """Señales de un patrón de secuencia R/V (ej. 'RRV') con dirección CALL/PUT
+
+    Cada aparición del patrón es una operación sobre la vela siguiente.
+    """
+    length = len(pattern)
+    n_iterations = max(len(green) - length, 0)
+    target = np.array([c == 'V' for c in pattern], dtype=bool)
+
+    if length == 0 or n_iterations == 0 or not set(pattern) <= {'R', 'V'}:
+        return {
+            'candle_idx': np.empty(0, dtype=np.int32),
+            'win': np.empty(0, dtype=bool),
+            'n_iterations': n_iterations
+        }
+
+    windows = np.lib.stride_tricks.sliding_window_view(green[:-1], length)
+    matches = np.flatnonzero((windows == target).all(axis=1)).astype(np.int32)
+    next_green = green[matches + length]
+
+    return {
+        'candle_idx': matches,
+        'win': next_green if direction == 'CALL' else ~next_green,
+        'n_iterations': n_iterations
+    }
@@ -0,0 +1,204 @@
+# backend/pair_correlation.py - Correlación móvil (EW) entre pares, actualizada vela a vela
+import os
+import logging
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+
+from config import CURRENCY_PAIRS
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_HALFLIFE = 500  # velas
+
+
+class EWCorrelationMatrix:
+    """Covarianza y correlación exponencialmente ponderadas de retornos log
+
+    update() recibe el cierre de cada par en una nueva vela y actualiza
+    media y covarianza en O(P²), sin recorrer el histórico. Un par sin
+    vela (NaN) no actualiza su fila/columna en ese paso.
+    """
+
+    def __init__(self, pairs: Sequence[str] = None, halflife: float = DEFAULT_HALFLIFE):
+        self.pairs = list(pairs or CURRENCY_PAIRS)
+        self.pair_index = {pair: i for i, pair in enumerate(self.pairs)}
+        self.halflife = halflife
+        self.alpha = 1 - 0.5 ** (1 / halflife)
+
+        n_pairs = len(self.pairs)
+        self.last_close = np.full(n_pairs, np.nan)
+        self.mean = np.zeros(n_pairs)
+        self.cov = np.zeros((n_pairs, n_pairs))
+        self.n_obs = np.zeros((n_pairs, n_pairs), dtype=np.int64)  # retornos conjuntos vistos
+        self.last_timestamp = None
+
+    def update(self, closes, timestamp: Any = None) -> np.ndarray:
+        """Agregar una vela (dict par → cierre o array alineado con self.pairs)"""
+        if isinstance(closes, dict):
+            values = np.full(len(self.pairs), np.nan)
+            for pair, close in closes.items():
+                if pair in self.pair_index:
+                    values[self.pair_index[pair]] = close
+        else:
+            values = np.asarray(closes, dtype=np.float64)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns = np.log(values / self.last_close)
+
+        present = np.isfinite(returns)
+        idx = np.flatnonzero(present)
+        if len(idx):
+            alpha = self.alpha
+            delta = returns[idx] - self.mean[idx]
+            block = np.ix_(idx, idx)
+            self.cov[block] = (1 - alpha) * (self.cov[block] + alpha * np.outer(delta, delta))
+            self.mean[idx] += alpha * delta
+            self.n_obs[block] += 1
+
+        has_close = np.isfinite(values)
+        self.last_close[has_close] = values[has_close]
+        if timestamp is not None:
+            self.last_timestamp = timestamp
+
+        return returns
+
+    def update_panel(self, closes: np.ndarray, timestamps: Sequence[Any] = None):
+        """Recorrer un bloque (pares × velas) de cierres, p. ej. PairPanel.field('close')"""
+        for t in range(closes.shape[1]):
+            self.update(closes[:, t], timestamps[t] if timestamps is not None else None)
+
+    def correlation_matrix(self, min_obs: int = 30) -> np.ndarray:
+        """Matriz de correlación (NaN si hay menos de min_obs retornos conjuntos)"""
+        std = np.sqrt(np.diag(self.cov))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = self.cov / np.outer(std, std)
+        corr[self.n_obs < min_obs] = np.nan
+        return corr
+
+    def correlation(self, pair_a: str, pair_b: str, min_obs: int = 30) -> Optional[float]:
+        i, j = self.pair_index.get(pair_a), self.pair_index.get(pair_b)
+        if i is None or j is None or self.n_obs[i, j] < min_obs:
+            return None
+        denom = np.sqrt(self.cov[i, i] * self.cov[j, j])
+        return float(self.cov[i, j] / denom) if denom > 0 else None
+
+    def correlated_pairs(self, pair: str, threshold: float = 0.7, min_obs: int = 30) -> List[Tuple[str, float]]:
+        """Pares con |correlación| >= threshold respecto a `pair`, de mayor a menor"""
+        i = self.pair_index.get(pair)
+        if i is None:
+            return []
+
+        row = self.correlation_matrix(min_obs)[i]
+        matches = [(self.pairs[j], float(row[j])) for j in range(len(self.pairs))
+                   if j != i and np.isfinite(row[j]) and abs(row[j]) >= threshold]
+        return sorted(matches, key=lambda item: abs(item[1]), reverse=True)
+
+    def group_correlated(self, pairs: Sequence[str], threshold: float = 0.7, min_obs: int = 30) -> List[List[str]]:
+        """Agrupar pares (p. ej. con señal simultánea) en componentes correlacionadas"""
+        corr = self.correlation_matrix(min_obs)
+        groups = []
+        for pair in pairs:
+            i = self.pair_index.get(pair)
+            for group in groups:
+                if i is not None and any(
+                        self.pair_index.get(other) is not None
+                        and abs(np.nan_to_num(corr[i, self.pair_index[other]])) >= threshold
+                        for other in group):
+                    group.append(pair)
+                    break
+            else:
+                groups.append([pair])
+        return groups
+
+    def save(self, path: str):
+        np.savez(path, pairs=np.array(self.pairs), halflife=self.halflife, last_close=self.last_close,
+                 mean=self.mean, cov=self.cov, n_obs=self.n_obs,
+                 last_timestamp=np.array('' if self.last_timestamp is None else str(self.last_timestamp)))
+
+    @classmethod
+    def load(cls, path: str) -> 'EWCorrelationMatrix':
+        with np.load(path) as data:
+            matrix = cls([str(pair) for pair in data['pairs']], float(data['halflife']))
+            matrix.last_close = data['last_close']
+            matrix.mean = data['mean']
+            matrix.cov = data['cov']
+            matrix.n_obs = data['n_obs']
+            matrix.last_timestamp = str(data['last_timestamp']) or None
+        return matrix
+
+
+class CorrelationRegistry:
+    """Una matriz EW por timeframe, persistida en state_dir para arrancar sin recalcular"""
+
+    def __init__(self, state_dir: str = 'correlation_state', pairs: Sequence[str] = None,
+                 halflife: float = DEFAULT_HALFLIFE):
+        self.state_dir = state_dir
+        self.pairs = list(pairs or CURRENCY_PAIRS)
+        self.halflife = halflife
+        self.matrices: Dict[str, EWCorrelationMatrix] = {}
+
+    def _path(self, timeframe: str) -> str:
+        return os.path.join(self.state_dir, f"correlation_{timeframe}.npz")
+
+    def get(self, timeframe: str) -> EWCorrelationMatrix:
+        """Matriz del timeframe (cargada del disco si existe)"""
+        if timeframe not in self.matrices:
+            path = self._path(timeframe)
+            if os.path.exists(path):
+                matrix = EWCorrelationMatrix.load(path)
+                if matrix.pairs != self.pairs:
+                    logger.warning(f"Pares distintos en {path}, se reinicia la matriz")
+                    matrix = EWCorrelationMatrix(self.pairs, self.halflife)
+            else:
+                matrix = EWCorrelationMatrix(self.pairs, self.halflife)
+            self.matrices[timeframe] = matrix
+        return self.matrices[timeframe]
+
+    def update(self, timeframe: str, closes, timestamp: Any = None) -> np.ndarray:
+        return self.get(timeframe).update(closes, timestamp)
+
+    def update_from_frames(self, timeframe: str, frames: Dict[str, pd.DataFrame],
+                           time_column: str = 'timestamp') -> int:
+        """Sumar las velas de varios pares posteriores a la última ya vista
+
+        frames: par -> DataFrame con time_column y close (p. ej. el de
+        get_forex_data). Los cierres se alinean por timestamp; un par sin
+        vela en un timestamp queda en NaN y no actualiza ese paso.
+        """
+        matrix = self.get(timeframe)
+        series = {}
+        for pair, df in frames.items():
+            if df is None or df.empty or pair not in matrix.pair_index:
+                continue
+            closes = pd.Series(df['close'].to_numpy(dtype=np.float64),
+                               index=pd.to_datetime(df[time_column], utc=True))
+            series[pair] = closes[~closes.index.duplicated(keep='last')]
+        if not series:
+            return 0
+
+        panel = pd.DataFrame(series).sort_index()
+        if matrix.last_timestamp is not None:
+            panel = panel[panel.index > pd.Timestamp(matrix.last_timestamp)]
+        if panel.empty:
+            return 0
+
+        panel = panel.reindex(columns=matrix.pairs)
+        matrix.update_panel(panel.to_numpy().T, [t.isoformat() for t in panel.index])
+        return len(panel)
+
+    def correlated_pairs(self, timeframe: str, pair: str, threshold: float = 0.7) -> List[Tuple[str, float]]:
+        return self.get(timeframe).correlated_pairs(pair, threshold)
+
+    def save(self):
+        os.makedirs(self.state_dir, exist_ok=True)
+        for timeframe, matrix in self.matrices.items():
+            matrix.save(self._path(timeframe))
+        logger.info(f"Estado de correlaciones guardado en {self.state_dir}")
+
+
+def create_correlation_registry(state_dir: str = 'correlation_state',
+                                halflife: float = DEFAULT_HALFLIFE) -> CorrelationRegistry:
+    """Crea el registro de matrices de correlación por timeframe"""
+    return CorrelationRegistry(state_dir, halflife=halflife)
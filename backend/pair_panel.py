@@ -0,0 +1,148 @@
+# backend/pair_panel.py - Panel de pares alineados (par × timestamp × campo)
+import logging
+import pandas as pd
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+
+from obplus_signals import FRAGMENT_SIZE, obplus_rule
+from streaming_discovery import stream_candle_chunks
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+PANEL_FIELDS = ('open', 'close')
+
+
+class PairPanel:
+    """Velas de varios pares sobre un índice de tiempo común
+
+    values es (pares, timestamps, campos) con NaN donde falta la vela y
+    valid marca las posiciones con datos. Las estadísticas de color, los
+    conteos de secuencias y las reglas OBPlus operan sobre el eje de pares
+    en una sola llamada; una ventana solo cuenta si todas sus velas existen.
+    """
+
+    def __init__(self, pairs: Sequence[str], timestamps: np.ndarray, values: np.ndarray,
+                 valid: np.ndarray, fields: Sequence[str] = PANEL_FIELDS):
+        self.pairs = list(pairs)
+        self.timestamps = timestamps
+        self.values = values
+        self.valid = valid
+        self.fields = list(fields)
+        self.pair_index = {pair: i for i, pair in enumerate(self.pairs)}
+
+    @classmethod
+    def from_frames(cls, frames: Dict[str, pd.DataFrame], fields: Sequence[str] = PANEL_FIELDS) -> 'PairPanel':
+        """Alinear DataFrames por par (columna datetime + campos) sobre la unión de timestamps"""
+        pairs = [pair for pair, df in frames.items() if df is not None and len(df)]
+        times = {pair: pd.to_datetime(frames[pair]['datetime']).values.astype('datetime64[ns]') for pair in pairs}
+        timestamps = np.unique(np.concatenate(list(times.values()))) if pairs else np.empty(0, dtype='datetime64[ns]')
+
+        values = np.full((len(pairs), len(timestamps), len(fields)), np.nan)
+        valid = np.zeros((len(pairs), len(timestamps)), dtype=bool)
+
+        for p, pair in enumerate(pairs):
+            positions = np.searchsorted(timestamps, times[pair])
+            values[p, positions] = frames[pair][list(fields)].to_numpy(dtype=np.float64)
+            valid[p, positions] = True
+
+        return cls(pairs, timestamps, values, valid, fields)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def field(self, name: str) -> np.ndarray:
+        """(pares, timestamps) de un campo"""
+        return self.values[:, :, self.fields.index(name)]
+
+    def subset(self, pairs: Sequence[str]) -> 'PairPanel':
+        """Panel con solo algunos pares (mismo índice de tiempo)"""
+        rows = [self.pair_index[pair] for pair in pairs if pair in self.pair_index]
+        return PairPanel([self.pairs[i] for i in rows], self.timestamps, self.values[rows], self.valid[rows],
+                         self.fields)
+
+    def green(self) -> np.ndarray:
+        """(pares, timestamps) True = vela verde (close >= open); False donde falta"""
+        return (self.field('close') >= self.field('open')) & self.valid
+
+    def color_stats(self) -> pd.DataFrame:
+        """Velas, verdes y proporción de verdes por par"""
+        candles = self.valid.sum(axis=1)
+        greens = self.green().sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ratio = np.where(candles > 0, greens / candles, np.nan)
+
+        return pd.DataFrame({'candles': candles, 'green': greens, 'red': candles - greens,
+                             'green_ratio': ratio}, index=pd.Index(self.pairs, name='pair'))
+
+    def sequence_counts(self, length: int) -> np.ndarray:
+        """(pares, 2^length, 2): ocurrencias de cada secuencia y color de la vela siguiente
+
+        Código de secuencia igual que sequence_stats (vela más antigua = bit alto).
+        """
+        n_pairs, n_times = self.valid.shape
+        n_windows = n_times - length
+        n_codes = 2 ** length
+        if n_windows <= 0:
+            return np.zeros((n_pairs, n_codes, 2), dtype=np.int64)
+
+        green = self.green()
+        code = np.zeros((n_pairs, n_windows), dtype=np.int64)
+        window_valid = self.valid[:, length:length + n_windows].copy()
+        for i in range(length):
+            code = (code << 1) | green[:, i:i + n_windows]
+            window_valid &= self.valid[:, i:i + n_windows]
+        outcome = green[:, length:length + n_windows]
+
+        flat = (np.arange(n_pairs)[:, None] * n_codes + code) * 2 + outcome
+        return np.bincount(flat[window_valid], minlength=n_pairs * n_codes * 2).reshape(n_pairs, n_codes, 2)
+
+    def obplus_stats(self, pattern: str, fragment_size: int = FRAGMENT_SIZE) -> Optional[pd.DataFrame]:
+        """Operaciones y aciertos de una regla OBPlus por par
+
+        Los fragmentos se toman sobre el índice común; un par solo opera un
+        fragmento si ese fragmento y el siguiente están completos.
+        """
+        n_pairs, n_times = self.valid.shape
+        n_fragments = n_times // fragment_size
+        if n_fragments < 2:
+            trades = wins = np.zeros(n_pairs, dtype=np.int64)
+        else:
+            fragments = self.green()[:, :n_fragments * fragment_size].reshape(n_pairs, n_fragments, fragment_size)
+            complete = self.valid[:, :n_fragments * fragment_size].reshape(n_pairs, n_fragments, fragment_size).all(axis=2)
+
+            rule = obplus_rule(fragments[:, :-1], fragments[:, 1:], pattern)
+            if rule is None:
+                logger.warning(f"Patrón OBPlus no soportado: {pattern}")
+                return None
+
+            mask, predicted, actual = rule
+            mask = mask & complete[:, :-1] & complete[:, 1:]
+            trades = mask.sum(axis=1)
+            wins = (mask & (predicted == actual)).sum(axis=1)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            win_rate = np.where(trades > 0, wins / trades, np.nan)
+
+        return pd.DataFrame({'trades': trades, 'wins': wins, 'losses': trades - wins, 'win_rate': win_rate},
+                            index=pd.Index(self.pairs, name='pair'))
+
+
+def load_pair_panel(client, pairs: List[str], timeframe: str, start_date: Optional[str] = None,
+                    batch_size: int = 1000) -> PairPanel:
+    """Cargar forex_candles de varios pares y alinearlos en un panel"""
+    frames = {}
+    for pair in pairs:
+        chunks = list(stream_candle_chunks(client, pair, timeframe, start_date, batch_size))
+        if chunks:
+            frames[pair] = pd.concat(chunks, ignore_index=True)
+        else:
+            logger.info(f"Sin datos para {pair} {timeframe}")
+
+    return PairPanel.from_frames(frames)
+
+
+def create_pair_panel(frames: Dict[str, pd.DataFrame], fields: Sequence[str] = PANEL_FIELDS) -> PairPanel:
+    """Crea un panel a partir de DataFrames por par"""
+    return PairPanel.from_frames(frames, fields)
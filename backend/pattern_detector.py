@@ -13,7 +13,11 @@ try:
 except ImportError:
     pass
 
-from config import PATTERN_CONFIG, TIMEFRAMES_CONFIG
+from config import PATTERN_CONFIG, TIMEFRAMES_CONFIG, get_state_path
+from streak_index import StreakIndex
+from technical_indicators import IndicatorEngine
+from price_action import classify_frame, DOJI
+from markov_tables import MarkovTables
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -21,12 +25,18 @@ logger = logging.getLogger(__name__)
 class PatternDetector:
     """Detector de patrones con lógica de acumulación histórica"""
     
-    def __init__(self, supabase_client=None):
+    def __init__(self, supabase_client=None, transition_store=None):
         self.config = PATTERN_CONFIG
         self.sequence_config = self.config.get('sequence_patterns', {})
         self.min_occurrences = self.sequence_config.get('min_occurrences', 10)
         self.max_pattern_length = self.sequence_config.get('max_length', 5)
         self.db_client = supabase_client
+        # Estado de indicadores persistente: solo las velas nuevas pasan por IndicatorState
+        self.indicators = IndicatorEngine(self.config.get('technical_indicators', {}),
+                                          get_state_path('indicator_state'))
+        self.price_action_config = self.config.get('price_action', {})
+        # TransitionStore opcional: conteos persistentes, solo se suman las velas nuevas
+        self.transition_store = transition_store
         
     def _classify_candle(self, open_price: float, close_price: float) -> str:
         """Clasificar vela como Roja (R) o Verde (V)"""
@@ -41,10 +51,12 @@ class PatternDetector:
             if df.empty or len(df) == 0:
                 return []
             
-            sequence = []
-            for _, row in df.iterrows():
-                candle_type = self._classify_candle(row['open'], row['close'])
-                sequence.append(candle_type)
+            # Con price_action activo los dojis se marcan 'D' y no cuentan como verdes
+            if self.price_action_config.get('enabled', False):
+                classes = classify_frame(df, self.price_action_config)
+                sequence = np.where(classes == DOJI, 'D', np.where(classes > DOJI, 'V', 'R')).tolist()
+            else:
+                sequence = np.where(df['close'].to_numpy() >= df['open'].to_numpy(), 'V', 'R').tolist()
             
             logger.debug(f"Secuencia generada: {len(sequence)} velas")
             return sequence
@@ -69,12 +81,29 @@ class PatternDetector:
                 logger.warning(f"Datos insuficientes: {len(sequence)} velas para {pair} {timeframe}")
                 return []
             
-            # Detectar patrones en los datos actuales
+            # Detectar patrones en los datos actuales (forex_strategies = ventana actual)
             current_patterns = self._find_sequence_patterns(sequence, pair, timeframe)
             
+            # Condiciones de indicadores técnicos (RSI, medias, Bollinger) como patrones
+            conditions = None
+            if self.indicators.enabled and 'close' in historical_data.columns:
+                conditions = self.indicators.frame_conditions(pair, timeframe, historical_data)
+                current_patterns.extend(self._find_indicator_patterns(conditions, sequence, pair, timeframe))
+                current_patterns.sort(key=lambda x: x.get('score', 0), reverse=True)
+            
+            # Tablas de transición persistentes (solo R/V binario): el master
+            # suma solo las velas que no se habían contado en ejecuciones previas
+            increments = None
+            if self.transition_store is not None and 'D' not in sequence:
+                since = self.transition_store.get(pair, timeframe).last_timestamp
+                _, delta = self.transition_store.update_from_frame(pair, timeframe, historical_data)
+                self.transition_store.save(pair, timeframe)
+                increments = self._master_increments(current_patterns, delta, historical_data, sequence, since,
+                                                      conditions)
+            
             # Actualizar base de datos con lógica de acumulación
             if self.db_client and current_patterns:
-                self._update_strategies_with_accumulation(current_patterns)
+                self._update_strategies_with_accumulation(current_patterns, increments)
             
             logger.info(f"Encontrados {len(current_patterns)} patrones para {pair} {timeframe}")
             return current_patterns
@@ -83,11 +112,48 @@ class PatternDetector:
             logger.error(f"Error detectando patrones: {e}")
             return []
     
-    def _update_strategies_with_accumulation(self, current_patterns: List[Dict[str, Any]]):
-        """Actualiza forex_strategies (actual) y acumula en forex_strategies_master (histórico)"""
+    def _master_increments(self, current_patterns: List[Dict[str, Any]], delta: MarkovTables,
+                           df: pd.DataFrame, sequence: List[str], since: Optional[str],
+                           conditions: Dict[str, np.ndarray] = None) -> Dict[Tuple[str, str], Tuple[int, int]]:
+        """(patrón, dirección) -> (ocurrencias, aciertos) cuyo resultado es una vela nueva"""
+        time_column = 'datetime' if 'datetime' in df.columns else 'timestamp'
+        times = pd.to_datetime(df[time_column], utc=True)
+        # Vela i+1 (resultado) posterior a la última ya contada
+        new_outcome = np.ones(len(sequence) - 1, dtype=bool) if since is None else \
+            (times.iloc[1:] > pd.Timestamp(since)).to_numpy()
+        next_green = np.asarray(sequence[1:]) == 'V'
+        conditions = conditions or {}
+        
+        increments = {}
+        for pattern in current_patterns:
+            name = pattern['pattern']
+            if set(name) <= {'R', 'V'} and len(name) <= delta.max_order:
+                red, green = delta.lookup(name)
+            else:
+                if name not in conditions:
+                    continue
+                hits = conditions[name][:-1] & new_outcome
+                green = int(next_green[hits].sum())
+                red = int(hits.sum()) - green
+            increments[(name, pattern['direction'])] = (red + green, green if pattern['direction'] == 'CALL' else red)
+        return increments
+    
+    def _update_strategies_with_accumulation(self, current_patterns: List[Dict[str, Any]],
+                                             increments: Dict[Tuple[str, str], Tuple[int, int]] = None):
+        """Actualiza forex_strategies (actual) y acumula en forex_strategies_master (histórico)
+
+        increments: ocurrencias/aciertos de velas no contadas antes (ver
+        _master_increments). Sin él se suma el total de la ventana actual.
+        """
         
         for pattern in current_patterns:
             try:
+                if increments is not None:
+                    added_occurrences, added_wins = increments.get((pattern['pattern'], pattern['direction']), (0, 0))
+                else:
+                    added_occurrences, added_wins = pattern['occurrences'], pattern.get('wins', 0)
+                added_losses = added_occurrences - added_wins
+                
                 # 1. Obtener datos históricos de master
                 master_query = self.db_client.client.table('forex_strategies_master').select('*').eq('pair', pattern['pair']).eq('timeframe', pattern['timeframe']).eq('pattern', pattern['pattern']).eq('direction', pattern['direction']).execute()
                 
@@ -96,9 +162,9 @@ class PatternDetector:
                     # Estrategia existe en master - acumular
                     master_record = master_query.data[0]
                     
-                    new_total_occurrences = master_record['occurrences'] + pattern['occurrences']
-                    new_total_wins = master_record['wins'] + pattern.get('wins', 0)
-                    new_total_losses = master_record['losses'] + pattern.get('losses', 0)
+                    new_total_occurrences = master_record['occurrences'] + added_occurrences
+                    new_total_wins = master_record['wins'] + added_wins
+                    new_total_losses = master_record['losses'] + added_losses
                     new_effectiveness = (new_total_wins / new_total_occurrences * 100) if new_total_occurrences > 0 else 0
                     
                     # Actualizar master con datos acumulados
@@ -181,11 +247,15 @@ class PatternDetector:
         
         patterns = []
         
+        # Rachas calculadas una vez para todos los patrones de un solo color
+        # (con dojis la serie deja de ser binaria: se cuenta ventana a ventana)
+        streaks = StreakIndex.from_colors(sequence) if 'D' not in sequence else None
+        
         # Patrones a buscar: R, RR, RRR, V, VV, VVV, etc.
         for length in range(1, min(self.max_pattern_length + 1, 6)):
             for candle_type in ['R', 'V']:
                 pattern = candle_type * length
-                result = self._analyze_pattern(sequence, pattern, pair, timeframe)
+                result = self._analyze_pattern(sequence, pattern, pair, timeframe, streaks)
                 if result:
                     patterns.append(result)
         
@@ -202,17 +272,22 @@ class PatternDetector:
         
         return patterns
     
-    def _analyze_pattern(self, sequence: List[str], pattern: str, pair: str, timeframe: str) -> Optional[Dict[str, Any]]:
-        """Analiza un patrón específico en la secuencia"""
-        if len(sequence) < len(pattern) + 1:
-            return None
-        
+    def _count_pattern_outcomes(self, sequence: List[str], pattern: str,
+                                streaks: StreakIndex = None) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """Contar ocurrencias del patrón y color de la vela siguiente"""
         pattern_len = len(pattern)
         
-        # Encontrar todas las ocurrencias del patrón
         matches_r = {'count': 0, 'correct': 0}  # Predicción siguiente = R
         matches_v = {'count': 0, 'correct': 0}  # Predicción siguiente = V
         
+        # Patrones de un solo color: directamente de las longitudes de racha
+        if streaks is not None and len(set(pattern)) == 1:
+            continuation, reversal = streaks.streak_outcomes(pattern_len, pattern[0] == 'V')
+            matches_r['count'] = matches_v['count'] = continuation + reversal
+            matches_r['correct'] = continuation if pattern[0] == 'R' else reversal
+            matches_v['correct'] = reversal if pattern[0] == 'R' else continuation
+            return matches_r, matches_v
+        
         for i in range(len(sequence) - pattern_len):
             current_pattern = ''.join(sequence[i:i + pattern_len])
             
@@ -228,6 +303,44 @@ class PatternDetector:
                 elif next_candle == 'V':
                     matches_v['correct'] += 1
         
+        return matches_r, matches_v
+    
+    def _analyze_pattern(self, sequence: List[str], pattern: str, pair: str, timeframe: str,
+                         streaks: StreakIndex = None) -> Optional[Dict[str, Any]]:
+        """Analiza un patrón específico en la secuencia"""
+        if len(sequence) < len(pattern) + 1:
+            return None
+        
+        # Encontrar todas las ocurrencias del patrón
+        matches_r, matches_v = self._count_pattern_outcomes(sequence, pattern, streaks)
+        return self._build_strategy(pattern, matches_r, matches_v, pair, timeframe)
+    
+    def _find_indicator_patterns(self, conditions: Dict[str, np.ndarray], sequence: List[str], pair: str,
+                                 timeframe: str) -> List[Dict[str, Any]]:
+        """Patrones 'condición de indicador en la vela i' -> color de la vela i+1
+
+        conditions viene de IndicatorEngine.frame_conditions (estado
+        incremental), alineado con las velas de la secuencia.
+        """
+        next_green = np.asarray(sequence[1:]) == 'V'
+        patterns = []
+        
+        for name, condition in conditions.items():
+            hits = condition[:-1]
+            count = int(hits.sum())
+            greens = int(next_green[hits].sum())
+            matches_r = {'count': count, 'correct': count - greens}
+            matches_v = {'count': count, 'correct': greens}
+            
+            result = self._build_strategy(name, matches_r, matches_v, pair, timeframe)
+            if result:
+                patterns.append(result)
+        
+        return patterns
+    
+    def _build_strategy(self, pattern: str, matches_r: Dict[str, int], matches_v: Dict[str, int],
+                        pair: str, timeframe: str) -> Optional[Dict[str, Any]]:
+        """Elegir la mejor dirección de un patrón y construir la estrategia"""
         # Analizar ambas direcciones y seleccionar la mejor
         best_direction = None
         best_effectiveness = 0
@@ -247,7 +360,7 @@ class PatternDetector:
             return None
         
         # Calcular datos para la estrategia
-        wins = int(best_occurrences * best_effectiveness / 100)
+        wins = round(best_occurrences * best_effectiveness / 100)
         losses = best_occurrences - wins
         
         # Calcular ganancia basada en efectividad
@@ -338,6 +451,6 @@ class PatternDetector:
             return {}
 
 # Función de utilidad para crear instancia
-def create_pattern_detector(supabase_client=None):
+def create_pattern_detector(supabase_client=None, transition_store=None):
     """Crea una instancia del detector de patrones"""
-    return PatternDetector(supabase_client)
\ No newline at end of file
+    return PatternDetector(supabase_client, transition_store)
\ No newline at end of file
@@ -0,0 +1,284 @@
+# backend/portfolio_simulator.py - Simulación de cartera multi-estrategia con capital compartido
+import heapq
+import logging
+import itertools
+import pandas as pd
+import numpy as np
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+from fixed_trading_simulation import OBPlusSimulator
+from obplus_signals import (
+    FRAGMENT_SIZE, OBPLUS_PATTERNS, OBPLUS_ENTRY_OFFSETS,
+    build_fragment_matrix, extract_obplus_signals, extract_sequence_signals
+)
+from simulation_sweep import SimulationSweep
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+NS_PER_DAY = 86_400 * 10 ** 9
+
+
+class PortfolioSimulator:
+    """Un único recorrido temporal por las señales de todas las estrategias
+
+    Las señales de cada estrategia se calculan una vez (datos compartidos
+    por par/timeframe) y se fusionan con un heap por hora de entrada. El
+    capital es común: límite de riesgo por secuencia MG y límite de pérdida
+    diaria se aplican sobre la cartera completa.
+
+    Cada secuencia sigue a OBPlusSimulator.execute_trade_sequence (riesgo
+    revisado contra el capital tras cada intento perdido; las canceladas
+    cuentan en operations). Diferencias deliberadas con simulate_strategy:
+    las señales de una misma vela no pueden comprometer más que el capital
+    con el que abrió la vela, y el límite de pérdida bloquea el resto del
+    día UTC en lugar de detener toda la simulación.
+    """
+
+    def __init__(self, simulator: OBPlusSimulator = None, sweep: SimulationSweep = None):
+        self.simulator = simulator or OBPlusSimulator()
+        self.sweep = sweep or SimulationSweep(self.simulator, max_workers=1)
+
+    def build_signal_stream(self, strategy: Dict[str, Any], days_back: int) -> Optional[Dict[str, Any]]:
+        """Señales de una estrategia con la hora (ns UTC) de la vela de entrada"""
+        window = self.sweep.get_window(strategy['pair'], strategy['timeframe'], days_back)
+        if window is None or len(window['green']) < 20:
+            return None
+
+        pattern = strategy['pattern']
+        times_ns = window['times'].values.astype('datetime64[ns]').astype(np.int64)
+
+        if pattern in OBPLUS_PATTERNS:
+            fragments = build_fragment_matrix(window['green'])
+            if len(fragments) < 5:
+                return None
+            signals = extract_obplus_signals(fragments, pattern)
+            entry_idx = signals['fragment_idx'].astype(np.int64) * FRAGMENT_SIZE + OBPLUS_ENTRY_OFFSETS[pattern]
+        else:
+            signals = extract_sequence_signals(window['green'], pattern, strategy.get('direction', 'CALL'))
+            entry_idx = signals['candle_idx'].astype(np.int64) + len(pattern)
+
+        if len(entry_idx) == 0:
+            return None
+
+        return {'time_ns': times_ns[entry_idx], 'win': signals['win']}
+
+    def run(self, strategies: List[Dict[str, Any]], days_back: int = 30,
+            default_mg_level: str = 'MG0') -> Optional[Dict[str, Any]]:
+        """Simular todas las estrategias a la vez sobre un capital compartido"""
+        sim = self.simulator
+
+        # 1. Una carga por (par, timeframe)
+        for pair, timeframe in sorted({(s['pair'], s['timeframe']) for s in strategies}):
+            self.sweep._get_pair_data(pair, timeframe, days_back)
+
+        # 2. Señales precalculadas por estrategia
+        streams, active = [], []
+        for strategy in strategies:
+            stream = self.build_signal_stream(strategy, days_back)
+            if stream is not None:
+                streams.append(stream)
+                active.append(strategy)
+
+        if not streams:
+            logger.warning("Ninguna estrategia generó señales para la cartera")
+            return None
+
+        n_strategies = len(streams)
+        max_attempts = [sim.mg_levels[s.get('mg_level') or default_mg_level] for s in active]
+        wins = [stream['win'].tolist() for stream in streams]
+
+        per_operations = np.zeros(n_strategies, dtype=np.int64)
+        per_successes = np.zeros(n_strategies, dtype=np.int64)
+        per_profit = np.zeros(n_strategies, dtype=np.float64)
+        per_skipped_risk = np.zeros(n_strategies, dtype=np.int64)
+        per_skipped_daily = np.zeros(n_strategies, dtype=np.int64)
+
+        capital = float(sim.initial_capital)
+        peak = capital
+        max_drawdown = 0.0
+        base = sim.base_trade_amount
+        payout = sim.payout_rate
+
+        current_day = None
+        day_start_capital = capital
+        day_blocked = False
+        days_limit_hit = 0
+        daily_equity = []
+
+        # Exposición de las señales que entran en la misma vela
+        current_time = None
+        bucket_capital = capital
+        bucket_exposure = 0.0
+        bucket_signals = 0
+        max_exposure = 0.0
+        max_concurrent = 0
+
+        # 3. Fusión por heap de los flujos ya ordenados en el tiempo
+        merged = heapq.merge(*(
+            zip(stream['time_ns'].tolist(), itertools.repeat(s), range(len(stream['win'])))
+            for s, stream in enumerate(streams)
+        ))
+
+        for time_ns, s, k in merged:
+            day = time_ns // NS_PER_DAY
+            if day != current_day:
+                if current_day is not None:
+                    daily_equity.append((current_day, capital))
+                current_day = day
+                day_start_capital = capital
+                day_blocked = False
+
+            if time_ns != current_time:
+                current_time = time_ns
+                bucket_capital = capital
+                bucket_exposure = 0.0
+                bucket_signals = 0
+
+            if not day_blocked and day_start_capital - capital > day_start_capital * sim.max_daily_loss:
+                day_blocked = True
+                days_limit_hit += 1
+
+            if day_blocked:
+                per_skipped_daily[s] += 1
+                continue
+
+            # Como execute_trade_sequence: cada intento se comprueba contra el
+            # capital vivo (que baja tras cada pérdida), sin superar lo que
+            # queda libre en la vela tras las secuencias ya abiertas en ella
+            available = bucket_capital - bucket_exposure
+            sequence_cost = 0.0
+            success = False
+
+            for attempt in range(max_attempts[s]):
+                if attempt == 0:
+                    trade_amount = base
+                else:
+                    trade_amount = round((sequence_cost + base) / payout, 2)
+
+                if sequence_cost + trade_amount > min(capital * sim.max_trade_risk, available):
+                    break
+
+                sequence_cost += trade_amount
+                if wins[s][k]:
+                    capital += trade_amount * payout
+                    success = True
+                    break
+                capital -= trade_amount
+
+            # Las secuencias canceladas por riesgo cuentan como operación (igual
+            # que en simulate_strategy); skipped_risk indica cuántas lo fueron
+            per_operations[s] += 1
+            if sequence_cost == 0:
+                per_skipped_risk[s] += 1
+                continue
+
+            per_successes[s] += success
+            per_profit[s] += trade_amount * payout if success else -sequence_cost
+
+            bucket_exposure += sequence_cost
+            bucket_signals += 1
+            if bucket_exposure > max_exposure:
+                max_exposure = bucket_exposure
+            if bucket_signals > max_concurrent:
+                max_concurrent = bucket_signals
+
+            if capital > peak:
+                peak = capital
+            drawdown = (peak - capital) / peak * 100
+            if drawdown > max_drawdown:
+                max_drawdown = drawdown
+
+        if current_day is not None:
+            daily_equity.append((current_day, capital))
+
+        total_operations = int(per_operations.sum())
+        total_profit = capital - sim.initial_capital
+
+        strategy_table = pd.DataFrame({
+            'pattern': [s['pattern'] for s in active],
+            'pair': [s['pair'] for s in active],
+            'timeframe': [s['timeframe'] for s in active],
+            'mg_level': [s.get('mg_level') or default_mg_level for s in active],
+            'signals': [len(stream['win']) for stream in streams],
+            'operations': per_operations,
+            'successful_operations': per_successes,
+            'win_rate': np.divide(per_successes, per_operations, out=np.zeros(n_strategies),
+                                  where=per_operations > 0),
+            'profit': per_profit,
+            'skipped_risk': per_skipped_risk,
+            'skipped_daily_limit': per_skipped_daily
+        })
+
+        equity = pd.Series(
+            [value for _, value in daily_equity],
+            index=pd.to_datetime([day * NS_PER_DAY for day, _ in daily_equity], utc=True),
+            name='capital'
+        )
+
+        return {
+            'strategies_simulated': n_strategies,
+            'initial_capital': sim.initial_capital,
+            'final_capital': capital,
+            'total_profit': total_profit,
+            'roi_percentage': total_profit / sim.initial_capital * 100,
+            'total_operations': total_operations,
+            'successful_operations': int(per_successes.sum()),
+            'win_rate': per_successes.sum() / total_operations if total_operations > 0 else 0,
+            'max_drawdown': max_drawdown,
+            'days_limit_hit': days_limit_hit,
+            'max_concurrent_signals': max_concurrent,
+            'max_concurrent_exposure': max_exposure,
+            'strategy_table': strategy_table,
+            'daily_equity': equity
+        }
+
+
+def create_portfolio_simulator(simulator: OBPlusSimulator = None) -> PortfolioSimulator:
+    """Crea una instancia del simulador de cartera"""
+    return PortfolioSimulator(simulator)
+
+
+def main():
+    print("💼 SIMULACIÓN DE CARTERA OBPLUS - CAPITAL COMPARTIDO")
+    print("Todas las estrategias en un solo recorrido temporal")
+
+    portfolio = create_portfolio_simulator()
+    strategies = portfolio.simulator.load_obplus_strategies()
+    if not strategies:
+        return
+
+    try:
+        days_back = int(input("\nDías a simular (por defecto 30): ") or 30)
+    except ValueError:
+        days_back = 30
+
+    mg_level = input("Nivel MG (MG0/MG1/MG2, por defecto MG0): ").strip().upper() or 'MG0'
+    if mg_level not in portfolio.simulator.mg_levels:
+        mg_level = 'MG0'
+
+    start_time = datetime.now()
+    results = portfolio.run(strategies, days_back=days_back, default_mg_level=mg_level)
+    duration = (datetime.now() - start_time).total_seconds()
+
+    if not results:
+        print("❌ Sin resultados de cartera")
+        return
+
+    print(f"\n📊 RESULTADOS DE CARTERA ({results['strategies_simulated']} estrategias)")
+    print(f"  💰 Capital final: ${results['final_capital']:.2f} (ROI {results['roi_percentage']:.1f}%)")
+    print(f"  📈 Operaciones: {results['total_operations']} | Win rate: {results['win_rate']*100:.1f}%")
+    print(f"  📉 Drawdown máximo: {results['max_drawdown']:.1f}%")
+    print(f"  🛑 Días con límite de pérdida: {results['days_limit_hit']}")
+    print(f"  ⚡ Máx. señales simultáneas: {results['max_concurrent_signals']} "
+          f"(exposición ${results['max_concurrent_exposure']:.2f})")
+    print(f"  ⏱️ Duración: {duration:.1f} segundos")
+
+    print("\n🏆 TOP 10 ESTRATEGIAS POR BENEFICIO EN CARTERA:")
+    table = results['strategy_table'].sort_values('profit', ascending=False)
+    print(table.head(10).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# backend/price_action.py - Clasificación de velas por acción del precio (alfabeto k-ario)
+import logging
+import numpy as np
+from typing import Dict, Any, Optional
+
+from config import PATTERN_CONFIG
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+PRICE_ACTION_CONFIG = PATTERN_CONFIG.get('price_action', {})
+
+# Códigos enteros ordenados de más bajista a más alcista
+BIG_RED, SMALL_RED, DOJI, SMALL_GREEN, BIG_GREEN = range(5)
+CANDLE_CLASSES = ('big_red', 'small_red', 'doji', 'small_green', 'big_green')
+CANDLE_SYMBOLS = ('R', 'r', 'D', 'v', 'V')  # mayúscula = cuerpo grande
+
+# Sin mechas: en un paseo aleatorio E[high - low] ≈ 2 × E|close - open|
+RANGE_TO_BODY = 2.0
+
+
+def range_proxy(open_: np.ndarray, close: np.ndarray, window: int = 20) -> np.ndarray:
+    """Rango estimado por vela cuando no hay high/low (ATR sin mechas)
+
+    Rango verdadero aproximado = max(|close-open|, |open-cierre previo|,
+    |close-cierre previo|), promediado en las últimas `window` velas y
+    escalado por RANGE_TO_BODY. Solo usa velas pasadas y la actual.
+    """
+    body = np.abs(close - open_)
+    if len(body) == 0:
+        return body
+    previous_close = np.concatenate(([open_[0]], close[:-1]))
+    true_range = np.maximum.reduce([body, np.abs(open_ - previous_close), np.abs(close - previous_close)])
+
+    cumulative = np.concatenate(([0.0], np.cumsum(true_range)))
+    ends = np.arange(1, len(true_range) + 1)
+    starts = np.maximum(ends - window, 0)
+    return RANGE_TO_BODY * (cumulative[ends] - cumulative[starts]) / (ends - starts)
+
+
+def classify_candles(open_: np.ndarray, close: np.ndarray, high: Optional[np.ndarray] = None,
+                     low: Optional[np.ndarray] = None, config: Dict[str, Any] = None) -> np.ndarray:
+    """Clasificar velas en 5 clases (int8) de forma vectorizada
+
+    Doji: cuerpo < min_body_size o cuerpo <= doji_threshold × rango.
+    Cuerpo grande: cuerpo >= big_body_ratio × rango. El rango es high-low
+    si se conoce; si no, range_proxy (ventana range_window, por defecto 20).
+    """
+    config = config if config is not None else PRICE_ACTION_CONFIG
+    open_ = np.asarray(open_, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    body = np.abs(close - open_)
+
+    if high is not None and low is not None:
+        candle_range = np.asarray(high, dtype=np.float64) - np.asarray(low, dtype=np.float64)
+    else:
+        candle_range = range_proxy(open_, close, config.get('range_window', 20))
+
+    doji = (body < config.get('min_body_size', 0.0001)) | (body <= config.get('doji_threshold', 0.1) * candle_range)
+    big = body >= config.get('big_body_ratio', 0.6) * candle_range
+
+    classes = np.where(close >= open_, np.where(big, BIG_GREEN, SMALL_GREEN), np.where(big, BIG_RED, SMALL_RED))
+    classes[doji] = DOJI
+    return classes.astype(np.int8)
+
+
+def classify_frame(df, config: Dict[str, Any] = None) -> np.ndarray:
+    """Clasificar un DataFrame con open/close (y high/low si existen)"""
+    has_range = 'high' in df.columns and 'low' in df.columns
+    return classify_candles(df['open'].to_numpy(), df['close'].to_numpy(),
+                            df['high'].to_numpy() if has_range else None,
+                            df['low'].to_numpy() if has_range else None, config)
+
+
+def classes_to_green(classes: np.ndarray) -> np.ndarray:
+    """Reducir al alfabeto binario (True = verde); el doji cuenta como no verde"""
+    return np.asarray(classes) > DOJI
+
+
+def classes_to_symbols(classes: np.ndarray) -> str:
+    """Cadena de símbolos R/r/D/v/V para mostrar o guardar patrones"""
+    return ''.join(CANDLE_SYMBOLS[c] for c in classes)
+
+
+def symbols_to_classes(symbols: str) -> np.ndarray:
+    return np.array([CANDLE_SYMBOLS.index(s) for s in symbols], dtype=np.int8)
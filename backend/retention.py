@@ -0,0 +1,99 @@
+# backend/retention.py - Borrado de datos antiguos por tramos de tiempo acotados
+import os
+import json
+import time
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Optional
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+
+def _parse_time(value: str) -> datetime:
+    parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+
+def _load_checkpoint(path: Optional[str], key: str) -> Optional[datetime]:
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            value = json.load(f).get(key, {}).get('boundary')
+        return _parse_time(value) if value else None
+    except (ValueError, OSError) as e:
+        logger.warning(f"⚠️ Checkpoint de retención ilegible ({e}); se consulta la fila más antigua")
+        return None
+
+
+def _save_checkpoint(path: Optional[str], key: str, boundary: datetime, deleted: int):
+    if not path:
+        return
+    data = {}
+    if os.path.exists(path):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (ValueError, OSError):
+            data = {}
+    data[key] = {'boundary': boundary.isoformat(), 'deleted': deleted,
+                 'updated_at': datetime.now(timezone.utc).isoformat()}
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+
+def _oldest(client, table: str, time_column: str) -> Optional[datetime]:
+    result = client.table(table).select(time_column).order(time_column).limit(1).execute()
+    return _parse_time(result.data[0][time_column]) if result.data else None
+
+
+def delete_in_slices(client, table: str, time_column: str, cutoff: datetime,
+                     slice_size: timedelta = timedelta(days=1), pause: float = 0.5,
+                     max_slices: int = None, max_seconds: float = None,
+                     checkpoint_path: str = None) -> Dict[str, Any]:
+    """Borrar filas con time_column < cutoff, un tramo [inicio, inicio + slice_size) por request
+
+    Cada DELETE toca solo un día (por defecto), sin conteo previo y sin
+    devolver filas, con una pausa entre tramos para no competir con la
+    ingesta. max_slices/max_seconds acotan el trabajo por ejecución; el
+    checkpoint guarda hasta dónde se llegó y la siguiente ejecución sigue
+    desde ahí sin consultar la tabla. Es solo una optimización: si el
+    archivo se pierde se parte de la fila más antigua, sin saltar datos.
+    """
+    key = f"{table}.{time_column}"
+    started = time.monotonic()
+    report = {'table': table, 'cutoff': cutoff.isoformat(), 'deleted': 0, 'slices': 0, 'complete': False}
+
+    start = _load_checkpoint(checkpoint_path, key) or _oldest(client, table, time_column)
+    if start is None or start >= cutoff:
+        report['complete'] = True
+        return report
+
+    while start < cutoff:
+        if max_slices is not None and report['slices'] >= max_slices:
+            break
+        if max_seconds is not None and time.monotonic() - started >= max_seconds:
+            break
+
+        end = min(start + slice_size, cutoff)
+        result = client.table(table) \
+            .delete(count='exact', returning='minimal') \
+            .gte(time_column, start.isoformat()) \
+            .lt(time_column, end.isoformat()) \
+            .execute()
+
+        deleted = result.count or 0
+        report['deleted'] += deleted
+        report['slices'] += 1
+        _save_checkpoint(checkpoint_path, key, end, deleted)
+        logger.info(f"🧹 {table}: {deleted} filas de {start.date()} eliminadas")
+
+        start = end
+        if start < cutoff and pause:
+            time.sleep(pause)
+
+    report['complete'] = start >= cutoff
+    report['boundary'] = start.isoformat()
+    report['elapsed_s'] = time.monotonic() - started
+    return report
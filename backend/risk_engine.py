@@ -0,0 +1,297 @@
+# backend/risk_engine.py - Motor de riesgo Monte Carlo (bootstrap por bloques) para estrategias simuladas
+import logging
+import pandas as pd
+import numpy as np
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+from fixed_trading_simulation import OBPlusSimulator, supabase
+from obplus_signals import OBPLUS_PATTERNS, extract_sequence_signals
+from simulation_sweep import SimulationSweep
+from simulation_store import TradeLog
+from table_backup import iter_pages
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+PERCENTILES = [5, 25, 50, 75, 95]
+
+
+class MonteCarloRiskEngine:
+    """Remuestreo por bloques de la secuencia de aciertos/fallos por señal
+
+    Cada camino reconstruye una secuencia de operaciones tomando bloques
+    consecutivos de la secuencia real (bootstrap circular por bloques), así
+    se conservan las rachas. Todos los caminos avanzan a la vez con NumPy.
+    """
+
+    def __init__(self, simulator: OBPlusSimulator = None, n_paths: int = 10000,
+                 block_length: int = None, seed: int = None):
+        self.simulator = simulator or OBPlusSimulator()
+        self.n_paths = n_paths
+        self.block_length = block_length
+        self.rng = np.random.default_rng(seed)
+
+    def _default_block_length(self, n_signals: int) -> int:
+        """Longitud de bloque por defecto ~ n^(1/3)"""
+        return max(1, int(round(n_signals ** (1 / 3))))
+
+    def simulate_paths(self, wins: np.ndarray, mg_level: str = 'MG0', n_trades: int = None,
+                       n_paths: int = None, stop_at_daily_limit: bool = True) -> Dict[str, np.ndarray]:
+        """Simular n_paths caminos de n_trades operaciones remuestreadas
+
+        Aplica las mismas reglas que OBPlusSimulator: riesgo máximo por
+        secuencia MG sobre el capital actual y parada al superar max_daily_loss.
+        Con la parada activa el camino se detiene mucho antes de quedarse
+        sin capital operable, así que 'ruined' solo es informativo con
+        stop_at_daily_limit=False.
+        """
+        wins = np.asarray(wins, dtype=bool)
+        n_signals = len(wins)
+        if n_signals == 0:
+            raise ValueError("La secuencia de señales está vacía")
+
+        n_trades = n_trades or n_signals
+        n_paths = n_paths or self.n_paths
+        block_length = self.block_length or self._default_block_length(n_signals)
+
+        sim = self.simulator
+        initial_capital = float(sim.initial_capital)
+        base = float(sim.base_trade_amount)
+        payout = float(sim.payout_rate)
+        risk = float(sim.max_trade_risk)
+        loss_limit = initial_capital * sim.max_daily_loss
+        max_attempts = sim.mg_levels[mg_level]
+
+        # Montos de la escalera Martingala (iguales para todos los caminos)
+        ladder = [base]
+        for _ in range(1, max_attempts):
+            ladder.append(round((sum(ladder) + base) / payout, 2))
+        cumulative = np.cumsum(ladder)
+
+        capital = np.full(n_paths, initial_capital)
+        peak = capital.copy()
+        max_drawdown = np.zeros(n_paths)
+        active = np.ones(n_paths, dtype=bool)
+        limit_hit = np.zeros(n_paths, dtype=bool)
+        ruined = np.zeros(n_paths, dtype=bool)
+        full_mg_loss = np.zeros(n_paths, dtype=bool)
+        operations = np.zeros(n_paths, dtype=np.int32)
+        starts = np.zeros(n_paths, dtype=np.int64)
+
+        for t in range(n_trades):
+            offset = t % block_length
+            if offset == 0:
+                starts = self.rng.integers(0, n_signals, n_paths)
+            won = wins[(starts + offset) % n_signals]
+
+            budget = capital * risk
+            can_trade = active & (base <= budget)
+            ruined |= active & ~can_trade
+
+            # Ganadas: primera operación de la secuencia
+            capital += (can_trade & won) * (base * payout)
+
+            # Perdidas: tantos escalones MG como permita el riesgo por secuencia.
+            # El presupuesto baja con cada pérdida, así que se evalúa paso a paso.
+            loss_mask = can_trade & ~won
+            for step in range(max_attempts):
+                if step:
+                    loss_mask &= cumulative[step] <= capital * risk
+                capital -= loss_mask * ladder[step]
+
+            full_mg_loss |= loss_mask
+            operations += can_trade
+
+            np.maximum(peak, capital, out=peak)
+            np.maximum(max_drawdown, (peak - capital) / peak * 100, out=max_drawdown)
+
+            hit_now = (initial_capital - capital) > loss_limit
+            limit_hit |= hit_now
+            if stop_at_daily_limit:
+                active &= ~hit_now
+
+        return {
+            'final_capital': capital,
+            'max_drawdown': max_drawdown,
+            'daily_limit_hit': limit_hit,
+            'ruined': ruined,
+            'full_mg_loss': full_mg_loss,
+            'operations': operations,
+            'block_length': block_length,
+            'n_trades': n_trades,
+            'stop_at_daily_limit': stop_at_daily_limit
+        }
+
+    def summarize_paths(self, paths: Dict[str, np.ndarray]) -> Dict[str, Any]:
+        """Resumir distribuciones de los caminos simulados"""
+        initial_capital = float(self.simulator.initial_capital)
+        final_capital = paths['final_capital']
+        drawdown = paths['max_drawdown']
+
+        summary = {
+            'n_paths': len(final_capital),
+            'n_trades': paths['n_trades'],
+            'block_length': paths['block_length'],
+            'mean_final_capital': float(final_capital.mean()),
+            'prob_loss': float((final_capital < initial_capital).mean()),
+            'mean_max_drawdown': float(drawdown.mean()),
+            'prob_daily_limit_hit': float(paths['daily_limit_hit'].mean()),
+            'prob_full_mg_loss': float(paths['full_mg_loss'].mean())
+        }
+        # Con parada diaria la ruina es siempre 0: solo se reporta sin parada
+        if not paths['stop_at_daily_limit']:
+            summary['ruin_probability'] = float(paths['ruined'].mean())
+
+        for q, value in zip(PERCENTILES, np.percentile(final_capital, PERCENTILES)):
+            summary[f'final_capital_p{q}'] = float(value)
+        for q, value in zip(PERCENTILES, np.percentile(drawdown, PERCENTILES)):
+            summary[f'max_drawdown_p{q}'] = float(value)
+
+        return summary
+
+    def run_risk_analysis(self, wins: np.ndarray, mg_levels: List[str] = None,
+                          n_trades: int = None) -> Dict[str, Dict[str, Any]]:
+        """Distribuciones de riesgo por nivel MG para una secuencia de señales
+
+        Capital, drawdown y límite diario salen de caminos con la parada
+        diaria (como opera OBPlusSimulator). La ruina se mide aparte, sobre
+        caminos sin parada: ruin_probability_no_stop = P(el capital ya no
+        cubre la operación base) si se siguiera operando tras el límite.
+        """
+        mg_levels = mg_levels or list(self.simulator.mg_levels.keys())
+        wins = np.asarray(wins, dtype=bool)
+
+        results = {}
+        for mg_level in mg_levels:
+            paths = self.simulate_paths(wins, mg_level, n_trades=n_trades)
+            summary = self.summarize_paths(paths)
+
+            unstopped = self.simulate_paths(wins, mg_level, n_trades=n_trades, stop_at_daily_limit=False)
+            summary['ruin_probability_no_stop'] = float(unstopped['ruined'].mean())
+            summary['historical_win_rate'] = float(wins.mean())
+            summary['n_signals'] = len(wins)
+            results[mg_level] = summary
+
+        return results
+
+    def wins_from_trade_log(self, trade_log: TradeLog) -> np.ndarray:
+        """Secuencia de aciertos/fallos a partir del trade_log de simulate_strategy"""
+        return trade_log.sequence_wins()
+
+    def print_risk_report(self, strategy_name: str, mg_results: Dict[str, Dict[str, Any]]):
+        """Imprimir reporte de riesgo Monte Carlo comparativo"""
+        if not mg_results:
+            return
+
+        first = next(iter(mg_results.values()))
+        print(f"\n{'='*60}")
+        print(f"REPORTE DE RIESGO MONTE CARLO: {strategy_name}")
+        print(f"Caminos: {first['n_paths']:,} | Operaciones/camino: {first['n_trades']:,} | Bloque: {first['block_length']}")
+        print(f"{'='*60}")
+        print(f"{'Nivel':<6} {'Cap P5':<10} {'Cap P50':<10} {'Cap P95':<10} {'DD P95%':<9} {'P(límite)':<10} {'P(MG perdida)':<14} {'P(ruina)*':<9}")
+        print("-" * 80)
+
+        for mg_level, summary in mg_results.items():
+            print(f"{mg_level:<6} {summary['final_capital_p5']:<10.2f} {summary['final_capital_p50']:<10.2f} "
+                  f"{summary['final_capital_p95']:<10.2f} {summary['max_drawdown_p95']:<9.2f} "
+                  f"{summary['prob_daily_limit_hit']:<10.2%} {summary['prob_full_mg_loss']:<14.2%} "
+                  f"{summary['ruin_probability_no_stop']:<9.2%}")
+        print("* Ruina sin parada por límite diario")
+
+
+class MasterRiskRunner:
+    """Ejecuta el motor de riesgo para todas las estrategias de forex_strategies_master"""
+
+    def __init__(self, engine: MonteCarloRiskEngine = None, days_back: int = 30):
+        self.engine = engine or MonteCarloRiskEngine()
+        self.sweep = SimulationSweep(self.engine.simulator, max_workers=1)
+        self.days_back = days_back
+
+    def load_master_strategies(self, batch_size: int = 1000) -> List[Dict[str, Any]]:
+        """Cargar estrategias activas de forex_strategies_master (paginado por id)"""
+        strategies = []
+        for page in iter_pages(supabase, "forex_strategies_master", batch_size, filters={'is_active': True}):
+            strategies.extend(page)
+
+        print(f"✅ Cargadas {len(strategies)} estrategias activas de forex_strategies_master")
+        return strategies
+
+    def get_win_sequence(self, strategy: Dict[str, Any]) -> Optional[np.ndarray]:
+        """Secuencia de aciertos de la estrategia sobre los datos compartidos del par"""
+        if strategy['pattern'] in OBPLUS_PATTERNS:
+            signals = self.sweep.get_signals(strategy, self.days_back)
+            return signals['win'] if signals else None
+
+        data = self.sweep.candles_cache.get((strategy['pair'], strategy['timeframe']))
+        if data is None or data['green'] is None:
+            return None
+
+        signals = extract_sequence_signals(data['green'], strategy['pattern'], strategy.get('direction', 'CALL'))
+        return signals['win'] if len(signals['win']) else None
+
+    def run(self, strategies: List[Dict[str, Any]] = None, mg_levels: List[str] = None,
+            n_trades: int = None) -> pd.DataFrame:
+        """Tabla de riesgo (una fila por estrategia y nivel MG)"""
+        strategies = strategies if strategies is not None else self.load_master_strategies()
+
+        # Una sola carga por (par, timeframe)
+        for pair, timeframe in sorted({(s['pair'], s['timeframe']) for s in strategies}):
+            self.sweep._get_pair_data(pair, timeframe, self.days_back)
+
+        rows = []
+        for strategy in strategies:
+            wins = self.get_win_sequence(strategy)
+            if wins is None or len(wins) < 5:
+                continue
+
+            mg_results = self.engine.run_risk_analysis(wins, mg_levels, n_trades)
+            for mg_level, summary in mg_results.items():
+                row = {
+                    'strategy_id': strategy.get('id'),
+                    'pair': strategy['pair'],
+                    'timeframe': strategy['timeframe'],
+                    'pattern': strategy['pattern'],
+                    'direction': strategy.get('direction'),
+                    'effectiveness_db': strategy.get('effectiveness'),
+                    'mg_level': mg_level
+                }
+                row.update(summary)
+                rows.append(row)
+
+        return pd.DataFrame(rows)
+
+
+def create_risk_engine(simulator: OBPlusSimulator = None, n_paths: int = 10000,
+                       block_length: int = None, seed: int = None) -> MonteCarloRiskEngine:
+    """Crea una instancia del motor de riesgo Monte Carlo"""
+    return MonteCarloRiskEngine(simulator, n_paths, block_length, seed)
+
+
+def main():
+    print("🎲 MOTOR DE RIESGO MONTE CARLO - BOOTSTRAP POR BLOQUES")
+    print("Distribuciones de capital final, drawdown, límite diario y ruina por Martingala")
+
+    runner = MasterRiskRunner(create_risk_engine(n_paths=10000))
+
+    start_time = datetime.now()
+    table = runner.run()
+    duration = (datetime.now() - start_time).total_seconds()
+
+    print(f"\n📊 Filas de riesgo: {len(table)}")
+    print(f"📥 Cargas de datos: {runner.sweep.data_loads}")
+    print(f"⏱️ Duración: {duration:.1f} segundos")
+
+    if not table.empty:
+        print("\n⚠️ ESTRATEGIAS CON MAYOR PROBABILIDAD DE RUINA (sin parada diaria):")
+        worst = table.sort_values(['ruin_probability_no_stop', 'prob_daily_limit_hit'], ascending=False).head(10)
+        print(worst[['pattern', 'pair', 'timeframe', 'mg_level', 'final_capital_p50', 'max_drawdown_p95',
+                     'prob_daily_limit_hit', 'ruin_probability_no_stop']].to_string(index=False))
+
+        output_path = f"risk_report_{start_time.strftime('%Y%m%d_%H%M%S')}.csv"
+        table.to_csv(output_path, index=False)
+        print(f"\n💾 Reporte guardado en {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# backend/sequence_stats.py - Conteo de secuencias de velas codificadas en bits
+import logging
+import numpy as np
+from typing import Dict, Any, Tuple
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+COLOR_LABELS = ('red', 'green')
+
+
+def lower_threshold(effectiveness_threshold: float) -> float:
+    """Umbral del sesgo contrario (1 - umbral) sin error de coma flotante
+
+    1 - 0.55 da 0.44999999999999996 y dejaría fuera una efectividad de
+    exactamente 0.45; redondeado, ambos colores usan el mismo criterio.
+    """
+    return round(1 - effectiveness_threshold, 10)
+
+
+def colors_to_bits(colors, positive: str = 'green') -> np.ndarray:
+    """Convertir etiquetas de color a array booleano (True = positive)"""
+    return np.asarray(colors) == positive
+
+
+def code_to_sequence(code: int, length: int, labels: Tuple[str, ...] = COLOR_LABELS) -> Tuple[str, ...]:
+    """Decodificar un código en base len(labels) (vela más antigua = dígito alto) a tupla de etiquetas"""
+    n_symbols = len(labels)
+    return tuple(labels[(code // n_symbols ** (length - 1 - i)) % n_symbols] for i in range(length))
+
+
+class SequenceCounter:
+    """Conteos (código de secuencia, símbolo siguiente) para longitudes min..max
+
+    Por defecto el alfabeto es binario (rojo/verde); con n_symbols = k las
+    velas son enteros 0..k-1 (p. ej. las clases de price_action) y cada
+    secuencia se codifica en base k. La memoria persistente es O(k^L) por
+    longitud: nunca se guardan listas de resultados por secuencia. update()
+    admite la serie en trozos y conserva las últimas max_length velas para
+    no perder las secuencias que cruzan el borde entre trozos.
+    """
+
+    def __init__(self, min_length: int = 2, max_length: int = 5, n_symbols: int = 2):
+        self.min_length = min_length
+        self.max_length = max_length
+        self.n_symbols = n_symbols
+        self.n_candles = 0
+        self.tail = np.empty(0, dtype=np.int64)
+
+        self.counts = {length: np.zeros((n_symbols ** length, n_symbols), dtype=np.int64)
+                       for length in range(min_length, max_length + 1)}
+        # Posición global de la primera aparición (para conservar el orden de descubrimiento)
+        self.first_seen = {length: np.full(n_symbols ** length, np.iinfo(np.int64).max, dtype=np.int64)
+                           for length in range(min_length, max_length + 1)}
+
+    def update(self, symbols: np.ndarray):
+        """Agregar velas (en orden cronológico) a los conteos: booleanos (True = verde) o enteros 0..k-1"""
+        symbols = np.asarray(symbols).astype(np.int64)
+        if len(symbols) == 0:
+            return
+        if symbols.min() < 0 or symbols.max() >= self.n_symbols:
+            raise ValueError(f"Símbolos fuera del alfabeto 0..{self.n_symbols - 1}")
+
+        k = self.n_symbols
+        series = np.concatenate((self.tail, symbols))
+        offset = self.n_candles - len(self.tail)
+        n = len(series)
+
+        for length in self.counts:
+            # Solo secuencias cuyo resultado cae en las velas nuevas
+            start = max(len(self.tail) - length, 0)
+            n_windows = n - length - start
+            if n_windows <= 0:
+                continue
+
+            code = np.zeros(n_windows, dtype=np.int64)
+            for i in range(length):
+                code = code * k + series[start + i:start + i + n_windows]
+            outcome = series[start + length:start + length + n_windows]
+
+            self.counts[length] += np.bincount(
+                code * k + outcome, minlength=k ** (length + 1)
+            ).reshape(-1, k)
+            np.minimum.at(self.first_seen[length], code, offset + start + np.arange(n_windows))
+
+        self.n_candles += len(symbols)
+        self.tail = series[-self.max_length:]
+
+    def windows_counted(self, length: int) -> int:
+        """Número de secuencias de `length` velas contadas"""
+        return int(self.counts[length].sum())
+
+    def effective_sequences(self, min_occurrences: int, effectiveness_threshold: float,
+                            labels: Tuple[str, str] = COLOR_LABELS) -> Dict[str, Dict[str, Any]]:
+        """Secuencias con sesgo >= umbral hacia cualquier color (formato de los analizadores)"""
+        if self.n_symbols != 2:
+            raise ValueError("effective_sequences requiere alfabeto binario; usar effective_symbol_sequences")
+
+        effective = {}
+        red_threshold = lower_threshold(effectiveness_threshold)
+
+        for length, counts in self.counts.items():
+            totals = counts.sum(axis=1)
+            seen = np.flatnonzero(totals > 0)
+
+            for code in seen[np.argsort(self.first_seen[length][seen], kind='stable')]:
+                occurrences = int(totals[code])
+                if occurrences < min_occurrences:
+                    continue
+
+                green_count = int(counts[code, 1])
+                effectiveness = green_count / occurrences
+
+                if effectiveness >= effectiveness_threshold or effectiveness <= red_threshold:
+                    bias = labels[1] if effectiveness >= 0.5 else labels[0]
+                    final_effectiveness = effectiveness if bias == labels[1] else (1 - effectiveness)
+                    sequence = code_to_sequence(int(code), length, labels)
+
+                    effective[f"SEQ_{length}_{sequence}"] = {
+                        'sequence': sequence,
+                        'length': length,
+                        'bias': bias,
+                        'effectiveness': final_effectiveness,
+                        'occurrences': occurrences,
+                        'green_count': green_count,
+                        'red_count': occurrences - green_count
+                    }
+
+        return effective
+
+    def effective_symbol_sequences(self, min_occurrences: int, effectiveness_threshold: float,
+                                   labels: Tuple[str, ...]) -> Dict[str, Dict[str, Any]]:
+        """Alfabeto k-ario: secuencias cuyo símbolo siguiente más frecuente supera el umbral"""
+        effective = {}
+
+        for length, counts in self.counts.items():
+            totals = counts.sum(axis=1)
+            seen = np.flatnonzero(totals >= max(min_occurrences, 1))
+            best = counts[seen].argmax(axis=1)
+            best_share = counts[seen, best] / totals[seen]
+
+            for idx in np.flatnonzero(best_share >= effectiveness_threshold):
+                code = int(seen[idx])
+                sequence = code_to_sequence(code, length, labels)
+                effective[f"SEQ_{length}_{sequence}"] = {
+                    'sequence': sequence,
+                    'length': length,
+                    'next_symbol': labels[int(best[idx])],
+                    'effectiveness': float(best_share[idx]),
+                    'occurrences': int(totals[code]),
+                    'outcome_counts': {labels[s]: int(counts[code, s]) for s in range(self.n_symbols)}
+                }
+
+        return effective
+
+
+def count_sequences(symbols: np.ndarray, min_length: int = 2, max_length: int = 5,
+                    n_symbols: int = 2) -> SequenceCounter:
+    """Contar todas las secuencias de una serie completa"""
+    counter = SequenceCounter(min_length, max_length, n_symbols)
+    counter.update(symbols)
+    return counter
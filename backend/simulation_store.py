@@ -0,0 +1,206 @@
+# backend/simulation_store.py - Almacenamiento columnar de logs y resultados de simulación
+import os
+import logging
+import pandas as pd
+import numpy as np
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# pyarrow es opcional: sin él se guarda en .npz/.csv
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Una fila por intento de operación (attempt = 0: secuencia cancelada por riesgo)
+TRADE_COLUMNS = {
+    'run_id': np.int32,
+    'sequence_id': np.int32,
+    'fragment_number': np.int32,
+    'timestamp': np.int64,
+    'attempt': np.int8,
+    'predicted_call': np.bool_,
+    'actual_call': np.bool_,
+    'amount': np.float32,
+    'won': np.bool_,
+    'profit': np.float32,
+    'capital_after': np.float64
+}
+
+SUMMARY_COLUMNS = [
+    'run_id', 'strategy_name', 'pattern', 'pair', 'timeframe', 'mg_level', 'days_back',
+    'effectiveness_db', 'initial_capital', 'final_capital', 'total_profit', 'roi_percentage',
+    'total_operations', 'successful_operations', 'win_rate', 'max_drawdown', 'daily_limit_hit',
+    'avg_profit_per_operation', 'operations_per_day', 'fragments_analyzed', 'created_at'
+]
+
+
+class TradeLog:
+    """Log de operaciones como estructura de arrays (crece por duplicación)"""
+
+    def __init__(self, capacity: int = 1024):
+        self.size = 0
+        self.n_sequences = 0
+        self.columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in TRADE_COLUMNS.items()}
+
+    def __len__(self):
+        return self.size
+
+    def _reserve(self, extra: int):
+        capacity = len(self.columns['attempt'])
+        if self.size + extra <= capacity:
+            return
+        new_capacity = max(capacity * 2, self.size + extra)
+        for name, array in self.columns.items():
+            grown = np.empty(new_capacity, dtype=array.dtype)
+            grown[:self.size] = array[:self.size]
+            self.columns[name] = grown
+
+    def append_sequence(self, timestamp: Any, fragment_number: int, trade_result: Dict[str, Any],
+                        capital_after: float):
+        """Agregar una secuencia MG (resultado de execute_trade_sequence) como filas por intento"""
+        trades = trade_result['trades'] or [{'attempt': 0, 'amount': 0.0, 'result': 'CANCELLED', 'profit': 0.0}]
+        n = len(trades)
+        self._reserve(n)
+
+        start, end = self.size, self.size + n
+        cols = self.columns
+        cols['run_id'][start:end] = -1
+        cols['sequence_id'][start:end] = self.n_sequences
+        cols['fragment_number'][start:end] = fragment_number
+        cols['timestamp'][start:end] = pd.Timestamp(timestamp).value
+        cols['predicted_call'][start:end] = trade_result['predicted'] == 'CALL'
+        cols['actual_call'][start:end] = trade_result['actual'] == 'CALL'
+
+        # Capital tras cada intento a partir del capital final de la secuencia
+        capital = capital_after - sum(trade['profit'] for trade in trades)
+        for offset, trade in enumerate(trades):
+            capital += trade['profit']
+            cols['attempt'][start + offset] = trade['attempt']
+            cols['amount'][start + offset] = trade['amount']
+            cols['won'][start + offset] = trade['result'] == 'WIN'
+            cols['profit'][start + offset] = trade['profit']
+            cols['capital_after'][start + offset] = capital
+
+        self.size = end
+        self.n_sequences += 1
+
+    def column(self, name: str) -> np.ndarray:
+        return self.columns[name][:self.size]
+
+    def sequence_wins(self) -> np.ndarray:
+        """Acierto de cada secuencia (predicción == resultado), una entrada por secuencia"""
+        first = self.column('attempt') <= 1
+        return self.column('predicted_call')[first] == self.column('actual_call')[first]
+
+    def to_arrays(self, run_id: int = -1) -> Dict[str, np.ndarray]:
+        arrays = {name: self.column(name).copy() for name in TRADE_COLUMNS}
+        arrays['run_id'][:] = run_id
+        return arrays
+
+    def to_frame(self) -> pd.DataFrame:
+        frame = pd.DataFrame({name: self.column(name) for name in TRADE_COLUMNS})
+        frame['timestamp'] = pd.to_datetime(frame['timestamp'], utc=True)
+        return frame
+
+    @property
+    def nbytes(self) -> int:
+        return sum(self.column(name).nbytes for name in TRADE_COLUMNS)
+
+
+class SimulationStore:
+    """Tabla de intentos + tabla resumen por simulación, guardadas en Parquet"""
+
+    def __init__(self, base_dir: str = 'simulation_results'):
+        self.base_dir = base_dir
+        self.summaries = []
+        self.trade_chunks = []
+        self.next_run_id = 0
+
+    def add_run(self, results: Dict[str, Any], trade_log: TradeLog, days_back: int = None) -> int:
+        """Registrar una simulación (resumen + log) y devolver su run_id"""
+        run_id = self.next_run_id
+        self.next_run_id += 1
+
+        summary = {column: results.get(column) for column in SUMMARY_COLUMNS}
+        summary['run_id'] = run_id
+        summary['days_back'] = days_back
+        summary['created_at'] = datetime.now().isoformat()
+        self.summaries.append(summary)
+
+        if len(trade_log):
+            self.trade_chunks.append(trade_log.to_arrays(run_id))
+        return run_id
+
+    def _trade_arrays(self) -> Dict[str, np.ndarray]:
+        if not self.trade_chunks:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in TRADE_COLUMNS.items()}
+        return {name: np.concatenate([chunk[name] for chunk in self.trade_chunks]) for name in TRADE_COLUMNS}
+
+    def save(self, name: str = None) -> Optional[str]:
+        """Guardar trades y resumen en base_dir/<name>/ y devolver la carpeta"""
+        if not self.summaries:
+            return None
+
+        name = name or datetime.now().strftime('%Y%m%d_%H%M%S')
+        output_dir = os.path.join(self.base_dir, name)
+        os.makedirs(output_dir, exist_ok=True)
+
+        trades = self._trade_arrays()
+        summary = pd.DataFrame(self.summaries, columns=SUMMARY_COLUMNS)
+
+        if PYARROW_AVAILABLE:
+            table = pa.table({
+                **trades,
+                'timestamp': pa.array(trades['timestamp'], type=pa.timestamp('ns', tz='UTC'))
+            })
+            pq.write_table(table, os.path.join(output_dir, 'trades.parquet'), compression='zstd')
+            pq.write_table(pa.Table.from_pandas(summary, preserve_index=False),
+                           os.path.join(output_dir, 'summary.parquet'))
+        else:
+            logger.warning("pyarrow no instalado: guardando en .npz/.csv")
+            np.savez_compressed(os.path.join(output_dir, 'trades.npz'), **trades)
+            summary.to_csv(os.path.join(output_dir, 'summary.csv'), index=False)
+
+        logger.info(f"Simulación guardada en {output_dir}: {len(summary)} corridas, "
+                    f"{len(trades['attempt'])} intentos")
+        return output_dir
+
+
+def load_summary(output_dir: str) -> pd.DataFrame:
+    """Leer la tabla resumen de una carpeta de resultados"""
+    parquet_path = os.path.join(output_dir, 'summary.parquet')
+    if os.path.exists(parquet_path):
+        if not PYARROW_AVAILABLE:
+            raise ImportError("pyarrow es necesario para leer summary.parquet")
+        return pq.read_table(parquet_path).to_pandas()
+    return pd.read_csv(os.path.join(output_dir, 'summary.csv'))
+
+
+def load_trades(output_dir: str, run_ids: List[int] = None, columns: List[str] = None) -> pd.DataFrame:
+    """Leer intentos de operación, opcionalmente solo algunas corridas/columnas"""
+    parquet_path = os.path.join(output_dir, 'trades.parquet')
+    if os.path.exists(parquet_path):
+        if not PYARROW_AVAILABLE:
+            raise ImportError("pyarrow es necesario para leer trades.parquet")
+        filters = [('run_id', 'in', list(run_ids))] if run_ids is not None else None
+        return pq.read_table(parquet_path, columns=columns, filters=filters).to_pandas()
+
+    with np.load(os.path.join(output_dir, 'trades.npz')) as data:
+        names = columns or list(TRADE_COLUMNS)
+        mask = np.isin(data['run_id'], run_ids) if run_ids is not None else slice(None)
+        frame = pd.DataFrame({name: data[name][mask] for name in names})
+
+    if 'timestamp' in frame:
+        frame['timestamp'] = pd.to_datetime(frame['timestamp'], utc=True)
+    return frame
+
+
+def create_simulation_store(base_dir: str = 'simulation_results') -> SimulationStore:
+    """Crea una instancia del almacén de simulaciones"""
+    return SimulationStore(base_dir)
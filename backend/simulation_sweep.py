@@ -0,0 +1,326 @@
+# backend/simulation_sweep.py - Barrido de parámetros de simulación con datos compartidos
+import os
+import logging
+import itertools
+import pandas as pd
+import numpy as np
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Sequence
+
+from fixed_trading_simulation import OBPlusSimulator
+from obplus_signals import candles_to_green_array, build_fragment_matrix, extract_obplus_signals
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+SWEEP_COLUMNS = [
+    'strategy_key', 'pattern', 'pair', 'timeframe', 'effectiveness_db',
+    'mg_level', 'payout_rate', 'base_trade_amount', 'max_daily_loss', 'days_back',
+    'initial_capital', 'final_capital', 'total_profit', 'roi_percentage',
+    'total_operations', 'successful_operations', 'win_rate', 'max_drawdown',
+    'daily_limit_hit', 'avg_profit_per_operation', 'operations_per_day', 'fragments_analyzed'
+]
+
+
+def simulate_signal_path(win: np.ndarray, fragment_idx: np.ndarray, n_iterations: int,
+                         initial_capital: float, base_trade_amount: float, payout_rate: float,
+                         max_daily_loss: float, max_trade_risk: float, max_attempts: int,
+                         keep_path: bool = False) -> Dict[str, Any]:
+    """Recorrer una secuencia de señales precalculadas con las reglas de OBPlusSimulator
+
+    Misma lógica que simulate_strategy + execute_trade_sequence (límite de
+    pérdida, riesgo por secuencia y Martingala) pero sin recargar datos ni
+    reconstruir fragmentos.
+    """
+    capital = float(initial_capital)
+    loss_limit = initial_capital * max_daily_loss
+    n_signals = len(win)
+
+    operations = 0
+    successful = 0
+    peak = capital
+    max_drawdown = 0.0
+    daily_limit_hit = False
+
+    if keep_path:
+        capital_after = np.empty(n_signals, dtype=np.float64)
+        attempts_made = np.empty(n_signals, dtype=np.int8)
+        total_cost = np.empty(n_signals, dtype=np.float64)
+        final_profit = np.empty(n_signals, dtype=np.float64)
+
+    for k in range(n_signals):
+        # Límite de pérdida (el simulador lo comprueba antes de cada fragmento)
+        if initial_capital - capital > loss_limit:
+            daily_limit_hit = True
+            break
+
+        sequence_cost = 0.0
+        attempts = 0
+        success = False
+
+        if win[k]:
+            if base_trade_amount <= capital * max_trade_risk:
+                sequence_cost = base_trade_amount
+                capital += base_trade_amount * payout_rate
+                attempts = 1
+                success = True
+        else:
+            for attempt in range(max_attempts):
+                if attempt == 0:
+                    trade_amount = base_trade_amount
+                else:
+                    trade_amount = round((sequence_cost + base_trade_amount) / payout_rate, 2)
+
+                if sequence_cost + trade_amount > capital * max_trade_risk:
+                    break
+
+                sequence_cost += trade_amount
+                capital -= trade_amount
+                attempts += 1
+
+        if keep_path:
+            capital_after[k] = capital
+            attempts_made[k] = attempts
+            total_cost[k] = sequence_cost
+            final_profit[k] = sequence_cost * payout_rate if success else -sequence_cost
+
+        operations += 1
+        if success:
+            successful += 1
+
+        if capital > peak:
+            peak = capital
+        drawdown = (peak - capital) / peak * 100
+        if drawdown > max_drawdown:
+            max_drawdown = drawdown
+    else:
+        # Fragmentos posteriores a la última señal también comprueban el límite
+        if n_signals and fragment_idx[-1] + 1 < n_iterations and initial_capital - capital > loss_limit:
+            daily_limit_hit = True
+
+    total_profit = capital - initial_capital
+    result = {
+        'initial_capital': initial_capital,
+        'final_capital': capital,
+        'total_profit': total_profit,
+        'roi_percentage': total_profit / initial_capital * 100,
+        'total_operations': operations,
+        'successful_operations': successful,
+        'win_rate': successful / operations if operations > 0 else 0,
+        'max_drawdown': max_drawdown,
+        'daily_limit_hit': daily_limit_hit,
+        'avg_profit_per_operation': total_profit / operations if operations > 0 else 0
+    }
+
+    if keep_path:
+        result.update({
+            'capital_after': capital_after[:operations],
+            'attempts_made': attempts_made[:operations],
+            'total_cost': total_cost[:operations],
+            'final_profit': final_profit[:operations]
+        })
+
+    return result
+
+
+def _evaluate_grid_chunk(signals: Dict[str, Any], combos: List[Dict[str, Any]],
+                         static: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Evaluar todas las combinaciones de parámetros de un conjunto de señales (worker)"""
+    rows = []
+    for combo in combos:
+        result = simulate_signal_path(
+            signals['win'], signals['fragment_idx'], signals['n_iterations'],
+            initial_capital=static['initial_capital'],
+            base_trade_amount=combo['base_trade_amount'],
+            payout_rate=combo['payout_rate'],
+            max_daily_loss=combo['max_daily_loss'],
+            max_trade_risk=static['max_trade_risk'],
+            max_attempts=static['mg_levels'][combo['mg_level']]
+        )
+        row = dict(static['strategy_info'])
+        row.update(combo)
+        row.update(result)
+        row['operations_per_day'] = result['total_operations'] / combo['days_back']
+        row['fragments_analyzed'] = signals['n_fragments']
+        rows.append(row)
+    return rows
+
+
+class SimulationSweep:
+    """Barrido de parámetros: una carga por (par, timeframe) y señales calculadas una vez"""
+
+    def __init__(self, simulator: OBPlusSimulator = None, max_workers: int = None):
+        self.simulator = simulator or OBPlusSimulator()
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+        # Cache de datos y señales compartidos entre todas las combinaciones
+        self.candles_cache = {}
+        self.signals_cache = {}
+        self.data_loads = 0
+
+    def _get_pair_data(self, pair: str, timeframe: str, days_back: int) -> Optional[Dict[str, Any]]:
+        """Cargar velas de (par, timeframe) una sola vez con el mayor días atrás pedido"""
+        key = (pair, timeframe)
+        cached = self.candles_cache.get(key)
+
+        if cached is not None and cached['days_back'] >= days_back:
+            return cached
+
+        reference_time = datetime.now()
+        candles = self.simulator.load_historical_data(pair, timeframe, days_back)
+        self.data_loads += 1
+
+        if not candles:
+            self.candles_cache[key] = {'days_back': days_back, 'green': None}
+            return self.candles_cache[key]
+
+        self.candles_cache[key] = {
+            'days_back': days_back,
+            'reference_time': reference_time,
+            'times': pd.to_datetime([candle['datetime'] for candle in candles], utc=True),
+            'green': candles_to_green_array(candles)
+        }
+        return self.candles_cache[key]
+
+    def get_window(self, pair: str, timeframe: str, days_back: int) -> Optional[Dict[str, Any]]:
+        """Velas cacheadas de los últimos days_back días (mismo recorte que load_historical_data)"""
+        data = self.candles_cache.get((pair, timeframe))
+        if data is None or data['green'] is None:
+            return None
+
+        cutoff = pd.Timestamp(data['reference_time'] - timedelta(days=days_back), tz='UTC')
+        start = int(np.searchsorted(data['times'], cutoff, side='left'))
+        return {'times': data['times'][start:], 'green': data['green'][start:]}
+
+    def get_signals(self, strategy: Dict[str, Any], days_back: int) -> Optional[Dict[str, Any]]:
+        """Señales de una estrategia para una ventana de días (cacheadas)"""
+        key = (strategy['pair'], strategy['timeframe'], days_back, strategy['pattern'])
+        if key in self.signals_cache:
+            return self.signals_cache[key]
+
+        window = self.get_window(strategy['pair'], strategy['timeframe'], days_back)
+        signals = None
+
+        if window is not None:
+            green = window['green']
+            fragments = build_fragment_matrix(green)
+            if len(green) >= 20 and len(fragments) >= 5:
+                signals = extract_obplus_signals(fragments, strategy['pattern'])
+                if len(signals['win']) == 0:
+                    signals = None
+
+        self.signals_cache[key] = signals
+        return signals
+
+    def run_sweep(self, strategies: List[Dict[str, Any]],
+                  mg_levels: Sequence[str] = ('MG0', 'MG1', 'MG2'),
+                  payout_rates: Sequence[float] = None,
+                  base_trade_amounts: Sequence[float] = None,
+                  max_daily_losses: Sequence[float] = None,
+                  days_back_values: Sequence[int] = (30,)) -> pd.DataFrame:
+        """Evaluar la malla de parámetros para todas las estrategias y devolver tabla ordenada"""
+        payout_rates = payout_rates or [self.simulator.payout_rate]
+        base_trade_amounts = base_trade_amounts or [self.simulator.base_trade_amount]
+        max_daily_losses = max_daily_losses or [self.simulator.max_daily_loss]
+        max_days = max(days_back_values)
+
+        # 1. Cargar cada (par, timeframe) una sola vez
+        for pair, timeframe in sorted({(s['pair'], s['timeframe']) for s in strategies}):
+            self._get_pair_data(pair, timeframe, max_days)
+
+        # 2. Calcular señales una vez y preparar los trabajos
+        tasks = []
+        for strategy in strategies:
+            strategy_info = {
+                'strategy_key': f"{strategy['pattern']}_{strategy['pair']}_{strategy['timeframe']}",
+                'pattern': strategy['pattern'],
+                'pair': strategy['pair'],
+                'timeframe': strategy['timeframe'],
+                'effectiveness_db': strategy.get('effectiveness')
+            }
+
+            for days_back in days_back_values:
+                signals = self.get_signals(strategy, days_back)
+                if signals is None:
+                    continue
+
+                combos = [
+                    {
+                        'mg_level': mg_level,
+                        'payout_rate': payout_rate,
+                        'base_trade_amount': base_trade_amount,
+                        'max_daily_loss': max_daily_loss,
+                        'days_back': days_back
+                    }
+                    for mg_level, payout_rate, base_trade_amount, max_daily_loss in itertools.product(
+                        mg_levels, payout_rates, base_trade_amounts, max_daily_losses)
+                ]
+                static = {
+                    'strategy_info': strategy_info,
+                    'initial_capital': self.simulator.initial_capital,
+                    'max_trade_risk': self.simulator.max_trade_risk,
+                    'mg_levels': self.simulator.mg_levels
+                }
+                tasks.append((signals, combos, static))
+
+        logger.info(f"Barrido: {len(tasks)} conjuntos de señales, {self.data_loads} cargas de datos")
+
+        # 3. Evaluar la malla en paralelo
+        rows = []
+        if self.max_workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(tasks))) as executor:
+                for chunk_rows in executor.map(_evaluate_grid_chunk, *zip(*tasks)):
+                    rows.extend(chunk_rows)
+        else:
+            for task in tasks:
+                rows.extend(_evaluate_grid_chunk(*task))
+
+        return pd.DataFrame(rows, columns=SWEEP_COLUMNS)
+
+
+def create_simulation_sweep(simulator: OBPlusSimulator = None, max_workers: int = None) -> SimulationSweep:
+    """Crea una instancia del barrido de parámetros"""
+    return SimulationSweep(simulator, max_workers)
+
+
+def main():
+    print("🎯 BARRIDO DE PARÁMETROS OBPLUS - DATOS COMPARTIDOS")
+    print("Una carga por par/timeframe, señales calculadas una sola vez")
+
+    sweep = create_simulation_sweep()
+    strategies = sweep.simulator.load_obplus_strategies()
+    if not strategies:
+        return
+
+    try:
+        top_strategies = int(input("\nNúmero de estrategias a barrer (por defecto 10): ") or 10)
+    except ValueError:
+        top_strategies = 10
+
+    start_time = datetime.now()
+    table = sweep.run_sweep(
+        strategies[:top_strategies],
+        mg_levels=['MG0', 'MG1', 'MG2'],
+        payout_rates=[0.70, 0.75, 0.80, 0.85, 0.90],
+        days_back_values=[15, 30]
+    )
+    duration = (datetime.now() - start_time).total_seconds()
+
+    print(f"\n📊 Combinaciones evaluadas: {len(table)}")
+    print(f"📥 Cargas de datos: {sweep.data_loads}")
+    print(f"⏱️ Duración: {duration:.1f} segundos")
+
+    if not table.empty:
+        print("\n🏆 TOP 10 COMBINACIONES POR ROI:")
+        best = table.sort_values('roi_percentage', ascending=False).head(10)
+        print(best[['strategy_key', 'mg_level', 'payout_rate', 'days_back',
+                    'roi_percentage', 'max_drawdown', 'total_operations']].to_string(index=False))
+
+        output_path = f"sweep_results_{start_time.strftime('%Y%m%d_%H%M%S')}.csv"
+        table.to_csv(output_path, index=False)
+        print(f"\n💾 Resultados guardados en {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# backend/strategy_catalog.py - Índice en memoria de estrategias para los scripts de mantenimiento
+import logging
+from typing import Dict, List, Any, Optional, Tuple
+
+from table_backup import iter_pages
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+CATALOG_TABLES = ('forex_strategies', 'forex_strategies_master')
+MASTER_CONFLICT = 'pair,timeframe,pattern,direction'
+
+StrategyKey = Tuple[str, str, str, str]
+
+
+def strategy_key(strategy: Dict[str, Any]) -> StrategyKey:
+    return strategy['pair'], strategy['timeframe'], strategy['pattern'], strategy['direction']
+
+
+class StrategyCatalog:
+    """Estrategias indexadas por (par, timeframe, patrón, dirección)
+
+    Índice principal en un dict y secundarios por patrón y por dirección,
+    de modo que "¿ya existe?" y "referencias de este patrón" son búsquedas
+    O(1) en lugar de recorrer la lista completa por cada candidata.
+    """
+
+    def __init__(self, strategies: List[Dict[str, Any]] = None, table: str = 'forex_strategies'):
+        if table not in CATALOG_TABLES:
+            raise ValueError(f"Tabla no soportada: {table}")
+        self.table = table
+        self.by_key: Dict[StrategyKey, Dict[str, Any]] = {}
+        self.by_pattern: Dict[str, List[Dict[str, Any]]] = {}
+        self.by_direction: Dict[str, List[Dict[str, Any]]] = {}
+        self.slots = set()  # (par, timeframe, patrón) sin dirección
+
+        for strategy in strategies or []:
+            self.add(strategy)
+
+    @classmethod
+    def load(cls, db_client, table: str = 'forex_strategies', timeframe: str = None,
+             page_size: int = 1000) -> 'StrategyCatalog':
+        """Cargar la tabla una sola vez (paginada por id)"""
+        db_client.flush(table)  # incluir lo que siga en el buffer write-behind
+        filters = {'timeframe': timeframe} if timeframe else None
+        catalog = cls(table=table)
+        for page in iter_pages(db_client.client, table, page_size, filters):
+            for strategy in page:
+                catalog.add(strategy)
+        logger.info(f"📚 Catálogo {table}: {len(catalog)} estrategias")
+        return catalog
+
+    def __len__(self) -> int:
+        return len(self.by_key)
+
+    def __iter__(self):
+        return iter(self.by_key.values())
+
+    def add(self, strategy: Dict[str, Any]):
+        key = strategy_key(strategy)
+        previous = self.by_key.get(key)
+        if previous is not None:
+            self.by_pattern[key[2]].remove(previous)
+            self.by_direction[key[3]].remove(previous)
+
+        self.by_key[key] = strategy
+        self.by_pattern.setdefault(key[2], []).append(strategy)
+        self.by_direction.setdefault(key[3], []).append(strategy)
+        self.slots.add(key[:3])
+
+    def get(self, pair: str, timeframe: str, pattern: str, direction: str) -> Optional[Dict[str, Any]]:
+        return self.by_key.get((pair, timeframe, pattern, direction))
+
+    def exists(self, pair: str, timeframe: str, pattern: str, direction: str = None) -> bool:
+        """direction=None: cualquier dirección para ese (par, timeframe, patrón)"""
+        if direction is None:
+            return (pair, timeframe, pattern) in self.slots
+        return (pair, timeframe, pattern, direction) in self.by_key
+
+    def contains(self, strategy: Dict[str, Any]) -> bool:
+        return strategy_key(strategy) in self.by_key
+
+    def select(self, timeframe: str = None, pattern: str = None, direction: str = None,
+               pair: str = None) -> List[Dict[str, Any]]:
+        """Filtrar partiendo del índice secundario más selectivo disponible"""
+        if pattern is not None:
+            candidates = self.by_pattern.get(pattern, [])
+        elif direction is not None:
+            candidates = self.by_direction.get(direction, [])
+        else:
+            candidates = list(self.by_key.values())
+
+        return [s for s in candidates
+                if (timeframe is None or s['timeframe'] == timeframe) and
+                (direction is None or s['direction'] == direction) and
+                (pair is None or s['pair'] == pair)]
+
+    def best(self, pattern: str, direction: str, timeframe: str = None) -> Optional[Dict[str, Any]]:
+        """Estrategia de mayor efectividad para patrón/dirección (None si no hay)"""
+        return max(self.select(timeframe, pattern, direction), key=lambda s: s['effectiveness'], default=None)
+
+    def missing(self, strategies: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Candidatas cuya clave no está en el catálogo (sin duplicados entre ellas)"""
+        seen = set()
+        result = []
+        for strategy in strategies:
+            key = strategy_key(strategy)
+            if key not in self.by_key and key not in seen:
+                seen.add(key)
+                result.append(strategy)
+        return result
+
+    def bulk_upsert(self, db_client, strategies: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Escribir las estrategias nuevas en lotes y agregarlas al índice
+
+        forex_strategies: insert_strategies_batch (mismas columnas que
+        insert_strategy). forex_strategies_master: upsert por su clave única.
+        """
+        new_strategies = self.missing(strategies)
+        if self.table == 'forex_strategies':
+            report = db_client.insert_strategies_batch(new_strategies)
+        else:
+            report = db_client.write_batches(self.table, new_strategies, on_conflict=MASTER_CONFLICT)
+
+        failed = {strategy_key(item['record']) for item in report['failed'] if 'pair' in item['record']}
+        for strategy in new_strategies:
+            if strategy_key(strategy) not in failed:
+                self.add(strategy)
+
+        report['skipped_existing'] = len(strategies) - len(new_strategies)
+        return report
+
+
+def load_strategy_catalog(db_client, table: str = 'forex_strategies', timeframe: str = None) -> StrategyCatalog:
+    """Crea el catálogo cargando la tabla desde Supabase"""
+    return StrategyCatalog.load(db_client, table, timeframe)
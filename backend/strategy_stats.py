@@ -0,0 +1,147 @@
+# backend/strategy_stats.py - Estadísticas agregadas de estrategias en una sola consulta
+import logging
+from typing import Dict, Any
+
+from config import TIMEFRAMES_CONFIG
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+STATS_TABLES = ('forex_strategies', 'forex_strategies_master')
+STATS_GROUPS = ('timeframe', 'pair', 'source', 'strategy_type')
+
+# Función RPC: ejecutar una vez en Supabase SQL Editor.
+# Un solo recorrido de la tabla: GROUPING SETS da el total y los conteos por
+# timeframe/par/source/tipo a la vez (GROUPING() identifica cada conjunto) sobre
+# las columnas tipadas. El top-N es un ORDER BY ... LIMIT aparte. Las columnas
+# que forex_strategies no tiene (source, strategy_type, is_active) se sustituyen
+# por NULL consultando information_schema.
+STRATEGY_STATS_SQL = """
+CREATE OR REPLACE FUNCTION strategy_stats(table_name text, top_n int DEFAULT 5)
+RETURNS jsonb
+LANGUAGE plpgsql STABLE AS $$
+DECLARE
+    result jsonb;
+    source_expr text := 'NULL::text';
+    type_expr text := 'NULL::text';
+    active_expr text := 'NULL::boolean';
+BEGIN
+    IF table_name NOT IN ('forex_strategies', 'forex_strategies_master') THEN
+        RAISE EXCEPTION 'Tabla no permitida: %', table_name;
+    END IF;
+
+    SELECT coalesce(max('source::text'::text) FILTER (WHERE c.column_name = 'source'), source_expr),
+           coalesce(max('strategy_type::text'::text) FILTER (WHERE c.column_name = 'strategy_type'), type_expr),
+           coalesce(max('is_active'::text) FILTER (WHERE c.column_name = 'is_active'), active_expr)
+      INTO source_expr, type_expr, active_expr
+      FROM information_schema.columns c
+     WHERE c.table_schema = 'public' AND c.table_name = strategy_stats.table_name;
+
+    EXECUTE format($q$
+        WITH g AS (
+            SELECT GROUPING(timeframe, pair, source, strategy_type) AS set_id,
+                   timeframe, pair, source, strategy_type,
+                   count(*) AS n,
+                   count(*) FILTER (WHERE is_active) AS active,
+                   avg(effectiveness) AS avg_effectiveness,
+                   max(effectiveness) AS max_effectiveness,
+                   avg(score) AS avg_score,
+                   max(score) AS max_score,
+                   sum(occurrences) AS total_occurrences,
+                   max(analysis_date) AS last_update
+            FROM (SELECT timeframe, pair, %3$s AS source, %4$s AS strategy_type, %5$s AS is_active,
+                         effectiveness, score, occurrences, analysis_date
+                  FROM %1$I) s
+            GROUP BY GROUPING SETS ((), (timeframe), (pair), (source), (strategy_type))
+        )
+        SELECT jsonb_build_object(
+            'total_strategies', coalesce(max(n) FILTER (WHERE set_id = 15), 0),
+            'active_count', coalesce(max(active) FILTER (WHERE set_id = 15), 0),
+            'avg_effectiveness', max(avg_effectiveness) FILTER (WHERE set_id = 15),
+            'max_effectiveness', max(max_effectiveness) FILTER (WHERE set_id = 15),
+            'avg_score', max(avg_score) FILTER (WHERE set_id = 15),
+            'max_score', max(max_score) FILTER (WHERE set_id = 15),
+            'total_occurrences', max(total_occurrences) FILTER (WHERE set_id = 15),
+            'last_update', max(last_update) FILTER (WHERE set_id = 15),
+            'by_timeframe', coalesce(jsonb_object_agg(timeframe, n) FILTER (WHERE set_id = 7 AND timeframe IS NOT NULL), '{}'::jsonb),
+            'by_pair', coalesce(jsonb_object_agg(pair, n) FILTER (WHERE set_id = 11 AND pair IS NOT NULL), '{}'::jsonb),
+            'by_source', coalesce(jsonb_object_agg(source, n) FILTER (WHERE set_id = 13 AND source IS NOT NULL), '{}'::jsonb),
+            'by_strategy_type', coalesce(jsonb_object_agg(strategy_type, n) FILTER (WHERE set_id = 14 AND strategy_type IS NOT NULL), '{}'::jsonb),
+            'top_strategies', (SELECT coalesce(jsonb_agg(to_jsonb(t)), '[]'::jsonb) FROM
+                (SELECT pair, timeframe, pattern, direction, effectiveness, occurrences
+                 FROM %1$I ORDER BY effectiveness DESC NULLS LAST LIMIT %2$s) t)
+        )
+        FROM g$q$, table_name, top_n, source_expr, type_expr, active_expr) INTO result;
+
+    RETURN result;
+END
+$$;
+"""
+
+
+def _count(client, table: str, **filters) -> int:
+    """Conteo sin traer filas (HEAD + count=exact)"""
+    query = client.table(table).select('id', count='exact', head=True)
+    for column, value in filters.items():
+        query = query.eq(column, value)
+    return query.execute().count or 0
+
+
+def _fallback_stats(client, table: str, top_n: int) -> Dict[str, Any]:
+    """Sin la función RPC: solo conteos HEAD por timeframe y consultas con limit"""
+    stats = {
+        'total_strategies': _count(client, table),
+        'by_timeframe': {tf: _count(client, table, timeframe=tf) for tf in TIMEFRAMES_CONFIG},
+        'partial': True
+    }
+    if table == 'forex_strategies_master':
+        stats['active_count'] = _count(client, table, is_active=True)
+        stats['inactive_count'] = stats['total_strategies'] - stats['active_count']
+
+    result = client.table(table).select('analysis_date').order('analysis_date', desc=True).limit(1).execute()
+    if result.data:
+        stats['last_update'] = result.data[0]['analysis_date']
+
+    result = client.table(table) \
+        .select('pair, timeframe, pattern, direction, effectiveness, occurrences') \
+        .order('effectiveness', desc=True) \
+        .limit(top_n) \
+        .execute()
+    stats['top_strategies'] = result.data or []
+    return stats
+
+
+def fetch_strategy_stats(client, table: str = 'forex_strategies', top_n: int = 5) -> Dict[str, Any]:
+    """Conteos, promedios y top-N por timeframe/par/source/tipo en un solo request
+
+    Usa la función strategy_stats (STRATEGY_STATS_SQL). Si no está creada,
+    cae a conteos HEAD y marca el resultado con 'partial': True (sin
+    promedios ni agrupaciones por par/source/tipo).
+    """
+    if table not in STATS_TABLES:
+        raise ValueError(f"Tabla no soportada: {table}")
+
+    try:
+        result = client.rpc('strategy_stats', {'table_name': table, 'top_n': top_n}).execute()
+        if result.data:
+            stats = dict(result.data)
+            for group in STATS_GROUPS:
+                stats[f'by_{group}'] = stats.get(f'by_{group}') or {}
+            stats['inactive_count'] = stats['total_strategies'] - (stats.get('active_count') or 0)
+            return stats
+    except Exception as e:
+        logger.warning(f"⚠️ RPC strategy_stats no disponible ({e}); usando conteos HEAD")
+
+    return _fallback_stats(client, table, top_n)
+
+
+def main():
+    """Mostrar el SQL de la función de estadísticas"""
+    print("💡 Ejecuta este SQL en Supabase SQL Editor:")
+    print("-" * 60)
+    print(STRATEGY_STATS_SQL)
+    print("-" * 60)
+
+
+if __name__ == "__main__":
+    main()
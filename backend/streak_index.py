@@ -0,0 +1,101 @@
+# backend/streak_index.py - Índice de rachas (run-length encoding) de velas
+import logging
+import numpy as np
+from typing import Dict, Any, Optional, Tuple
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+
+def run_length_encode(green: np.ndarray) -> Dict[str, np.ndarray]:
+    """Codificar la serie de colores como rachas (color, inicio, longitud)"""
+    green = np.asarray(green, dtype=bool)
+    if len(green) == 0:
+        return {
+            'colors': np.empty(0, dtype=bool),
+            'starts': np.empty(0, dtype=np.int64),
+            'lengths': np.empty(0, dtype=np.int64)
+        }
+
+    starts = np.concatenate(([0], np.flatnonzero(green[1:] != green[:-1]) + 1))
+    lengths = np.diff(np.append(starts, len(green)))
+
+    return {'colors': green[starts], 'starts': starts, 'lengths': lengths}
+
+
+class StreakIndex:
+    """Preguntas de reversión/continuación/rachas en O(número de rachas)
+
+    Una ventana de `length` velas del mismo color cabe max(L - length + 1, 0)
+    veces en una racha de longitud L. La vela siguiente es del mismo color
+    para L - length de ellas (continuación) y del color contrario para la
+    ventana que termina en el final de la racha (reversión), salvo en la
+    última racha, que no tiene vela siguiente.
+    """
+
+    def __init__(self, green: np.ndarray):
+        runs = run_length_encode(green)
+        self.n_candles = len(green)
+        self.colors = runs['colors']
+        self.starts = runs['starts']
+        self.lengths = runs['lengths']
+
+        # La última racha no tiene vela siguiente: no cuenta como reversión
+        self.has_next = np.ones(len(self.lengths), dtype=bool)
+        if len(self.has_next):
+            self.has_next[-1] = False
+
+    @classmethod
+    def from_colors(cls, colors, positive: str = 'V') -> 'StreakIndex':
+        """Construir desde una secuencia de etiquetas ('R'/'V' o 'red'/'green')"""
+        return cls(np.asarray(colors) == positive)
+
+    @property
+    def n_runs(self) -> int:
+        return len(self.lengths)
+
+    def _color_mask(self, green: Optional[bool]) -> np.ndarray:
+        if green is None:
+            return np.ones(self.n_runs, dtype=bool)
+        return self.colors == green
+
+    def streak_outcomes(self, length: int, green: bool) -> Tuple[int, int]:
+        """(continuaciones, reversiones) tras `length` velas consecutivas de un color"""
+        mask = self._color_mask(green)
+        lengths = self.lengths[mask]
+
+        continuation = int(np.maximum(lengths - length, 0).sum())
+        reversal = int(((lengths >= length) & self.has_next[mask]).sum())
+        return continuation, reversal
+
+    def first_streak_start(self, length: int, green: bool) -> Optional[int]:
+        """Índice de la primera vela de la primera racha que produce una ocurrencia"""
+        mask = self._color_mask(green) & ((self.lengths > length) | ((self.lengths == length) & self.has_next))
+        candidates = np.flatnonzero(mask)
+        return int(self.starts[candidates[0]]) if len(candidates) else None
+
+    def streak_distribution(self, green: Optional[bool] = None) -> np.ndarray:
+        """Número de rachas por longitud (índice = longitud)"""
+        return np.bincount(self.lengths[self._color_mask(green)], minlength=1)
+
+    def reversal_probability(self, length: int, green: bool) -> Optional[float]:
+        """Probabilidad de cambio de color tras `length` velas iguales"""
+        continuation, reversal = self.streak_outcomes(length, green)
+        total = continuation + reversal
+        return reversal / total if total else None
+
+    def current_streak(self) -> Tuple[Optional[bool], int]:
+        """Color y longitud de la racha en curso (última vela)"""
+        if not self.n_runs:
+            return None, 0
+        return bool(self.colors[-1]), int(self.lengths[-1])
+
+    def summary(self) -> Dict[str, Any]:
+        """Resumen de rachas para reportes"""
+        return {
+            'n_candles': self.n_candles,
+            'n_runs': self.n_runs,
+            'avg_run_length': float(self.lengths.mean()) if self.n_runs else 0.0,
+            'max_green_run': int(self.lengths[self.colors].max()) if self.colors.any() else 0,
+            'max_red_run': int(self.lengths[~self.colors].max()) if (~self.colors).any() else 0
+        }
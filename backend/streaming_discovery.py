@@ -0,0 +1,104 @@
+# backend/streaming_discovery.py - Descubrimiento exacto sobre todo el histórico por trozos
+import logging
+import pandas as pd
+import numpy as np
+from typing import Dict, Any, Iterator, List, Optional
+
+from sequence_stats import SequenceCounter, colors_to_bits
+from time_bucket_cube import TimeBucketCube
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+
+class StreamingPatternDiscovery:
+    """Conteos exactos de secuencias y del cubo día × hora × minuto en memoria acotada
+
+    Las velas llegan por trozos en orden cronológico. SequenceCounter
+    conserva las últimas k-1 velas entre trozos, así que los conteos son
+    idénticos a procesar la serie completa sin muestreo.
+    """
+
+    def __init__(self, min_length: int = 2, max_length: int = 6):
+        self.sequences = SequenceCounter(min_length, max_length)
+        self.time_cube = TimeBucketCube()
+        self.n_candles = 0
+        self.first_datetime = None
+        self.last_datetime = None
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, min_length: int = 2, max_length: int = 6) -> 'StreamingPatternDiscovery':
+        """Construir a partir de un DataFrame ya cargado (columnas color/minute/hour/day_of_week)"""
+        discovery = cls(min_length, max_length)
+        discovery.update(df)
+        return discovery
+
+    def update(self, chunk: pd.DataFrame):
+        """Agregar un trozo de velas (orden cronológico, continuación del anterior)"""
+        if chunk is None or len(chunk) == 0:
+            return
+
+        green = colors_to_bits(chunk['color'])
+        self.sequences.update(green)
+        self.time_cube.update(chunk['day_of_week'].to_numpy(), chunk['hour'].to_numpy(),
+                              chunk['minute'].to_numpy(), green)
+
+        if self.first_datetime is None:
+            self.first_datetime = chunk['datetime'].iloc[0]
+        self.last_datetime = chunk['datetime'].iloc[-1]
+        self.n_candles += len(chunk)
+
+    def green_ratio(self) -> float:
+        return self.time_cube.counts[..., 1].sum() / self.n_candles if self.n_candles else 0.0
+
+    def effective_sequences(self, min_occurrences: int, effectiveness_threshold: float) -> Dict[str, Dict[str, Any]]:
+        return self.sequences.effective_sequences(min_occurrences, effectiveness_threshold)
+
+    def effective_fragments(self, fragment_sizes: List[int], min_occurrences: int,
+                            effectiveness_threshold: float) -> Dict[str, Dict[str, Any]]:
+        return self.time_cube.effective_fragments(fragment_sizes, min_occurrences, effectiveness_threshold)
+
+    def hourly_patterns(self, min_occurrences: int, effectiveness_threshold: float,
+                        min_day_occurrences: int = 20) -> Dict[int, Dict[str, Any]]:
+        return self.time_cube.hourly_patterns(min_occurrences, effectiveness_threshold, min_day_occurrences)
+
+
+def prepare_candle_chunk(rows: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Convertir filas de forex_candles a DataFrame con color y campos de tiempo"""
+    chunk = pd.DataFrame(rows)
+    chunk['datetime'] = pd.to_datetime(chunk['datetime'])
+    chunk['color'] = np.where(chunk['close'].astype(float) >= chunk['open'].astype(float), 'green', 'red')
+    chunk['hour'] = chunk['datetime'].dt.hour
+    chunk['minute'] = chunk['datetime'].dt.minute
+    chunk['day_of_week'] = chunk['datetime'].dt.dayofweek
+    return chunk
+
+
+def stream_candle_chunks(client, pair: str, timeframe: str, start_date: Optional[str] = None,
+                         batch_size: int = 1000) -> Iterator[pd.DataFrame]:
+    """Recorrer forex_candles en orden cronológico, paginando por datetime (keyset)"""
+    last_datetime = None
+
+    while True:
+        query = client.table("forex_candles") \
+            .select("datetime, open, close") \
+            .eq("pair", pair) \
+            .eq("timeframe", timeframe)
+
+        if last_datetime is not None:
+            query = query.gt("datetime", last_datetime)
+        elif start_date is not None:
+            query = query.gte("datetime", start_date)
+
+        result = query.order("datetime").limit(batch_size).execute()
+
+        if not result.data:
+            break
+
+        last_datetime = result.data[-1]['datetime']
+        yield prepare_candle_chunk(result.data)
+
+
+def create_streaming_discovery(min_length: int = 2, max_length: int = 6) -> StreamingPatternDiscovery:
+    """Crea una instancia del descubrimiento por trozos"""
+    return StreamingPatternDiscovery(min_length, max_length)
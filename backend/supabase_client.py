@@ -1,7 +1,12 @@
 # backend/supabase_client.py
 import os
+import time
+import atexit
 import logging
-from datetime import datetime, timezone
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone, timedelta
 from typing import Dict, List, Any, Optional
 import asyncio
 from pathlib import Path
@@ -15,16 +20,32 @@ except ImportError:
     pass
 
 try:
-    from supabase import create_client, Client
+    import supabase  # noqa: F401
 except ImportError:
     print("❌ Error: Instala supabase con: pip install supabase")
     exit(1)
 
-from config import SUPABASE_CONFIG, TIMEFRAMES_CONFIG
+from config import SUPABASE_CONFIG, TIMEFRAMES_CONFIG, PERFORMANCE_CONFIG
+from db_connection import get_shared_client, RetryingClient, is_transient_error
+from strategy_stats import fetch_strategy_stats
+from retention import delete_in_slices
 
 # Configurar logging
 logger = logging.getLogger(__name__)
 
+# Clientes vivos con cola write-behind; un único hook de salida los vacía
+# sin mantenerlos referenciados hasta el final del proceso
+_live_clients: 'weakref.WeakSet[SupabaseClient]' = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_live_clients():
+    for client in list(_live_clients):
+        try:
+            client._flush_at_exit()
+        except Exception as e:
+            logger.error(f"❌ Error vaciando cola al salir: {e}")
+
 
 class SupabaseClient:
     """Cliente para interactuar con Supabase (PostgreSQL)"""
@@ -32,19 +53,38 @@ class SupabaseClient:
     def __init__(self):
         self.url = SUPABASE_CONFIG['url']
         self.key = SUPABASE_CONFIG['key']
-        self.client: Optional[Client] = None
+        self.client: Optional[RetryingClient] = None
         self.max_retries = SUPABASE_CONFIG.get('max_retries', 3)
         self.retry_delay = SUPABASE_CONFIG.get('retry_delay', 1)
 
         if not self.url or not self.key:
             raise ValueError("SUPABASE_URL y SUPABASE_KEY son requeridos")
 
+        # Buffer write-behind: registros en cola por (tabla, on_conflict)
+        self.write_behind = PERFORMANCE_CONFIG.get('write_behind', True)
+        self.chunk_size = PERFORMANCE_CONFIG.get('chunk_size', 100)
+        self.flush_interval = PERFORMANCE_CONFIG.get('flush_interval', 5.0)
+        self.write_buffer: Dict[tuple, List[Dict[str, Any]]] = {}
+        self.flush_stats: List[Dict[str, Any]] = []
+        self.failed_writes: List[Dict[str, Any]] = []
+        self._buffer_lock = threading.Lock()
+        self._flush_timer: Optional[threading.Timer] = None
+        _live_clients.add(self)
+
+        # Cache de forex_config: se carga completa en un request y vence tras cache_ttl
+        self.config_cache: Dict[str, Any] = {}
+        self.config_cache_ttl = PERFORMANCE_CONFIG.get('cache_ttl', 3600) if PERFORMANCE_CONFIG.get('cache_enabled', True) else 0
+        self._config_loaded_at: Optional[float] = None
+        self._config_retry_at = 0.0  # tras un fallo de carga, no reintentar antes de este instante
+        self.config_retry_backoff = 60.0
+
         self._connect()
 
     def _connect(self) -> None:
         """Establecer conexión con Supabase"""
         try:
-            self.client = create_client(self.url, self.key)
+            # Cliente compartido: reutiliza el pool keep-alive y reintenta 429/5xx
+            self.client = get_shared_client(self.url, self.key)
             logger.info("✅ Conexión con Supabase establecida")
         except Exception as e:
             logger.error(f"❌ Error conectando con Supabase: {e}")
@@ -61,8 +101,69 @@ class SupabaseClient:
             logger.error(f"❌ Test de conexión fallido: {e}")
             return False
 
+    def buffer_write(self, table: str, record: Dict[str, Any], on_conflict: str = None) -> bool:
+        """Encolar un registro; se envía al llenarse el lote o a los flush_interval segundos
+
+        Devuelve True al encolar, no al escribir: los registros que fallen al
+        enviarse quedan en failed_writes (y en el valor de retorno de flush()).
+        """
+        key = (table, on_conflict)
+        with self._buffer_lock:
+            self.write_buffer.setdefault(key, []).append(record)
+            pending = len(self.write_buffer[key])
+            # Temporizador: la cola se envía aunque no lleguen más registros
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.flush_interval, self._timed_flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+        if pending >= self.chunk_size:
+            self.flush(table)  # solo la tabla llena; las demás esperan su lote o el temporizador
+        return True
+
+    def _timed_flush(self):
+        with self._buffer_lock:
+            self._flush_timer = None
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"❌ Error en flush programado: {e}")
+
+    def _flush_at_exit(self):
+        # Al salir del intérprete ThreadPoolExecutor ya no acepta tareas: enviar en serie
+        self.flush(max_concurrency=1)
+
+    def flush(self, table: str = None, max_concurrency: int = None) -> int:
+        """Enviar los registros en cola (todas las tablas o solo `table`) vía write_batches
+
+        Lotes concurrentes; un registro inválido se aísla dividiendo su lote
+        y solo ese registro pasa a failed_writes.
+        """
+        with self._buffer_lock:
+            keys = [key for key in self.write_buffer if table is None or key[0] == table]
+            pending = {key: self.write_buffer.pop(key) for key in keys}
+            if not self.write_buffer and self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+
+        written = 0
+        for (table_name, on_conflict), records in pending.items():
+            report = self.write_batches(table_name, records, on_conflict, max_concurrency=max_concurrency)
+            written += report['inserted']
+            with self._buffer_lock:
+                self.failed_writes.extend({'table': table_name, **failure} for failure in report['failed'])
+                self.flush_stats.append({'table': table_name, 'rows': len(records), 'failed': len(report['failed']),
+                                         'requests': report['requests'], 'latency_ms': report['elapsed_ms'],
+                                         'ok': not report['failed']})
+
+        return written
+
     def insert_strategy(self, strategy: Dict[str, Any]) -> bool:
-        """Insertar nueva estrategia en la base de datos"""
+        """Insertar nueva estrategia en la base de datos
+
+        Con write_behind, True significa encolada (ver buffer_write); los
+        errores de escritura se consultan en failed_writes tras flush().
+        """
         try:
             # Validar datos requeridos
             required_fields = [
@@ -90,6 +191,9 @@ class SupabaseClient:
                 'analysis_date': datetime.now(timezone.utc).isoformat()
             }
 
+            if self.write_behind:
+                return self.buffer_write('forex_strategies', insert_data)
+
             # Insertar en base de datos
             result = self.client.table('forex_strategies').insert(insert_data).execute()
 
@@ -104,55 +208,104 @@ class SupabaseClient:
             logger.error(f"❌ Error insertando estrategia: {e}")
             return False
 
-    def insert_strategies_batch(self, strategies: List[Dict[str, Any]]) -> int:
-        """Insertar múltiples estrategias en lote"""
-        successful_inserts = 0
+    def _write_rows(self, table: str, rows: List[Dict[str, Any]], on_conflict: Optional[str],
+                    report: Dict[str, Any], lock: threading.Lock) -> None:
+        """Escribir un lote; si falla por datos, dividirlo en mitades hasta aislar las filas malas
 
+        Los errores transitorios ya se reintentan con backoff en el cliente
+        compartido; si aun así fallan, el lote completo se reporta sin dividir.
+        `lock` protege solo el reporte de esta llamada a write_batches.
+        """
         try:
-            # Preparar datos en lotes de 100
-            batch_size = 100
-
-            for i in range(0, len(strategies), batch_size):
-                batch = strategies[i:i + batch_size]
-                insert_data = []
-
-                for strategy in batch:
-                    try:
-                        data = {
-                            'pair': strategy['pair'],
-                            'timeframe': strategy['timeframe'],
-                            'pattern': strategy['pattern'],
-                            'direction': strategy['direction'],
-                            'effectiveness': float(strategy['effectiveness']),
-                            'occurrences': int(strategy['occurrences']),
-                            'wins': int(strategy['wins']),
-                            'losses': int(strategy['losses']),
-                            'avg_profit': float(strategy.get('avg_profit', 0.0)),
-                            'score': float(strategy.get('score', 0.0)),
-                            'trigger_condition': strategy.get('trigger_condition', ''),
-                            'analysis_date': datetime.now(timezone.utc).isoformat()
-                        }
-                        insert_data.append(data)
-                    except Exception as e:
-                        logger.warning(f"⚠️ Error preparando estrategia: {e}")
-                        continue
-
-                # Insertar lote
-                if insert_data:
-                    result = self.client.table('forex_strategies').insert(insert_data).execute()
-                    if result.data:
-                        successful_inserts += len(result.data)
-                        logger.info(f"✅ Lote insertado: {len(result.data)} estrategias")
-
-            logger.info(f"✅ Total insertado: {successful_inserts}/{len(strategies)} estrategias")
-            return successful_inserts
-
+            query = self.client.table(table)
+            query = query.upsert(rows, on_conflict=on_conflict) if on_conflict else query.insert(rows)
+            query.execute()
+            with lock:
+                report['inserted'] += len(rows)
+                report['requests'] += 1
+            return
         except Exception as e:
-            logger.error(f"❌ Error en inserción por lotes: {e}")
-            return successful_inserts
+            with lock:
+                report['requests'] += 1
+            if len(rows) == 1 or is_transient_error(e):
+                logger.warning(f"⚠️ {len(rows)} registro(s) rechazados en {table}: {e}")
+                with lock:
+                    report['failed'].extend({'record': row, 'error': str(e)} for row in rows)
+                return
+
+        middle = len(rows) // 2
+        with lock:
+            report['bisections'] += 1
+        self._write_rows(table, rows[:middle], on_conflict, report, lock)
+        self._write_rows(table, rows[middle:], on_conflict, report, lock)
+
+    def write_batches(self, table: str, rows: List[Dict[str, Any]], on_conflict: str = None,
+                      batch_size: int = None, max_concurrency: int = None) -> Dict[str, Any]:
+        """Escribir muchos registros en lotes concurrentes sin perder datos por un lote fallido
+
+        Devuelve un reporte con insertados, filas fallidas (registro + error),
+        número de requests y divisiones realizadas.
+        """
+        batch_size = batch_size or self.chunk_size
+        max_concurrency = max_concurrency or PERFORMANCE_CONFIG.get('max_concurrent_requests', 3)
+        batches = [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+        report = {'table': table, 'total': len(rows), 'inserted': 0, 'failed': [],
+                  'batches': len(batches), 'requests': 0, 'bisections': 0}
+
+        report_lock = threading.Lock()
+        started = time.perf_counter()
+        if len(batches) == 1 or max_concurrency == 1:
+            for batch in batches:
+                self._write_rows(table, batch, on_conflict, report, report_lock)
+        elif batches:
+            with ThreadPoolExecutor(max_workers=min(max_concurrency, len(batches))) as executor:
+                list(executor.map(lambda batch: self._write_rows(table, batch, on_conflict, report, report_lock),
+                                  batches))
+        report['elapsed_ms'] = (time.perf_counter() - started) * 1000
+
+        logger.info(f"{'✅' if not report['failed'] else '⚠️'} {table}: {report['inserted']}/{report['total']} "
+                    f"registros en {report['requests']} requests ({len(report['failed'])} fallidos)")
+        return report
+
+    def insert_strategies_batch(self, strategies: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Insertar múltiples estrategias en lotes concurrentes
+
+        Devuelve el reporte de write_batches; las estrategias que no se pueden
+        preparar también aparecen en 'failed'.
+        """
+        insert_data = []
+        invalid = []
+        analysis_date = datetime.now(timezone.utc).isoformat()
+
+        for strategy in strategies:
+            try:
+                insert_data.append({
+                    'pair': strategy['pair'],
+                    'timeframe': strategy['timeframe'],
+                    'pattern': strategy['pattern'],
+                    'direction': strategy['direction'],
+                    'effectiveness': float(strategy['effectiveness']),
+                    'occurrences': int(strategy['occurrences']),
+                    'wins': int(strategy['wins']),
+                    'losses': int(strategy['losses']),
+                    'avg_profit': float(strategy.get('avg_profit', 0.0)),
+                    'score': float(strategy.get('score', 0.0)),
+                    'trigger_condition': strategy.get('trigger_condition', ''),
+                    'analysis_date': analysis_date
+                })
+            except Exception as e:
+                logger.warning(f"⚠️ Error preparando estrategia: {e}")
+                invalid.append({'record': strategy, 'error': str(e)})
+
+        report = self.write_batches('forex_strategies', insert_data)
+        report['total'] = len(strategies)
+        report['failed'] = invalid + report['failed']
+
+        logger.info(f"✅ Total insertado: {report['inserted']}/{len(strategies)} estrategias")
+        return report
 
     def insert_analysis_summary(self, summary: Dict[str, Any]) -> bool:
-        """Insertar resumen de análisis"""
+        """Insertar resumen de análisis (con write_behind, True = encolado)"""
         try:
             insert_data = {
                 'timeframe': summary['timeframe'],
@@ -163,6 +316,9 @@ class SupabaseClient:
                 'timestamp': summary['timestamp'],
             }
 
+            if self.write_behind:
+                return self.buffer_write('forex_analysis_summary', insert_data)
+
             result = self.client.table('forex_analysis_summary').insert(insert_data).execute()
 
             if result.data:
@@ -177,7 +333,11 @@ class SupabaseClient:
             return False
 
     def insert_alert(self, alert: Dict[str, Any]) -> bool:
-        """Insertar alerta"""
+        """Insertar alerta
+
+        Con write_behind, True significa encolada (ver buffer_write); los
+        errores de escritura se consultan en failed_writes tras flush().
+        """
         try:
             insert_data = {
                 'alert_type': alert['alert_type'],
@@ -189,6 +349,9 @@ class SupabaseClient:
                 'processed': alert.get('processed', False)
             }
 
+            if self.write_behind:
+                return self.buffer_write('forex_alerts', insert_data)
+
             result = self.client.table('forex_alerts').insert(insert_data).execute()
 
             if result.data:
@@ -204,6 +367,7 @@ class SupabaseClient:
 
     def get_recent_strategies(self, timeframe: str = None, limit: int = 100) -> List[Dict[str, Any]]:
         """Obtener estrategias recientes"""
+        self.flush('forex_strategies')  # leer también lo que sigue en cola
         try:
             query = self.client.table('forex_strategies').select('*')
 
@@ -226,6 +390,7 @@ class SupabaseClient:
     def get_best_strategies(self, timeframe: str = None, min_effectiveness: float = 80.0, limit: int = 50) -> List[
         Dict[str, Any]]:
         """Obtener mejores estrategias"""
+        self.flush('forex_strategies')  # leer también lo que sigue en cola
         try:
             query = self.client.table('forex_strategies').select('*')
 
@@ -248,6 +413,7 @@ class SupabaseClient:
 
     def get_strategy_by_pattern(self, pair: str, timeframe: str, pattern: str) -> Optional[Dict[str, Any]]:
         """Buscar estrategia específica por patrón"""
+        self.flush('forex_strategies')  # leer también lo que sigue en cola
         try:
             result = (self.client.table('forex_strategies')
                       .select('*')
@@ -267,69 +433,79 @@ class SupabaseClient:
             logger.error(f"❌ Error buscando estrategia: {e}")
             return None
 
-    def cleanup_old_strategies(self, days: int = 30) -> int:
-        """Limpiar estrategias antiguas"""
+    def cleanup_old_strategies(self, days: int = 30, max_slices: int = 7, max_seconds: float = 60.0) -> int:
+        """Limpiar estrategias antiguas
+
+        Como mucho max_slices días o max_seconds por llamada; lo pendiente
+        se borra en la siguiente (retoma desde la fila más antigua).
+        """
         try:
             cutoff_date = datetime.now(timezone.utc).replace(
                 hour=0, minute=0, second=0, microsecond=0
             ) - timedelta(days=days)
 
-            result = (self.client.table('forex_strategies')
-                      .delete()
-                      .lt('analysis_date', cutoff_date.isoformat())
-                      .execute())
-
-            deleted_count = len(result.data) if result.data else 0
-            logger.info(f"✅ Limpieza completada: {deleted_count} estrategias eliminadas")
+            # Tramos de un día en lugar de un DELETE sobre toda la tabla
+            report = delete_in_slices(self.client, 'forex_strategies', 'analysis_date', cutoff_date, pause=0.2,
+                                      max_slices=max_slices, max_seconds=max_seconds)
+            deleted_count = report['deleted']
+            logger.info(f"✅ Limpieza: {deleted_count} estrategias eliminadas"
+                        f"{'' if report['complete'] else ' (continúa en la próxima ejecución)'}")
             return deleted_count
 
         except Exception as e:
             logger.error(f"❌ Error en limpieza: {e}")
             return 0
 
-    def get_config_value(self, key: str, default: Any = None) -> Any:
-        """Obtener valor de configuración"""
-        try:
-            result = (self.client.table('forex_config')
-                      .select('config_value')
-                      .eq('config_key', key)
-                      .execute())
+    def preload_config(self) -> int:
+        """Cargar todas las claves de forex_config en el cache (un solo request)
 
-            if result.data:
-                return result.data[0]['config_value']
-            else:
-                return default
+        Si falla se conserva el cache anterior y no se vuelve a intentar
+        hasta pasados config_retry_backoff segundos.
+        """
+        try:
+            result = self.client.table('forex_config').select('config_key, config_value').execute()
+            self.config_cache = {row['config_key']: row['config_value'] for row in result.data or []}
+            self._config_loaded_at = time.monotonic()
+            logger.debug(f"Configuración cargada: {len(self.config_cache)} claves")
+            return len(self.config_cache)
 
         except Exception as e:
-            logger.error(f"❌ Error obteniendo configuración: {e}")
-            return default
+            self._config_retry_at = time.monotonic() + self.config_retry_backoff
+            logger.error(f"❌ Error cargando configuración (reintento en {self.config_retry_backoff:.0f}s): {e}")
+            return 0
+
+    def _refresh_config_cache(self) -> bool:
+        """Recargar si el cache venció y no estamos en backoff; True si el cache es de una carga exitosa"""
+        now = time.monotonic()
+        expired = self._config_loaded_at is None or now - self._config_loaded_at >= self.config_cache_ttl
+        if expired and now >= self._config_retry_at:
+            self.preload_config()
+        return self._config_loaded_at is not None
+
+    def get_config_value(self, key: str, default: Any = None) -> Any:
+        """Obtener valor de configuración (desde cache; recarga todo al vencer el TTL)"""
+        self._refresh_config_cache()
+        return self.config_cache.get(key, default)
 
     def set_config_value(self, key: str, value: str, description: str = None) -> bool:
-        """Establecer valor de configuración"""
+        """Establecer valor de configuración (un solo upsert por config_key)"""
         try:
-            # Verificar si existe
-            existing = (self.client.table('forex_config')
-                        .select('id')
-                        .eq('config_key', key)
-                        .execute())
-
-            if existing.data:
-                # Actualizar
-                result = (self.client.table('forex_config')
-                          .update({'config_value': value, 'updated_at': datetime.now(timezone.utc).isoformat()})
-                          .eq('config_key', key)
-                          .execute())
-            else:
-                # Insertar
-                result = (self.client.table('forex_config')
-                          .insert({
-                    'config_key': key,
-                    'config_value': value,
-                    'description': description or f'Configuración para {key}'
-                })
-                          .execute())
+            data = {
+                'config_key': key,
+                'config_value': value,
+                'updated_at': datetime.now(timezone.utc).isoformat()
+            }
+            # La descripción por defecto solo aplica a claves que seguro no existen:
+            # sin una carga válida del cache no se envía (no pisar la existente)
+            if description:
+                data['description'] = description
+            elif self._refresh_config_cache() and key not in self.config_cache:
+                data['description'] = f'Configuración para {key}'
+
+            result = self.client.table('forex_config').upsert(data, on_conflict='config_key').execute()
 
             if result.data:
+                self.config_cache[key] = value
                 logger.info(f"✅ Configuración actualizada: {key} = {value}")
                 return True
             else:
@@ -341,32 +517,17 @@ class SupabaseClient:
 
     def get_database_stats(self) -> Dict[str, Any]:
         """Obtener estadísticas de la base de datos"""
+        self.flush('forex_strategies')  # leer también lo que sigue en cola
         try:
-            stats = {}
-
-            # Total de estrategias
-            result = self.client.table('forex_strategies').select('*', count='exact').execute()
-            stats['total_strategies'] = result.count
-
-            # Estrategias por timeframe
-            timeframe_stats = {}
-            for tf in TIMEFRAMES_CONFIG.keys():
-                result = (self.client.table('forex_strategies')
-                          .select('*', count='exact')
-                          .eq('timeframe', tf)
-                          .execute())
-                timeframe_stats[tf] = result.count
-            stats['by_timeframe'] = timeframe_stats
-
-            # Última actualización
-            result = (self.client.table('forex_strategies')
-                      .select('analysis_date')
-                      .order('analysis_date', desc=True)
-                      .limit(1)
-                      .execute())
+            # Una llamada RPC agregada (o conteos HEAD) en lugar de traer filas
+            summary = fetch_strategy_stats(self.client, 'forex_strategies')
+            stats = {
+                'total_strategies': summary['total_strategies'],
+                'by_timeframe': {tf: summary['by_timeframe'].get(tf, 0) for tf in TIMEFRAMES_CONFIG.keys()}
+            }
 
-            if result.data:
-                stats['last_update'] = result.data[0]['analysis_date']
+            if summary.get('last_update'):
+                stats['last_update'] = summary['last_update']
 
             logger.info("✅ Estadísticas obtenidas")
             return stats
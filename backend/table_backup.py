@@ -0,0 +1,280 @@
+# backend/table_backup.py - Backup y restauración en streaming (paginación por clave)
+import io
+import os
+import sys
+import gzip
+import json
+import time
+import logging
+from datetime import datetime
+from typing import Dict, List, Any, Iterator
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+from config import PERFORMANCE_CONFIG
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Tablas soportadas -> columna de clave (paginación y on_conflict al restaurar)
+BACKUP_TABLES = {
+    'forex_strategies': 'id',
+    'forex_strategies_master': 'id',
+    'forex_candles': 'id'
+}
+
+# Tipos Parquet explícitos por tabla (PostgREST devuelve fechas como texto ISO y
+# DECIMAL como número). Las columnas no listadas (jsonb, columnas nuevas) se
+# guardan como texto JSON y se decodifican al restaurar: así una página donde
+# la columna es toda null no fija un tipo que rompa las siguientes.
+STRATEGY_COLUMN_TYPES = {
+    'id': 'int64', 'pair': 'string', 'timeframe': 'string', 'pattern': 'string', 'direction': 'string',
+    'effectiveness': 'float64', 'occurrences': 'int64', 'wins': 'int64', 'losses': 'int64',
+    'avg_profit': 'float64', 'score': 'float64', 'trigger_condition': 'string',
+    'analysis_date': 'string', 'created_at': 'string'
+}
+
+BACKUP_COLUMN_TYPES = {
+    'forex_strategies': STRATEGY_COLUMN_TYPES,
+    'forex_strategies_master': {
+        **STRATEGY_COLUMN_TYPES,
+        'strategy_type': 'string', 'source': 'string', 'validation_method': 'string',
+        'data_quality': 'string', 'is_active': 'bool', 'added_to_master': 'string'
+    },
+    'forex_candles': {
+        'id': 'int64', 'pair': 'string', 'timeframe': 'string', 'datetime': 'string',
+        'open': 'float64', 'high': 'float64', 'low': 'float64', 'close': 'float64',
+        'volume': 'int64', 'created_at': 'string'
+    }
+}
+
+FORMAT_EXTENSIONS = {'ndjson.gz': '.ndjson.gz', 'ndjson.zst': '.ndjson.zst', 'parquet': '.parquet'}
+
+
+def detect_format(path: str) -> str:
+    for fmt, extension in FORMAT_EXTENSIONS.items():
+        if path.endswith(extension):
+            return fmt
+    raise ValueError(f"Formato no reconocido: {path} (usar {', '.join(FORMAT_EXTENSIONS.values())})")
+
+
+def iter_pages(client, table: str, page_size: int = 1000, filters: Dict[str, Any] = None,
+               key: str = None) -> Iterator[List[Dict[str, Any]]]:
+    """Páginas ordenadas por clave: cada request es `key > última clave vista`
+
+    A diferencia de offset/range, el coste de cada página no crece con la
+    posición y no se saltan ni repiten filas si la tabla recibe inserts.
+    """
+    key = key or BACKUP_TABLES.get(table, 'id')
+    last = None
+    while True:
+        query = client.table(table).select('*')
+        for column, value in (filters or {}).items():
+            query = query.eq(column, value)
+        if last is not None:
+            query = query.gt(key, last)
+        page = query.order(key).limit(page_size).execute().data or []
+        # Solo una página vacía marca el final: PostgREST puede devolver menos
+        # filas que page_size si su max-rows es menor
+        if not page:
+            return
+        yield page
+        last = page[-1][key]
+
+
+class _NDJSONWriter:
+    def __init__(self, path: str, fmt: str):
+        if fmt == 'ndjson.zst':
+            if zstandard is None:
+                raise ImportError("Instala zstandard con: pip install zstandard")
+            self._raw = open(path, 'wb')
+            self._file = zstandard.ZstdCompressor().stream_writer(self._raw)
+        else:
+            self._raw = None
+            self._file = gzip.open(path, 'wb')
+
+    def write(self, rows: List[Dict[str, Any]]):
+        self._file.write(''.join(json.dumps(row, default=str) + '\n' for row in rows).encode('utf-8'))
+
+    def close(self):
+        self._file.close()
+        if self._raw is not None:
+            self._raw.close()
+
+
+class _ParquetWriter:
+    def __init__(self, path: str, column_types: Dict[str, str] = None):
+        if pq is None:
+            raise ImportError("Instala pyarrow con: pip install pyarrow")
+        self.path = path
+        self.column_types = column_types or {}
+        self.json_columns: List[str] = []
+        self._writer = None
+
+    def _schema(self, rows: List[Dict[str, Any]]):
+        columns = list(dict.fromkeys(column for row in rows for column in row))
+        fields = []
+        for column in columns:
+            type_name = self.column_types.get(column)
+            if type_name is None:
+                self.json_columns.append(column)
+                type_name = 'string'
+            fields.append(pa.field(column, getattr(pa, type_name)()))
+        return pa.schema(fields, metadata={'json_columns': json.dumps(self.json_columns)})
+
+    def write(self, rows: List[Dict[str, Any]]):
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, self._schema(rows))
+        if self.json_columns:
+            rows = [{**row, **{column: json.dumps(row[column], default=str)
+                               for column in self.json_columns if row.get(column) is not None}}
+                    for row in rows]
+        self._writer.write_table(pa.Table.from_pylist(rows, schema=self._writer.schema))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def _open_writer(path: str, fmt: str, table: str = None):
+    if fmt == 'parquet':
+        return _ParquetWriter(path, BACKUP_COLUMN_TYPES.get(table))
+    return _NDJSONWriter(path, fmt)
+
+
+def backup_table(client, table: str, path: str, page_size: int = 1000,
+                 filters: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Volcar una tabla a disco página a página (memoria acotada a una página)"""
+    fmt = detect_format(path)
+    started = time.perf_counter()
+    rows = pages = 0
+
+    writer = _open_writer(path, fmt, table)
+    try:
+        for page in iter_pages(client, table, page_size, filters):
+            writer.write(page)
+            rows += len(page)
+            pages += 1
+            if pages % 50 == 0:
+                logger.info(f"💾 {table}: {rows} filas respaldadas")
+    finally:
+        writer.close()
+
+    report = {'table': table, 'path': path, 'format': fmt, 'rows': rows, 'pages': pages,
+              'bytes': os.path.getsize(path) if os.path.exists(path) else 0,
+              'elapsed_s': time.perf_counter() - started}
+    logger.info(f"✅ Backup {table}: {rows} filas en {path} ({report['bytes'] / 1024:.0f} KB)")
+    return report
+
+
+def iter_backup(path: str, batch_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+    """Leer un backup en lotes sin cargar el archivo completo"""
+    fmt = detect_format(path)
+
+    if fmt == 'parquet':
+        if pq is None:
+            raise ImportError("Instala pyarrow con: pip install pyarrow")
+        parquet = pq.ParquetFile(path)
+        metadata = parquet.schema_arrow.metadata or {}
+        json_columns = json.loads(metadata.get(b'json_columns', b'[]'))
+        for batch in parquet.iter_batches(batch_size=batch_size):
+            rows = batch.to_pylist()
+            for row in rows:
+                for column in json_columns:
+                    if row.get(column) is not None:
+                        row[column] = json.loads(row[column])
+            yield rows
+        return
+
+    if fmt == 'ndjson.zst':
+        if zstandard is None:
+            raise ImportError("Instala zstandard con: pip install zstandard")
+        raw = open(path, 'rb')
+        stream = io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(raw), encoding='utf-8')
+    else:
+        raw = None
+        stream = gzip.open(path, 'rt', encoding='utf-8')
+
+    try:
+        batch = []
+        for line in stream:
+            if line.strip():
+                batch.append(json.loads(line))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+    finally:
+        stream.close()
+        if raw is not None:
+            raw.close()
+
+
+def restore_table(db_client, table: str, path: str, batch_size: int = None,
+                  on_conflict: str = None) -> Dict[str, Any]:
+    """Restaurar un backup con upserts por lotes (SupabaseClient.write_batches)
+
+    Se leen a la vez solo batch_size × max_concurrent_requests filas; las
+    filas rechazadas se acumulan en el reporte en lugar de abortar.
+    """
+    on_conflict = on_conflict or BACKUP_TABLES.get(table, 'id')
+    batch_size = batch_size or db_client.chunk_size
+    window = batch_size * PERFORMANCE_CONFIG.get('max_concurrent_requests', 3)
+    report = {'table': table, 'path': path, 'total': 0, 'inserted': 0, 'failed': [], 'requests': 0}
+
+    for rows in iter_backup(path, window):
+        partial = db_client.write_batches(table, rows, on_conflict=on_conflict, batch_size=batch_size)
+        for field in ('total', 'inserted', 'requests'):
+            report[field] += partial[field]
+        report['failed'].extend(partial['failed'])
+
+    logger.info(f"✅ Restauración {table}: {report['inserted']}/{report['total']} filas "
+                f"({len(report['failed'])} fallidas)")
+    return report
+
+
+def backup_tables(client, directory: str, tables: List[str] = None, fmt: str = 'ndjson.gz',
+                  page_size: int = 1000) -> Dict[str, Dict[str, Any]]:
+    """Backup de varias tablas en `directory` (un archivo por tabla)"""
+    os.makedirs(directory, exist_ok=True)
+    reports = {}
+    for table in tables or list(BACKUP_TABLES):
+        path = os.path.join(directory, f"{table}{FORMAT_EXTENSIONS[fmt]}")
+        reports[table] = backup_table(client, table, path, page_size)
+    return reports
+
+
+def main():
+    """Uso: python table_backup.py backup <directorio> [tabla ...]
+            python table_backup.py restore <archivo> <tabla>"""
+    from supabase_client import create_supabase_client
+
+    logging.basicConfig(level=logging.INFO)
+    args = sys.argv[1:]
+    db_client = create_supabase_client()
+
+    if len(args) >= 1 and args[0] == 'backup':
+        directory = args[1] if len(args) > 1 else f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        reports = backup_tables(db_client.client, directory, args[2:] or None)
+        for table, report in reports.items():
+            print(f"💾 {table}: {report['rows']} filas -> {report['path']}")
+    elif len(args) == 3 and args[0] == 'restore':
+        report = restore_table(db_client, args[2], args[1])
+        print(f"♻️ {args[2]}: {report['inserted']}/{report['total']} filas restauradas, "
+              f"{len(report['failed'])} fallidas")
+    else:
+        print(main.__doc__)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+# backend/technical_indicators.py - RSI, medias móviles y Bollinger (lote y streaming)
+import os
+import json
+import logging
+import pandas as pd
+import numpy as np
+from typing import Dict, List, Any, Optional, Tuple
+
+from config import PATTERN_CONFIG
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+INDICATOR_CONFIG = PATTERN_CONFIG.get('technical_indicators', {})
+
+
+def _settings(config: Dict[str, Any] = None) -> Dict[str, Any]:
+    config = config if config is not None else INDICATOR_CONFIG
+    return {
+        'rsi_period': config.get('rsi_period', 14),
+        'ma_periods': list(config.get('ma_periods', [20, 50, 200])),
+        'bollinger_period': config.get('bollinger_period', 20),
+        'bollinger_std': config.get('bollinger_std', 2.0),
+        'rsi_oversold': config.get('rsi_oversold', 30),
+        'rsi_overbought': config.get('rsi_overbought', 70)
+    }
+
+
+def compute_indicators(close: np.ndarray, config: Dict[str, Any] = None) -> pd.DataFrame:
+    """Modo lote: indicadores sobre toda la serie de cierres (NaN hasta llenar cada ventana)
+
+    RSI con suavizado de Wilder (media exponencial alpha = 1/periodo desde
+    la primera variación); Bollinger con desviación poblacional. Coincide
+    con lo que produce IndicatorState vela a vela.
+    """
+    settings = _settings(config)
+    close = pd.Series(np.asarray(close, dtype=np.float64))
+    frame = pd.DataFrame(index=close.index)
+
+    period = settings['rsi_period']
+    change = close.diff()
+    avg_gain = change.clip(lower=0).iloc[1:].ewm(alpha=1 / period, adjust=False).mean()
+    avg_loss = (-change).clip(lower=0).iloc[1:].ewm(alpha=1 / period, adjust=False).mean()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+    rsi[avg_loss == 0] = 100.0
+    rsi.iloc[:period - 1] = np.nan  # primer valor tras `period` variaciones
+    frame['rsi'] = rsi.reindex(close.index)
+
+    for ma_period in settings['ma_periods']:
+        frame[f'ma_{ma_period}'] = close.rolling(ma_period).mean()
+
+    bb_period = settings['bollinger_period']
+    mid = close.rolling(bb_period).mean()
+    std = close.rolling(bb_period).std(ddof=0)
+    frame['bb_mid'] = mid
+    frame['bb_upper'] = mid + settings['bollinger_std'] * std
+    frame['bb_lower'] = mid - settings['bollinger_std'] * std
+    frame['close'] = close
+
+    return frame
+
+
+def indicator_conditions(frame: pd.DataFrame, config: Dict[str, Any] = None) -> Dict[str, np.ndarray]:
+    """Condiciones booleanas por vela utilizables como patrones (nombre -> máscara)"""
+    settings = _settings(config)
+    conditions = {
+        f"RSI<{settings['rsi_oversold']}": (frame['rsi'] < settings['rsi_oversold']).to_numpy(),
+        f"RSI>{settings['rsi_overbought']}": (frame['rsi'] > settings['rsi_overbought']).to_numpy(),
+        'CLOSE<BB_LOWER': (frame['close'] < frame['bb_lower']).to_numpy(),
+        'CLOSE>BB_UPPER': (frame['close'] > frame['bb_upper']).to_numpy()
+    }
+
+    ma_periods = sorted(settings['ma_periods'])
+    for fast, slow in zip(ma_periods, ma_periods[1:]):
+        conditions[f'MA{fast}>MA{slow}'] = (frame[f'ma_{fast}'] > frame[f'ma_{slow}']).to_numpy()
+        conditions[f'MA{fast}<MA{slow}'] = (frame[f'ma_{fast}'] < frame[f'ma_{slow}']).to_numpy()
+
+    return conditions
+
+
+class IndicatorState:
+    """Modo streaming: indicadores en O(1) por vela con estado reanudable
+
+    Guarda un buffer circular con los últimos max(periodos) cierres y las
+    sumas móviles de cada ventana; la vela que sale de la ventana se resta
+    en lugar de recalcular la media de 200 velas.
+    """
+
+    def __init__(self, config: Dict[str, Any] = None):
+        self.settings = _settings(config)
+        self.window = max(self.settings['ma_periods'] + [self.settings['bollinger_period']])
+        self.buffer = np.zeros(self.window)
+        self.n = 0
+        self.prev_close = None
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.sums = {period: 0.0 for period in self._sum_periods()}
+        self.bb_sum_sq = 0.0
+
+    def _sum_periods(self) -> List[int]:
+        return sorted(set(self.settings['ma_periods'] + [self.settings['bollinger_period']]))
+
+    def update(self, close: float) -> Dict[str, Optional[float]]:
+        """Agregar un cierre y devolver los indicadores de esta vela"""
+        close = float(close)
+
+        # RSI (Wilder)
+        rsi_period = self.settings['rsi_period']
+        if self.prev_close is not None:
+            change = close - self.prev_close
+            gain, loss = max(change, 0.0), max(-change, 0.0)
+            if self.n == 1:
+                self.avg_gain, self.avg_loss = gain, loss
+            else:
+                alpha = 1 / rsi_period
+                self.avg_gain += alpha * (gain - self.avg_gain)
+                self.avg_loss += alpha * (loss - self.avg_loss)
+        self.prev_close = close
+
+        # Sumas móviles: entra `close`, sale la vela de hace `period` barras
+        for period in self.sums:
+            self.sums[period] += close
+            if self.n >= period:
+                self.sums[period] -= self.buffer[(self.n - period) % self.window]
+
+        bb_period = self.settings['bollinger_period']
+        self.bb_sum_sq += close * close
+        if self.n >= bb_period:
+            leaving = self.buffer[(self.n - bb_period) % self.window]
+            self.bb_sum_sq -= leaving * leaving
+
+        self.buffer[self.n % self.window] = close
+        self.n += 1
+
+        return self.values()
+
+    def values(self) -> Dict[str, Optional[float]]:
+        """Indicadores de la última vela (None hasta llenar cada ventana)"""
+        settings = self.settings
+        values = {'close': self.prev_close}
+
+        if self.n > settings['rsi_period']:
+            values['rsi'] = 100.0 if self.avg_loss == 0 else 100 - 100 / (1 + self.avg_gain / self.avg_loss)
+        else:
+            values['rsi'] = None
+
+        for period in settings['ma_periods']:
+            values[f'ma_{period}'] = self.sums[period] / period if self.n >= period else None
+
+        bb_period = settings['bollinger_period']
+        if self.n >= bb_period:
+            mid = self.sums[bb_period] / bb_period
+            std = np.sqrt(max(self.bb_sum_sq / bb_period - mid * mid, 0.0))
+            values.update({'bb_mid': mid, 'bb_upper': mid + settings['bollinger_std'] * std,
+                           'bb_lower': mid - settings['bollinger_std'] * std})
+        else:
+            values.update({'bb_mid': None, 'bb_upper': None, 'bb_lower': None})
+
+        return values
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Estado serializable (JSON) para reanudar sin recalcular"""
+        ordered = np.roll(self.buffer, -(self.n % self.window)) if self.n >= self.window else self.buffer[:self.n]
+        return {
+            'settings': self.settings,
+            'n': self.n,
+            'recent_closes': [float(x) for x in ordered],
+            'prev_close': self.prev_close,
+            'avg_gain': self.avg_gain,
+            'avg_loss': self.avg_loss,
+            'sums': {str(period): total for period, total in self.sums.items()},
+            'bb_sum_sq': self.bb_sum_sq
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'IndicatorState':
+        state = cls(data['settings'])
+        state.n = data['n']
+        recent = np.asarray(data['recent_closes'], dtype=np.float64)
+        # Reubicar el buffer para que la vela k siga en la posición k % window
+        positions = (np.arange(state.n - len(recent), state.n)) % state.window
+        state.buffer[positions] = recent
+        state.prev_close = data['prev_close']
+        state.avg_gain = data['avg_gain']
+        state.avg_loss = data['avg_loss']
+        state.sums = {int(period): total for period, total in data['sums'].items()}
+        state.bb_sum_sq = data['bb_sum_sq']
+        return state
+
+
+class IndicatorEngine:
+    """Estados de indicadores por (par, timeframe) para el camino en vivo
+
+    Con state_dir, frame_conditions() persiste por par/timeframe el
+    IndicatorState, la última vela procesada y las condiciones de las velas
+    de la ventana: cada ejecución solo pasa por update() las velas nuevas.
+    """
+
+    def __init__(self, config: Dict[str, Any] = None, state_dir: str = None):
+        self.config = config if config is not None else INDICATOR_CONFIG
+        self.states: Dict[Tuple[str, str], IndicatorState] = {}
+        self.state_dir = state_dir
+        self.last_timestamps: Dict[Tuple[str, str], Optional[pd.Timestamp]] = {}
+        # Condiciones por vela (bits en el orden de condition_names) indexadas por tiempo
+        self.condition_history: Dict[Tuple[str, str], pd.Series] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.config.get('enabled', False))
+
+    def compute(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Modo lote sobre un DataFrame con columna close"""
+        return compute_indicators(df['close'].to_numpy(dtype=np.float64), self.config)
+
+    def warm_up(self, pair: str, timeframe: str, closes: np.ndarray) -> IndicatorState:
+        """Inicializar el estado de un par con su histórico (una pasada)"""
+        state = IndicatorState(self.config)
+        for close in closes:
+            state.update(close)
+        self.states[(pair, timeframe)] = state
+        return state
+
+    def update(self, pair: str, timeframe: str, close: float) -> Dict[str, Optional[float]]:
+        """Agregar la vela nueva de un par y devolver sus indicadores"""
+        key = (pair, timeframe)
+        if key not in self.states:
+            self.states[key] = IndicatorState(self.config)
+        return self.states[key].update(close)
+
+    def condition_names(self) -> List[str]:
+        return list(indicator_conditions(compute_indicators(np.zeros(1), self.config), self.config))
+
+    def _path(self, pair: str, timeframe: str) -> str:
+        return os.path.join(self.state_dir, f"indicators_{pair}_{timeframe}.json")
+
+    def _load_key(self, pair: str, timeframe: str):
+        key = (pair, timeframe)
+        if key in self.states or not self.state_dir:
+            return
+        path = self._path(pair, timeframe)
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            if data['names'] != self.condition_names():
+                return  # configuración distinta: se recalcula desde la ventana
+            self.states[key] = IndicatorState.from_dict(data['state'])
+            self.last_timestamps[key] = pd.Timestamp(data['last_timestamp'])
+            self.condition_history[key] = pd.Series(
+                data['flags'], index=pd.to_datetime(data['times'], utc=True), dtype=np.int64)
+        except (ValueError, KeyError, OSError) as e:
+            logger.warning(f"⚠️ Estado de indicadores ilegible para {pair} {timeframe} ({e}); se recalcula")
+
+    def _save_key(self, pair: str, timeframe: str):
+        if not self.state_dir:
+            return
+        key = (pair, timeframe)
+        history = self.condition_history[key]
+        os.makedirs(self.state_dir, exist_ok=True)
+        with open(self._path(pair, timeframe), 'w') as f:
+            json.dump({'names': self.condition_names(), 'state': self.states[key].to_dict(),
+                       'last_timestamp': self.last_timestamps[key].isoformat(),
+                       'times': [t.isoformat() for t in history.index],
+                       'flags': [int(x) for x in history.to_numpy()]}, f)
+
+    def frame_conditions(self, pair: str, timeframe: str, df: pd.DataFrame,
+                         time_column: str = None) -> Dict[str, np.ndarray]:
+        """Condiciones por vela alineadas con las filas de df, sin recalcular la ventana
+
+        Las velas posteriores a la última procesada se suman al
+        IndicatorState en O(1) cada una; las anteriores se leen del historial
+        guardado. Si la ventana incluye velas previas que no están en el
+        historial (primera ejecución, ventana más larga), el estado se
+        reconstruye una vez recorriendo el frame.
+        """
+        key = (pair, timeframe)
+        time_column = time_column or ('datetime' if 'datetime' in df.columns else 'timestamp')
+        times = pd.to_datetime(df[time_column], utc=True)
+        names = self.condition_names()
+        self._load_key(pair, timeframe)
+
+        last = self.last_timestamps.get(key)
+        history = self.condition_history.get(key)
+        if last is not None:
+            old_times = times[times <= last]
+            if not old_times.isin(history.index).all():
+                last = None
+        if last is None:
+            self.states[key] = IndicatorState(self.config)
+            history = pd.Series(dtype=np.int64, index=pd.DatetimeIndex([], tz='UTC'))
+
+        new_rows = np.flatnonzero((times > last).to_numpy() if last is not None else np.ones(len(df), dtype=bool))
+        new_rows = new_rows[np.argsort(times.iloc[new_rows].to_numpy(), kind='stable')]
+        new_rows = new_rows[~times.iloc[new_rows].duplicated().to_numpy()]
+
+        if len(new_rows):
+            state = self.states[key]
+            closes = df['close'].to_numpy(dtype=np.float64)[new_rows]
+            frame = pd.DataFrame([state.update(close) for close in closes], dtype=np.float64)
+            conditions = indicator_conditions(frame, self.config)
+            flags = np.zeros(len(new_rows), dtype=np.int64)
+            for bit, name in enumerate(names):
+                flags |= conditions[name].astype(np.int64) << bit
+            new_times = pd.DatetimeIndex(times.iloc[new_rows])
+            history = pd.concat([history, pd.Series(flags, index=new_times)])
+            self.last_timestamps[key] = new_times.max()
+
+        # Solo se conserva la ventana actual: el historial no crece entre ejecuciones
+        history = history[history.index >= times.min()]
+        self.condition_history[key] = history
+        if len(new_rows):
+            self._save_key(pair, timeframe)
+
+        flags = history.reindex(times).fillna(0).to_numpy(dtype=np.int64)
+        return {name: (flags >> bit & 1).astype(bool) for bit, name in enumerate(names)}
+
+    def save(self, path: str):
+        data = {f"{pair}|{timeframe}": state.to_dict() for (pair, timeframe), state in self.states.items()}
+        with open(path, 'w') as f:
+            json.dump(data, f)
+
+    def load(self, path: str):
+        with open(path) as f:
+            data = json.load(f)
+        for key, state in data.items():
+            pair, timeframe = key.split('|')
+            self.states[(pair, timeframe)] = IndicatorState.from_dict(state)
+        logger.info(f"Estados de indicadores cargados: {len(data)}")
+
+
+def create_indicator_engine(config: Dict[str, Any] = None) -> IndicatorEngine:
+    """Crea una instancia del motor de indicadores"""
+    return IndicatorEngine(config)
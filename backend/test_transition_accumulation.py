@@ -0,0 +1,131 @@
+# backend/test_transition_accumulation.py
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent))
+
+from markov_tables import TransitionStore
+from pattern_detector import PatternDetector
+
+
+class _Result:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Query:
+    """Subconjunto de la API de supabase-py usado por el detector (en memoria)"""
+
+    def __init__(self, rows, op=None, payload=None):
+        self.rows = rows
+        self.op = op
+        self.payload = payload
+        self.filters = []
+
+    def select(self, *args, **kwargs):
+        return _Query(self.rows, 'select')
+
+    def update(self, payload):
+        return _Query(self.rows, 'update', payload)
+
+    def insert(self, payload):
+        return _Query(self.rows, 'insert', payload)
+
+    def eq(self, column, value):
+        self.filters.append((column, value))
+        return self
+
+    def execute(self):
+        matched = [row for row in self.rows if all(row.get(c) == v for c, v in self.filters)]
+        if self.op == 'insert':
+            row = dict(self.payload, id=len(self.rows) + 1)
+            self.rows.append(row)
+            return _Result([row])
+        if self.op == 'update':
+            for row in matched:
+                row.update(self.payload)
+        return _Result(matched)
+
+
+class _MemoryClient:
+    def __init__(self):
+        self.tables = {}
+
+    def table(self, name):
+        return _Query(self.tables.setdefault(name, []))
+
+
+class _MemoryDB:
+    def __init__(self):
+        self.client = _MemoryClient()
+
+
+def _candles(n, seed=7):
+    rng = np.random.default_rng(seed)
+    open_ = 1.1 + rng.normal(0, 0.001, n)
+    close = open_ + np.where(rng.random(n) < 0.5, -1, 1) * (0.0002 + rng.random(n) * 0.0005)
+    return pd.DataFrame({
+        'datetime': pd.date_range('2024-01-01', periods=n, freq='h', tz='UTC'),
+        'open': open_,
+        'high': np.maximum(open_, close) + 0.0002,
+        'low': np.minimum(open_, close) - 0.0002,
+        'close': close
+    })
+
+
+def test_master_counts_each_candle_once():
+    """Dos ejecuciones con ventanas solapadas = una pasada sobre la unión"""
+    candles = _candles(700)
+    first, second = candles.iloc[:500], candles.iloc[200:]
+
+    with tempfile.TemporaryDirectory() as state_dir:
+        db = _MemoryDB()
+        detector = PatternDetector(db, TransitionStore(state_dir))
+        first_patterns = detector.detect_and_update_patterns('EURUSD', '1h', first)
+        second_patterns = detector.detect_and_update_patterns('EURUSD', '1h', second)
+
+    reference = PatternDetector()
+    sequence = reference._get_candle_sequence(candles)
+    in_both = {(p['pattern'], p['direction']) for p in first_patterns} & \
+              {(p['pattern'], p['direction']) for p in second_patterns}
+    master = {(row['pattern'], row['direction']): row for row in db.client.tables['forex_strategies_master']}
+
+    checked = 0
+    for pattern, direction in in_both:
+        if not set(pattern) <= {'R', 'V'}:
+            continue
+        matches_r, matches_v = reference._count_pattern_outcomes(sequence, pattern)
+        expected = matches_v if direction == 'CALL' else matches_r
+        row = master[(pattern, direction)]
+        assert row['occurrences'] == expected['count'], (pattern, row['occurrences'], expected['count'])
+        assert row['wins'] == expected['correct'], (pattern, row['wins'], expected['correct'])
+        assert row['losses'] == expected['count'] - expected['correct']
+        checked += 1
+
+    assert checked > 0
+    print(f"✅ {checked} patrones del master sin doble conteo")
+
+
+def test_out_of_order_frame():
+    """Velas desordenadas o repetidas se cuentan igual que en orden"""
+    candles = _candles(300, seed=3)
+    shuffled = pd.concat([candles.sample(frac=1, random_state=1), candles.iloc[:20]])
+
+    with tempfile.TemporaryDirectory() as state_dir:
+        ordered, _ = TransitionStore(state_dir).update_from_frame('EURUSD', '1h', candles)
+    with tempfile.TemporaryDirectory() as state_dir:
+        unordered, _ = TransitionStore(state_dir).update_from_frame('EURUSD', '1h', shuffled)
+
+    assert ordered.n == unordered.n == len(candles)
+    for order in ordered.counts:
+        assert np.array_equal(ordered.counts[order], unordered.counts[order])
+    print("✅ Orden cronológico verificado")
+
+
+if __name__ == "__main__":
+    test_master_counts_each_candle_once()
+    test_out_of_order_frame()
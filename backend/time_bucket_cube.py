@@ -0,0 +1,149 @@
+# backend/time_bucket_cube.py - Cubo de conteos día × hora × minuto × color
+import logging
+import pandas as pd
+import numpy as np
+from typing import Dict, Any, List, Tuple
+
+from sequence_stats import lower_threshold
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+CUBE_SHAPE = (7, 24, 60, 2)  # day_of_week (0=Monday), hour, minute, color (1 = green)
+
+
+class TimeBucketCube:
+    """Conteos de velas por franja temporal construidos en una sola pasada
+
+    Fragmentos de minutos, horas y desgloses hora × día salen de sumar
+    cortes del cubo, sin volver a filtrar el DataFrame. update() acepta
+    velas nuevas de forma incremental.
+    """
+
+    def __init__(self, counts: np.ndarray = None):
+        self.counts = counts if counts is not None else np.zeros(CUBE_SHAPE, dtype=np.int64)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'TimeBucketCube':
+        cube = cls()
+        cube.update_frame(df)
+        return cube
+
+    @classmethod
+    def load(cls, path: str) -> 'TimeBucketCube':
+        """Cargar un cubo guardado con save()"""
+        with np.load(path) as data:
+            return cls(data['counts'].astype(np.int64))
+
+    def save(self, path: str):
+        np.savez_compressed(path, counts=self.counts)
+
+    def update(self, day_of_week: np.ndarray, hour: np.ndarray, minute: np.ndarray, green: np.ndarray):
+        """Sumar velas nuevas al cubo"""
+        flat = ((np.asarray(day_of_week, dtype=np.int64) * 24
+                 + np.asarray(hour, dtype=np.int64)) * 60
+                + np.asarray(minute, dtype=np.int64)) * 2 + np.asarray(green, dtype=np.int64)
+        self.counts += np.bincount(flat, minlength=self.counts.size).reshape(CUBE_SHAPE)
+
+    def update_frame(self, df: pd.DataFrame):
+        """Sumar un DataFrame con columnas day_of_week/hour/minute/color"""
+        if df is None or len(df) == 0:
+            return
+        self.update(df['day_of_week'].to_numpy(), df['hour'].to_numpy(), df['minute'].to_numpy(),
+                    df['color'].to_numpy() == 'green')
+
+    @property
+    def n_candles(self) -> int:
+        return int(self.counts.sum())
+
+    def minute_counts(self) -> np.ndarray:
+        """(60, 2): velas por minuto de la hora y color"""
+        return self.counts.sum(axis=(0, 1))
+
+    def hour_day_counts(self) -> np.ndarray:
+        """(24, 7, 2): velas por hora, día de la semana y color"""
+        return self.counts.sum(axis=2).transpose(1, 0, 2)
+
+    def minute_range_counts(self, start_minute: int, end_minute: int) -> Tuple[int, int]:
+        """(total, verdes) de los minutos start..end (inclusive) de cada hora"""
+        window = self.counts[:, :, start_minute:end_minute + 1]
+        return int(window.sum()), int(window[..., 1].sum())
+
+    def effective_fragments(self, fragment_sizes: List[int], min_occurrences: int,
+                            effectiveness_threshold: float) -> Dict[str, Dict[str, Any]]:
+        """Fragmentos de minutos con sesgo >= umbral hacia cualquier color"""
+        minute_counts = self.minute_counts()
+        red_threshold = lower_threshold(effectiveness_threshold)
+        fragments = {}
+
+        for fragment_size in fragment_sizes:
+            for start_minute in range(0, 60, fragment_size):
+                if start_minute + fragment_size > 60:
+                    continue
+
+                end_minute = start_minute + fragment_size - 1
+                total_candles = int(minute_counts[start_minute:end_minute + 1].sum())
+
+                if total_candles >= min_occurrences:
+                    green_count = int(minute_counts[start_minute:end_minute + 1, 1].sum())
+                    effectiveness = green_count / total_candles
+
+                    if effectiveness >= effectiveness_threshold or effectiveness <= red_threshold:
+                        bias = 'green' if effectiveness >= effectiveness_threshold else 'red'
+                        final_effectiveness = effectiveness if bias == 'green' else (1 - effectiveness)
+
+                        fragments[f"FRAG_{fragment_size}min_{start_minute:02d}-{end_minute:02d}"] = {
+                            'fragment_size': fragment_size,
+                            'start_minute': start_minute,
+                            'end_minute': end_minute,
+                            'bias': bias,
+                            'effectiveness': final_effectiveness,
+                            'total_candles': total_candles,
+                            'green_count': green_count,
+                            'red_count': total_candles - green_count
+                        }
+
+        return fragments
+
+    def hourly_patterns(self, min_occurrences: int, effectiveness_threshold: float,
+                        min_day_occurrences: int = 20) -> Dict[int, Dict[str, Any]]:
+        """Horas con sesgo >= umbral y su desglose por día de la semana"""
+        hour_day_counts = self.hour_day_counts()
+        red_threshold = lower_threshold(effectiveness_threshold)
+        patterns = {}
+
+        for hour in range(24):
+            total_candles = int(hour_day_counts[hour].sum())
+
+            if total_candles >= min_occurrences:
+                green_count = int(hour_day_counts[hour, :, 1].sum())
+                effectiveness = green_count / total_candles
+
+                if effectiveness >= effectiveness_threshold or effectiveness <= red_threshold:
+                    bias = 'green' if effectiveness >= effectiveness_threshold else 'red'
+                    final_effectiveness = effectiveness if bias == 'green' else (1 - effectiveness)
+
+                    daily_breakdown = {}
+                    for day in range(7):  # 0=Monday, 6=Sunday
+                        day_count = int(hour_day_counts[hour, day].sum())
+                        if day_count >= min_day_occurrences:
+                            daily_breakdown[day] = {
+                                'effectiveness': int(hour_day_counts[hour, day, 1]) / day_count,
+                                'count': day_count
+                            }
+
+                    patterns[hour] = {
+                        'bias': bias,
+                        'effectiveness': final_effectiveness,
+                        'total_candles': total_candles,
+                        'green_count': green_count,
+                        'red_count': total_candles - green_count,
+                        'daily_breakdown': daily_breakdown
+                    }
+
+        return patterns
+
+
+def create_time_bucket_cube(df: pd.DataFrame = None) -> TimeBucketCube:
+    """Crea un cubo de conteos, opcionalmente a partir de un DataFrame"""
+    return TimeBucketCube.from_frame(df) if df is not None else TimeBucketCube()
@@ -16,7 +16,7 @@ except ImportError:
     pass
 
 # Importar Supabase directamente
-from supabase import create_client
+from db_connection import get_shared_client
 import os
 
 # Configurar logging
@@ -46,7 +46,7 @@ class ForexDataUploader:
                     print(f"  {var}: {os.environ[var][:20]}...")
             raise ValueError("Variables de entorno de Supabase no encontradas")
         
-        self.supabase = create_client(url, key)
+        self.supabase = get_shared_client(url, key)
         self.data_path = Path("D:/OneDrive/Personal/Programas Jose Valdez/Trading")
         print("✅ Conexión directa con Supabase establecida")
     
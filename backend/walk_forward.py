@@ -0,0 +1,304 @@
+# backend/walk_forward.py - Validación walk-forward de patrones descubiertos
+import logging
+import pandas as pd
+import numpy as np
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+from config import CURRENCY_PAIRS, PATTERN_CONFIG, MULTI_TIMEFRAME_CONFIG
+from obplus_signals import OBPLUS_PATTERNS, FRAGMENT_SIZE, extract_obplus_signals
+from sequence_stats import lower_threshold
+from streaming_discovery import stream_candle_chunks
+from supabase_client import create_supabase_client
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Patrones mixtos que evalúa PatternDetector además de R..RRRRR y V..VVVVV
+DETECTOR_MIXED_PATTERNS = ['RV', 'VR', 'RVR', 'VRV', 'RVRV', 'VRVR']
+
+WALK_FORWARD_TIMEFRAMES = ['1min', '5min', '15min', '30min', '1h', '4h', '1d']
+
+
+def code_to_pattern(code: int, length: int) -> str:
+    """Convertir código de bits (vela más antigua = bit alto) a patrón R/V"""
+    return ''.join('V' if (code >> (length - 1 - i)) & 1 else 'R' for i in range(length))
+
+
+def pattern_to_code(pattern: str) -> int:
+    """Convertir patrón R/V a código de bits"""
+    code = 0
+    for candle in pattern:
+        code = (code << 1) | (candle == 'V')
+    return code
+
+
+def block_prefix_counts(event_time: np.ndarray, event_bin: np.ndarray, n_bins: int,
+                        n_candles: int, block_size: int) -> np.ndarray:
+    """Sumas prefijas de conteos por bloque: P[j] = conteos de los bloques [0, j)
+
+    Los conteos de cualquier ventana de bloques [a, b) salen de P[b] - P[a]
+    sin volver a recorrer las velas.
+    """
+    n_blocks = -(-n_candles // block_size)
+    block_id = event_time // block_size
+    counts = np.bincount(block_id * n_bins + event_bin, minlength=n_blocks * n_bins)
+    prefix = np.zeros((n_blocks + 1, n_bins), dtype=np.int64)
+    np.cumsum(counts.reshape(n_blocks, n_bins), axis=0, out=prefix[1:])
+    return prefix
+
+
+class WalkForwardValidator:
+    """Ventanas móviles entrenamiento/prueba sobre una serie de velas"""
+
+    def __init__(self, train_size: int = 2000, test_size: int = 500, anchored: bool = False):
+        if train_size % test_size != 0:
+            raise ValueError("train_size debe ser múltiplo de test_size")
+        self.train_size = train_size
+        self.test_size = test_size
+        self.anchored = anchored
+
+    def _folds(self, prefix: np.ndarray) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Conteos (entrenamiento, prueba) de cada ventana a partir de las sumas prefijas"""
+        train_blocks = self.train_size // self.test_size
+        n_blocks = len(prefix) - 1
+        folds = []
+
+        for j in range(train_blocks, n_blocks):
+            start = 0 if self.anchored else j - train_blocks
+            folds.append((prefix[j] - prefix[start], prefix[j + 1] - prefix[j]))
+
+        return folds
+
+    def _sequence_prefix(self, green: np.ndarray, length: int) -> np.ndarray:
+        """Sumas prefijas de (código de secuencia, color siguiente) para una longitud"""
+        n = len(green)
+        code = np.zeros(n - length, dtype=np.int64)
+        for i in range(length):
+            code = (code << 1) | green[i:n - length + i]
+        outcome = green[length:].astype(np.int64)
+        event_time = np.arange(length, n)
+        return block_prefix_counts(event_time, code * 2 + outcome, 2 ** (length + 1), n, self.test_size)
+
+    def _aggregate(self, rows: Dict[Tuple, Dict[str, Any]], key: Tuple, is_total: int, is_wins: int,
+                   oos_total: int, oos_wins: int):
+        """Acumular resultados de una ventana para una estrategia seleccionada"""
+        row = rows.setdefault(key, {
+            'folds_selected': 0, 'is_occurrences': 0, 'is_wins': 0,
+            'oos_occurrences': 0, 'oos_wins': 0
+        })
+        row['folds_selected'] += 1
+        row['is_occurrences'] += int(is_total)
+        row['is_wins'] += int(is_wins)
+        row['oos_occurrences'] += int(oos_total)
+        row['oos_wins'] += int(oos_wins)
+
+    def validate_sequences(self, green: np.ndarray, lengths: List[int], min_occurrences: int,
+                           effectiveness_threshold: float,
+                           allowed_patterns: Optional[set] = None) -> Tuple[Dict[Tuple, Dict[str, Any]], int]:
+        """Walk-forward de patrones de secuencia (reglas de PatternDetector / multi_timeframe_analyzer)
+
+        En cada ventana de entrenamiento se seleccionan los patrones que
+        cumplen ocurrencias mínimas y efectividad; se mide su dirección en la
+        ventana de prueba siguiente.
+        """
+        rows = {}
+        n_folds = 0
+        red_threshold = lower_threshold(effectiveness_threshold)
+
+        for length in lengths:
+            if len(green) <= length + self.train_size:
+                continue
+
+            folds = self._folds(self._sequence_prefix(green, length))
+            n_folds = max(n_folds, len(folds))
+            patterns = [code_to_pattern(code, length) for code in range(2 ** length)]
+
+            for train, test in folds:
+                train = train.reshape(-1, 2)
+                test = test.reshape(-1, 2)
+                train_total = train.sum(axis=1)
+                green_rate = np.divide(train[:, 1], train_total, out=np.zeros(len(train)), where=train_total > 0)
+
+                selected = (train_total >= min_occurrences) & (
+                    (green_rate >= effectiveness_threshold) | (green_rate <= red_threshold))
+
+                for code in np.flatnonzero(selected):
+                    pattern = patterns[code]
+                    if allowed_patterns is not None and pattern not in allowed_patterns:
+                        continue
+
+                    call = green_rate[code] >= 0.5
+                    direction = 'CALL' if call else 'PUT'
+                    is_wins = train[code, 1] if call else train[code, 0]
+                    oos_wins = test[code, 1] if call else test[code, 0]
+                    self._aggregate(rows, (pattern, direction), train_total[code], is_wins,
+                                    test[code].sum(), oos_wins)
+
+        return rows, n_folds
+
+    def validate_obplus(self, green: np.ndarray, min_win_rate: float = 0.55,
+                        min_trades: int = 20) -> Tuple[Dict[Tuple, Dict[str, Any]], int]:
+        """Walk-forward de las reglas OBPlus sobre fragmentos de 5 velas solapados
+
+        Igual que OBPlusAuthenticAnalyzer: un fragmento por vela y el
+        "siguiente fragmento" desplazado una vela. Cada señal se asigna al
+        bloque de la última vela del fragmento para no filtrar información.
+        """
+        if len(green) <= FRAGMENT_SIZE + self.train_size:
+            return {}, 0
+
+        fragments = np.lib.stride_tricks.sliding_window_view(green, FRAGMENT_SIZE)
+        times, bins = [], []
+
+        # La señal del fragmento i se resuelve con la vela i + FRAGMENT_SIZE,
+        # siempre < len(green): los bloques cubren exactamente las velas reales
+        for strategy_id, pattern in enumerate(OBPLUS_PATTERNS):
+            signals = extract_obplus_signals(fragments, pattern)
+            times.append(signals['fragment_idx'].astype(np.int64) + FRAGMENT_SIZE)
+            bins.append(strategy_id * 2 + signals['win'].astype(np.int64))
+
+        prefix = block_prefix_counts(np.concatenate(times), np.concatenate(bins),
+                                     len(OBPLUS_PATTERNS) * 2, len(green), self.test_size)
+        folds = self._folds(prefix)
+        rows = {}
+
+        for train, test in folds:
+            train = train.reshape(-1, 2)
+            test = test.reshape(-1, 2)
+            train_total = train.sum(axis=1)
+            win_rate = np.divide(train[:, 1], train_total, out=np.zeros(len(train)), where=train_total > 0)
+
+            for strategy_id in np.flatnonzero((train_total >= min_trades) & (win_rate >= min_win_rate)):
+                self._aggregate(rows, (OBPLUS_PATTERNS[strategy_id], None), train_total[strategy_id],
+                                train[strategy_id, 1], test[strategy_id].sum(), test[strategy_id, 1])
+
+        return rows, len(folds)
+
+
+class WalkForwardRunner:
+    """Validación nocturna walk-forward para todos los pares y timeframes"""
+
+    def __init__(self, db_client=None, validator: WalkForwardValidator = None):
+        self.db_client = db_client or create_supabase_client()
+        self.validator = validator or WalkForwardValidator()
+
+        # Criterios de descubrimiento por fuente (iguales a los analizadores)
+        detector_config = PATTERN_CONFIG.get('sequence_patterns', {})
+        self.detector_max_length = detector_config.get('max_length', 5)
+        self.detector_min_occurrences = detector_config.get('min_occurrences', 10)
+        self.detector_patterns = {c * n for c in 'RV' for n in range(1, self.detector_max_length + 1)}
+        self.detector_patterns.update(p for p in DETECTOR_MIXED_PATTERNS if len(p) <= self.detector_max_length)
+
+        # Umbrales de multi_timeframe_analyzer (config.MULTI_TIMEFRAME_CONFIG)
+        self.multi_timeframe_config = MULTI_TIMEFRAME_CONFIG
+
+    def load_green_series(self, pair: str, timeframe: str, batch_size: int = 1000) -> Optional[np.ndarray]:
+        """Cargar colores de velas (True = verde) en orden cronológico (keyset por datetime)"""
+        green = [chunk['color'].to_numpy() == 'green'
+                 for chunk in stream_candle_chunks(self.db_client.client, pair, timeframe, batch_size=batch_size)]
+        return np.concatenate(green) if green else None
+
+    def _rows_to_records(self, rows: Dict[Tuple, Dict[str, Any]], source: str, pair: str,
+                         timeframe: str, n_folds: int) -> List[Dict[str, Any]]:
+        """Convertir acumulados por estrategia a filas del reporte"""
+        records = []
+        for (pattern, direction), row in rows.items():
+            is_eff = row['is_wins'] / row['is_occurrences'] * 100 if row['is_occurrences'] else 0.0
+            oos_eff = row['oos_wins'] / row['oos_occurrences'] * 100 if row['oos_occurrences'] else None
+            records.append({
+                'source': source,
+                'pair': pair,
+                'timeframe': timeframe,
+                'pattern': pattern,
+                'direction': direction,
+                'folds': n_folds,
+                'folds_selected': row['folds_selected'],
+                'is_occurrences': row['is_occurrences'],
+                'is_effectiveness': is_eff,
+                'oos_occurrences': row['oos_occurrences'],
+                'oos_wins': row['oos_wins'],
+                'oos_effectiveness': oos_eff,
+                'effectiveness_drop': is_eff - oos_eff if oos_eff is not None else None
+            })
+        return records
+
+    def validate_series(self, green: np.ndarray, pair: str, timeframe: str) -> List[Dict[str, Any]]:
+        """Validar las tres fuentes de patrones sobre una serie"""
+        records = []
+
+        rows, n_folds = self.validator.validate_sequences(
+            green, list(range(1, self.detector_max_length + 1)), self.detector_min_occurrences,
+            0.5 + 1e-9, allowed_patterns=self.detector_patterns)  # efectividad > 50%
+        records.extend(self._rows_to_records(rows, 'pattern_detector', pair, timeframe, n_folds))
+
+        config = self.multi_timeframe_config.get(timeframe)
+        if config:
+            rows, n_folds = self.validator.validate_sequences(
+                green, list(range(2, config.get('max_length', 5) + 1)), config['min_occurrences'],
+                config['effectiveness_threshold'])
+            records.extend(self._rows_to_records(rows, 'direct_multi_analyzer', pair, timeframe, n_folds))
+
+        rows, n_folds = self.validator.validate_obplus(green)
+        records.extend(self._rows_to_records(rows, 'obplus_authentic_analyzer', pair, timeframe, n_folds))
+
+        return records
+
+    def run(self, pairs: List[str] = None, timeframes: List[str] = None) -> pd.DataFrame:
+        """Ejecutar walk-forward para todas las combinaciones par/timeframe"""
+        pairs = pairs or CURRENCY_PAIRS
+        timeframes = timeframes or WALK_FORWARD_TIMEFRAMES
+        records = []
+
+        for pair in pairs:
+            for timeframe in timeframes:
+                try:
+                    green = self.load_green_series(pair, timeframe)
+                    if green is None or len(green) <= self.validator.train_size + self.validator.test_size:
+                        logger.info(f"Datos insuficientes para walk-forward: {pair} {timeframe}")
+                        continue
+
+                    pair_records = self.validate_series(green, pair, timeframe)
+                    records.extend(pair_records)
+                    logger.info(f"Walk-forward {pair} {timeframe}: {len(green)} velas, {len(pair_records)} estrategias")
+
+                except Exception as e:
+                    logger.error(f"Error en walk-forward {pair} {timeframe}: {e}")
+                    continue
+
+        return pd.DataFrame(records)
+
+
+def create_walk_forward_runner(db_client=None, train_size: int = 2000, test_size: int = 500,
+                               anchored: bool = False) -> WalkForwardRunner:
+    """Crea una instancia del runner walk-forward"""
+    return WalkForwardRunner(db_client, WalkForwardValidator(train_size, test_size, anchored))
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+
+    print("🔁 VALIDACIÓN WALK-FORWARD DE PATRONES")
+    print("Ventanas móviles entrenamiento/prueba con sumas prefijas por bloque")
+
+    runner = create_walk_forward_runner()
+    start_time = datetime.now()
+    table = runner.run()
+    duration = (datetime.now() - start_time).total_seconds()
+
+    print(f"\n📊 Estrategias validadas: {len(table)}")
+    print(f"⏱️ Duración: {duration:.1f} segundos")
+
+    if not table.empty:
+        print("\n🏆 MEJOR EFECTIVIDAD FUERA DE MUESTRA (mínimo 100 ocurrencias):")
+        robust = table[table['oos_occurrences'] >= 100].sort_values('oos_effectiveness', ascending=False).head(10)
+        print(robust[['source', 'pair', 'timeframe', 'pattern', 'direction', 'is_effectiveness',
+                      'oos_effectiveness', 'oos_occurrences']].to_string(index=False))
+
+        output_path = f"walk_forward_{start_time.strftime('%Y%m%d_%H%M%S')}.csv"
+        table.to_csv(output_path, index=False)
+        print(f"\n💾 Reporte guardado en {output_path}")
+
+
+if __name__ == "__main__":
+    main()